@@ -0,0 +1,233 @@
+"""无界面的命令行入口：python -m absorbance batch <目录>
+
+批量处理一个目录中的测量文件，每个文件做标准曲线拟合和含量换算，
+用多进程并行，输出汇总表和每个文件的 PNG 图像（Agg 渲染）。
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+import warnings
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from calibration import qifen_from_absorbance, fit_spectra, best_wavelength
+from fitters import fit_line, inverse, is_linear, FITTERS
+import dataio
+from spectrum_store import SpectrumStore
+
+MEASUREMENT_EXTENSIONS = ('.csv', '.txt', '.parquet', '.feather', '.h5', '.hdf5', '.abs')
+# 结果表格式 → 扩展名
+RESULT_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.feather', 'hdf5': '.h5'}
+# 样品读数保留的列
+SAMPLE_SCHEMA = {name: dataio.MEASUREMENT_SCHEMA[name] for name in ('absorbance', 'sample_id', 'timestamp')}
+
+BatchResult = namedtuple('BatchResult', ['file', 'wavelength', 'n_standards', 'slope', 'intercept', 'r',
+                                         'n_samples', 'content_mean', 'qifen_mean', 'png', 'error'])
+
+
+def find_measurements(directory, recursive=False, exclude=None):
+    """目录中的测量文件（.csv/.txt/.parquet/.feather/.h5 见 dataio，.abs 为 spectrum_store 存储文件），按路径排序
+
+    exclude 为要跳过的子目录（如输出目录，避免把汇总表当作测量文件）。
+    """
+    found = []
+    exclude = os.path.abspath(exclude) if exclude else None
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != exclude]
+        found.extend(os.path.join(root, name) for name in files
+                     if os.path.splitext(name)[1].lower() in MEASUREMENT_EXTENSIONS)
+        if not recursive:
+            break
+    return sorted(found)
+
+
+def load_measurement(path, wavelength_criterion='r2'):
+    """读取测量文件，返回 (标准含量, 标准吸光度, 样品, 波长)
+
+    表格文件按 dataio.MEASUREMENT_SCHEMA 读取，含量为空的行是待测样品；没有可识别表头的
+    文本文件第一列为含量、第二列为吸光度。样品为 {absorbance, sample_id, timestamp} 列。
+    有多个波长时按 wavelength_criterion 选出分析波长，只保留该波长（或未标波长）的样品。
+    """
+    if path.lower().endswith('.abs'):
+        store = SpectrumStore.open(path)
+        samples = dataio.conform({}, SAMPLE_SCHEMA)
+    else:
+        columns = dataio.read(path, columns=('concentration', 'absorbance', 'wavelength', 'sample_id', 'timestamp'))
+        valid = ~np.isnan(columns['absorbance'])
+        columns = {name: values[valid] for name, values in columns.items()}
+        is_sample = np.isnan(columns['concentration'])
+        store = dataio.to_store(columns)
+        samples = {name: columns[name][is_sample] for name in ('wavelength', *SAMPLE_SCHEMA)}
+    index = 0
+    if store.n_wavelengths > 1:
+        index = best_wavelength(fit_spectra(store.percentages, store.absorbances), wavelength_criterion)
+    wavelength = float(store.wavelengths[index])
+    if 'wavelength' in samples:
+        sample_wavelengths = samples.pop('wavelength')
+        keep = np.isnan(sample_wavelengths) | (sample_wavelengths == wavelength)
+        samples = {name: values[keep] for name, values in samples.items()}
+    return np.array(store.percentages), np.array(store.absorbance(index)), samples, wavelength
+
+
+def _init_worker():
+    # 工作进程只出图不显示，并屏蔽缺少中文字体的警告
+    import matplotlib
+    matplotlib.use('Agg')
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+    warnings.filterwarnings('ignore', message='Glyph .* missing', category=UserWarning)
+
+
+# 工作进程内复用的出图坐标轴，坐标样式只设置一次
+_report_axes = None
+
+
+def render_png(path, x, y, fit, dpi=100):
+    """用 Agg 绘制标准曲线图（与界面第三步相同）并保存"""
+    global _report_axes
+    from render import apply_coordinates, clear_data, draw_steps
+
+    if _report_axes is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=(10, 9), dpi=dpi)
+        FigureCanvasAgg(fig)
+        _report_axes = fig.add_subplot()
+        fig.subplots_adjust(left=0.12, right=0.95, bottom=0.15, top=0.98)
+        apply_coordinates(_report_axes)
+    clear_data(_report_axes)
+    draw_steps(_report_axes, x, y, fit, step=3, restyle=False)
+    _report_axes.figure.savefig(path, dpi=dpi)
+
+
+def process_file(path, png_path=None, method='ols', wavelength_criterion='r2', results_path=None):
+    """处理单个测量文件，png_path 为空时不出图；出错时把错误写入结果而不是抛出，以免中断整批
+
+    results_path 若提供，把各样品的反算含量和拟合参数按其扩展名的格式写出（dataio.RESULT_SCHEMA）。
+    """
+    name = path
+    try:
+        x, y, samples, wavelength = load_measurement(path, wavelength_criterion)
+        fit = fit_line(x, y, method)
+        content = inverse(fit, samples['absorbance'])
+        if png_path:
+            render_png(png_path, x, y, fit)
+        if results_path:
+            dataio.write(results_path, dataio.fit_results(fit, samples['absorbance'], samples['sample_id'],
+                                                          samples['timestamp'], wavelength), dataio.RESULT_SCHEMA)
+        # 曲线模型没有斜率和截距，汇总表中留空（nan）
+        slope, intercept = (fit.slope, fit.intercept) if is_linear(fit) else (float('nan'), float('nan'))
+        n_samples = samples['absorbance'].size
+        return BatchResult(name, wavelength, x.size, slope, intercept, fit.r, n_samples,
+                           float(np.nanmean(content)) if n_samples else float('nan'),
+                           float(qifen_from_absorbance(y).mean()), png_path or '', '')
+    except Exception as e:
+        nan = float('nan')
+        return BatchResult(name, nan, 0, nan, nan, nan, 0, nan, nan, '', f"{type(e).__name__}: {e}")
+
+
+def run_batch(files, output_dir, method='ols', wavelength_criterion='r2', png=True, jobs=None, progress=None,
+              results_format=None):
+    """用进程池并行处理所有文件，返回按输入顺序排列的 BatchResult 列表
+
+    progress 若提供，每完成一个文件以 (已完成数, 总数) 调用。
+    results_format 为 csv/parquet/arrow/hdf5 时为每个文件输出一份样品结果表。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # 图像按相对路径命名，子目录中的同名文件不会互相覆盖
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in files]) if files else ''
+    results = [None] * len(files)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        futures = {}
+        for i, path in enumerate(files):
+            stem = os.path.join(output_dir, os.path.splitext(os.path.relpath(os.path.abspath(path), base))[0]
+                                .replace(os.sep, '__'))
+            png_path = stem + '.png' if png else None
+            results_path = stem + '.results' + RESULT_EXTENSIONS[results_format] if results_format else None
+            futures[pool.submit(process_file, path, png_path, method, wavelength_criterion, results_path)] = i
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(files))
+    return results
+
+
+def write_summary(results, path):
+    """汇总表写为 CSV（带 BOM，便于 Excel 直接打开中文）"""
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['文件', '波长(nm)', '标准数', '斜率', '截距', '相关系数r',
+                         '样品数', '样品平均含量(%)', '漆酚平均含量', '图像', '错误'])
+        for r in results:
+            writer.writerow([r.file, f"{r.wavelength:g}", r.n_standards, f"{r.slope:.6g}", f"{r.intercept:.6g}",
+                             f"{r.r:.6f}", r.n_samples, f"{r.content_mean:.4g}", f"{r.qifen_mean:.4g}",
+                             r.png, r.error])
+
+
+def print_summary(results, file=None):
+    file = file or sys.stdout
+    print(f"{'文件':<36s}{'斜率':>10s}{'截距':>10s}{'r':>9s}{'样品':>6s}{'平均含量':>10s}", file=file)
+    for r in results:
+        if r.error:
+            print(f"{r.file:<36s}  出错：{r.error}", file=file)
+        else:
+            print(f"{r.file:<36s}{r.slope:>10.4f}{r.intercept:>10.4f}{r.r:>9.4f}{r.n_samples:>6d}"
+                  f"{r.content_mean:>10.2f}", file=file)
+
+
+def batch_main(args):
+    output_dir = args.output or os.path.join(args.directory, 'report')
+    files = find_measurements(args.directory, args.recursive, exclude=output_dir)
+    if not files:
+        print(f"{args.directory} 中没有测量文件（{', '.join(MEASUREMENT_EXTENSIONS)}）", file=sys.stderr)
+        return 1
+
+    def report(done, total):
+        if sys.stderr.isatty():
+            print(f"\r已完成 {done}/{total}", end='', file=sys.stderr)
+
+    start = time.perf_counter()
+    results = run_batch(files, output_dir, args.fitter, args.wavelength_criterion,
+                        not args.no_png, args.jobs, report, args.results)
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    summary = os.path.join(output_dir, 'summary.csv')
+    write_summary(results, summary)
+    if not args.quiet:
+        print_summary(results)
+    failed = sum(1 for r in results if r.error)
+    print(f"共 {len(results)} 个文件，失败 {failed} 个，耗时 {time.perf_counter() - start:.1f} 秒；"
+          f"汇总表：{summary}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m absorbance', description="分光光度计数据处理（命令行）")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    batch = commands.add_parser('batch', help="批量处理目录中的测量文件")
+    batch.add_argument('directory', help="测量文件所在目录")
+    batch.add_argument('-o', '--output', help="输出目录，缺省为 <目录>/report")
+    batch.add_argument('-j', '--jobs', type=int, help="并行进程数，缺省为 CPU 核数")
+    batch.add_argument('-r', '--recursive', action='store_true', help="包含子目录")
+    batch.add_argument('--fitter', choices=list(FITTERS), default='ols', help="拟合方法")
+    batch.add_argument('--wavelength-criterion', choices=['r2', 'sensitivity'], default='r2',
+                       help="全光谱存储文件选择分析波长的标准")
+    batch.add_argument('--no-png', action='store_true', help="不输出图像，只生成汇总表")
+    batch.add_argument('--results', choices=list(RESULT_EXTENSIONS),
+                       help="为每个文件输出样品结果表（反算含量、拟合参数），供 LIMS 导入")
+    batch.add_argument('-q', '--quiet', action='store_true', help="不在终端打印汇总表")
+    batch.set_defaults(handler=batch_main)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,108 @@
+import sys
+import startup_profile
+
+# 需在其余模块导入之前启用，才能统计到导入耗时
+if __name__ == "__main__" and '--profile-startup' in sys.argv:
+    startup_profile.enable()
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from scipy.stats import linregress, pearsonr
-import mplcursors
-import sys
+import argparse
+import time
+
+from acquisition import RingBuffer, open_source, DEFAULT_CAPACITY
+from calibration import fit_linear, fit_spectra, best_wavelength
+from spectrum_store import open_store
+from render import BlitRenderer, apply_blank_axes, apply_coordinates
+import lod
+from workers import JobExecutor
+from bootstrap import calibration_ci
+from diagnostics import calibration_qc, summary_text
+from fitters import fitter_labels, formula, is_linear, predict, FITTERS
+from cache import ResultCache, dataset_key
+from model import CalibrationModel, DATA, FITTER
+from stepview import StepView, STEP_LABELS, BLANK, AXES, SCATTER, FIT
+from virtual_table import VirtualTable
+from picking import PointIndex
+import animation
+import memory
+import tracing
+
+# 实时采集时的最高刷新帧率
+LIVE_FPS = 20
+# 开启耗时追踪时性能信息栏的刷新间隔
+OVERLAY_INTERVAL_MS = 500
+# 鼠标悬停拾取散点的半径（像素）
+HOVER_RADIUS = 30
+# 导出动画的文件类型
+ANIMATION_FILETYPES = [("GIF 动画", "*.gif"), ("MP4 视频", "*.mp4")]
+# 紧凑模式（--compact）下结果缓存与动画帧缓存的内存上限
+COMPACT_CACHE_BYTES = 32 << 20
+COMPACT_FRAME_CACHE_BYTES = 64 << 20
 
 
 class AbsorbanceApp:
-    def __init__(self, root):
+    def __init__(self, root, store=None, wavelength_criterion='r2', fitter='ols', cache=None,
+                 live=None, live_capacity=DEFAULT_CAPACITY, animate=False, compact=False):
         self.root = root
         self.root.title("分光光度计法数据处理AI小程序")
         self.root.state('zoomed')  # 全屏
 
-        # 固定数据
-        self.percentages = np.array([50, 55, 60, 65, 70, 75, 80], dtype=float)
-        self.absorbances = np.array([0.120, 0.206, 0.338, 0.460, 0.547, 0.641, 0.725], dtype=float)
-        self.qifen = 80.81 * self.absorbances - 1.076
-
-        self.step = 0
-        self.cursor = None  # 用于追踪mplcursors对象
+        # 数据来自存储文件（内存映射），未指定时使用内置的七个标准溶液；
+        # 数据、拟合方法与派生结果放在共用的模型中（见 model.py），界面只重画输入变化了的部分；
+        # 紧凑模式下数据与实时读数以单精度保存，缓存也更小，适合长时间运行
+        self.model = CalibrationModel(store, fitter, cache, compact=compact)
+        self.wavelength_criterion = wavelength_criterion
+        self.spectrum_fit = None  # 全光谱数据各波长的拟合结果
+        # 实时采集：live 为数据源描述（见 acquisition.open_source），读数写入定长环形缓冲区
+        self.live = live
+        self.live_buffer = RingBuffer(live_capacity, dtype=np.float32 if compact else float)
+        self.live_source = None
+        self._live_after = None
+        self._live_total = -1  # 上一帧绘制时的累计读数，无新读数时不重绘
+        self._step_started = None  # 当前步骤按下按钮的时刻，用于统计到结果显示的延迟
+        self.hover_index = None  # 散点的屏幕坐标索引，显示散点后才建立
+        self.hover_annotation = None
+        self._hover_point = None  # 当前悬停提示对应的数据下标
+        self.scatter = None
+        # 拟合线（连同其数值提示光标）和悬停提示只创建一次，之后每次显示时复用
+        self.fit_line = None
+        self.live_artists = []
+        self._fit_message = self._fit_status = ""  # 拟合结果的对话框与状态栏文字
+        self.shown_fit = None  # 当前显示的拟合结果
+        # 最小二乘的置信区间单独在后台计算，算好后再补进对话框和状态栏
+        self.fit_ci = None
+        self._fit_reported = False  # 本次数据拟合的结果是否已显示在对话框和状态栏
+        # 动画演示：第二、三步先播放后台预渲染的过渡帧（散点逐个出现、拟合线扫过）
+        self.animate = animate
+        self.frame_cache = ResultCache(COMPACT_FRAME_CACHE_BYTES if compact else animation.FRAME_CACHE_BYTES)
+        self._step_frames = None  # 与画布同尺寸的离屏渲染器，窗口大小变化后重建
+        self._frames = None  # 本次步骤所用的离屏渲染器，不播放动画时为 None
+
+        self.cursor = None  # 拟合线上的 mplcursors 对象
+        self.dialog = None  # 结果对话框，只创建一次，关闭时隐藏
         self.coordinates_drawn = False  # 用于跟踪是否已经绘制了坐标
+        self.executor = JobExecutor(self.root)  # 拟合等计算放到后台线程
         self._make_layout()
         self._populate_table()
 
+        # 四步流程的图层：散点只依赖数据，拟合线还依赖拟合方法，只换方法时散点不重画
+        self.view = StepView(self.model, self.executor, self._show_axes, on_step_done=self._on_step_done,
+                             on_error=self._on_job_error, on_progress=self._on_progress)
+        self.view.add_layer('scatter', SCATTER, (DATA,), self._prepare_scatter, self._draw_scatter,
+                            self._clear_scatter)
+        self.view.add_layer('fit', FIT, (DATA, FITTER), self._prepare_fit, self._draw_fit, self._clear_fit)
+        # 自助法置信区间大数据量时要算好几秒，不阻塞拟合线、诊断和结果对话框
+        self.view.add_layer('ci', FIT, (DATA, FITTER), self._prepare_ci, self._draw_ci, self._clear_ci,
+                            blocking=False)
+        self.model.subscribe(self._on_model_changed)
+
+        self._start_wavelength_selection()
+
         # 绑定窗口关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
@@ -50,6 +128,8 @@ class AbsorbanceApp:
             ]})
         ])
         style.configure('TButton', font=('KaiTi', 40, 'bold'), background='#9ed287', padding=(-20, 20))
+        # 对话框按钮样式
+        style.configure('Custom.TButton', font=('KaiTi', 20), background='#2e7d32')
         # style.map('TButton', background=[('active', '#4caf50')])
         
         # 左侧1, 右侧4 (表格占1/5)
@@ -66,7 +146,9 @@ class AbsorbanceApp:
         #                        foreground='#1b5e20', background='#f0f7f0')
         # title_label.grid(row=0, column=0, pady=(0, 20))
 
-        self.table = ttk.Treeview(left, columns=("pct", "abs"), show="headings", height=15)
+        # 只为可见行创建条目，数据量再大也不会逐行插入
+        self.table = VirtualTable(left, ("pct", "abs"),
+                                  (lambda p: f"{p:.0f}%", lambda a: f"{a:.3f}"), height=15)
         self.table.heading("pct", text="漆酚含量(%)")
         self.table.heading("abs", text="吸光度(A)")
 
@@ -80,15 +162,34 @@ class AbsorbanceApp:
 
         btn_frame1 = ttk.Frame(left)
         btn_frame1.grid(row=2, column=0, pady=10)
-        for i, txt in enumerate(["建立坐标", "绘制图像"], start=1):
+        for i, txt in enumerate(STEP_LABELS[:2], start=1):
             b = ttk.Button(btn_frame1, text=txt, command=lambda i=i: self.on_button(i), width=12, style='Round.TButton')
             b.grid(row=0, column=i - 1, padx=12, pady=10)
         btn_frame2 = ttk.Frame(left)
         btn_frame2.grid(row=3, column=0, pady=10)
-        for i, txt in enumerate(["数据拟合", "复位清屏"], start=3):
+        for i, txt in enumerate(STEP_LABELS[2:], start=3):
             b = ttk.Button(btn_frame2, text=txt, command=lambda i=i: self.on_button(i), width=12, style='Round.TButton')
             b.grid(row=0, column=i - 1, padx=12, pady=10)
 
+        # 拟合方法选择
+        fitter_frame = ttk.Frame(left)
+        fitter_frame.grid(row=4, column=0, pady=10)
+        ttk.Label(fitter_frame, text="拟合方法：").grid(row=0, column=0)
+        self.fitter_names = list(fitter_labels())
+        self.fitter_box = ttk.Combobox(fitter_frame, values=list(fitter_labels().values()), state='readonly',
+                                       font=('KaiTi', 24), width=12)
+        self.fitter_box.current(self.fitter_names.index(self.fitter))
+        self.fitter_box.bind('<<ComboboxSelected>>', self._on_fitter_selected)
+        self.fitter_box.grid(row=0, column=1)
+
+        # 配置了数据源时才显示实时采集按钮
+        if self.live:
+            self.live_button = ttk.Button(left, text="实时采集", command=self.toggle_live, width=12,
+                                          style='Round.TButton')
+            self.live_button.grid(row=5, column=0, pady=10)
+        ttk.Button(left, text="导出动画", command=self.export_animation, width=12,
+                   style='Round.TButton').grid(row=6, column=0, pady=10)
+
         right = ttk.Frame(self.root, padding=20)
         right.grid(row=0, column=1, sticky="nsew")
         right.rowconfigure(1, weight=1)
@@ -104,221 +205,579 @@ class AbsorbanceApp:
         self.tilte2 = ttk.Label(info_frame, text="\tAI小程序", font=('KaiTi', 45, 'bold'), foreground="#cf0002", background='#ffffff')
         self.tilte2.grid(row=1, column=1, sticky="w", padx=200, pady=0)
 
-        self.fig, self.ax = plt.subplots(figsize=(10, 9), dpi=100)
+        # 直接创建 Figure，不经过 pyplot，减少启动时的导入
+        self.fig = Figure(figsize=(10, 9), dpi=100)
+        self.ax = self.fig.add_subplot()
         # 调整图形边距
         self.fig.subplots_adjust(left=0.08, right=0.95, bottom=0.15, top=0.98)
-        # 初始只显示网格，不显示坐标轴标签
-        self.ax.grid(True, linestyle=':')
-        self.ax.set_xticks([])
-        self.ax.set_yticks([])
-        self.ax.set_xticklabels([])
-        self.ax.set_yticklabels([])
-        # 设置坐标轴范围
-        self.ax.set_xlim(45, 85)
-        self.ax.set_ylim(0, 0.9)
-
-        # 设置网格和刻度
-        self.ax.grid(True, linestyle='-', linewidth=1.5, color='gray', alpha=0.7)
-        self.ax.set_xticks(np.arange(45, 90, 5))
-        self.ax.set_yticks(np.arange(0, 1.0, 0.1))
-        # 移除图形边框
-        for spine in ['top', 'right', 'bottom', 'left']:
-            self.ax.spines[spine].set_visible(False)
         self.canvas = FigureCanvasTkAgg(self.fig, master=right)
         self.canvas.get_tk_widget().grid(row=3, column=0, sticky="nsew")
+        # 后台计算的状态与进度
+        self.status = ttk.Label(right, text="", font=('KaiTi', 20), foreground='#1e3799', background='#ffffff')
+        self.status.grid(row=4, column=0, sticky="w")
+        # 拟合后的质控信息：检出限、定量限与残差诊断
+        self.qc_panel = ttk.Label(right, text="", font=('KaiTi', 20), foreground='#2e7d32', background='#ffffff',
+                                  justify='left')
+        self.qc_panel.grid(row=6, column=0, sticky="w")
+        # 开启耗时追踪（--trace）时显示帧率与各步骤延迟
+        self.perf_label = None
+        if tracing.enabled:
+            self.perf_label = ttk.Label(right, text="", font=('Consolas', 14), foreground='#8a8a8a',
+                                        background='#ffffff')
+            self.perf_label.grid(row=5, column=0, sticky="w")
+            self.root.after(OVERLAY_INTERVAL_MS, self._update_overlay)
+        # 背景只完整绘制一次，之后散点、拟合线等通过 blit 局部重绘
+        self.renderer = BlitRenderer(self.canvas, self.ax)
+        self.player = animation.FramePlayer(self.root, self.canvas)
+        self.canvas.mpl_connect('motion_notify_event', self._on_hover)
+        # 初始只显示网格，不显示坐标轴标签
+        self.renderer.set_background('blank', apply_blank_axes)
+
+    # 数据与拟合方法都在模型中，这里只是便于界面代码读取
+    @property
+    def store(self):
+        return self.model.store
+
+    @property
+    def percentages(self):
+        return self.model.x
+
+    @property
+    def absorbances(self):
+        return self.model.y
+
+    @property
+    def qifen(self):
+        return self.model.qifen
+
+    @property
+    def fitter(self):
+        return self.model.fitter
+
+    @property
+    def cache(self):
+        return self.model.cache
+
+    @property
+    def step(self):
+        return self.view.step
+
+    def _wavelength_text(self):
+        """全光谱数据时返回当前分析波长的说明，单波长数据返回空串"""
+        if self.spectrum_fit is None:
+            return ""
+        i = self.model.wavelength_index
+        wavelength = self.store.wavelengths[i]
+        name = f"λ = {wavelength:g} nm" if np.isfinite(wavelength) else f"第{i + 1}个波长"
+        return f"分析波长：{name}（r² = {self.spectrum_fit.r[i] ** 2:.4f}）"
+
+    def _start_wavelength_selection(self):
+        """全光谱数据：后台对所有波长批量拟合，选出最佳分析波长"""
+        self.executor.cancel_all('wavelength')
+        self.spectrum_fit = None
+        if self.store.n_wavelengths > 1:
+            self._set_status("正在选择分析波长…")
+            # 换数据时重新调用，未完成的旧任务被取消，不会再回调
+            self.executor.submit(self._select_wavelength, self.store, self.percentages,
+                                 on_done=self._on_wavelength_selected, on_error=self._on_job_error,
+                                 group='wavelength')
+
+    def load(self, path):
+        """在后台读入数据文件，读完后替换当前数据（启动时读大文件也不阻塞窗口）"""
+        self._set_status("正在读取数据…")
+        self.executor.cancel_all('load')
+        self.executor.submit(open_store, path, on_done=self._on_store_loaded, on_error=self._on_job_error,
+                             group='load')
+
+    def _on_store_loaded(self, store):
+        # 先清屏再换数据，已显示的图层不必按新数据重算
+        self.view.goto(BLANK)
+        self.model.set_store(store)
+        self._set_status(f"已读入 {store.n_standards} 个标准溶液")
+        self._start_wavelength_selection()
+
+    def _select_wavelength(self, store, percentages):
+        """后台任务：全波长批量拟合并按设定标准选出分析波长"""
+        def compute():
+            fit = fit_spectra(percentages, store.absorbances)
+            return best_wavelength(fit, self.wavelength_criterion), fit
+        key = dataset_key('spectra', percentages, store.absorbances, criterion=self.wavelength_criterion)
+        return self.cache.get_or_compute(key, compute)
+
+    def _on_wavelength_selected(self, result):
+        index, self.spectrum_fit = result
+        # 只换模型数据：视图只重算、重画依赖数据的图层，不重走按钮流程，也不再弹出拟合结果
+        self.model.use_wavelength(index)
+        self._set_status(self._wavelength_text())
+
+    def _on_model_changed(self, changes):
+        if DATA in changes:
+            self._populate_table()
+        # 预渲染的是旧数据或旧拟合方法的帧
+        self.executor.cancel_all('prerender')
+        if self.step in (AXES, SCATTER):
+            self._prerender()
 
     def _populate_table(self):
-        for i, (p, a) in enumerate(zip(self.percentages, self.absorbances)):
-            tag = 'even' if i % 2 == 0 else 'odd'
-            self.table.insert("", "end", values=(f"{p:.0f}%", f"{a:.3f}"), tags=(tag,))
+        self.table.set_data(self.percentages, self.absorbances)
 
     def _clear_cursor(self):
-        """清理mplcursors对象"""
+        """移除拟合线上已显示的数值提示（光标随拟合线复用，不再每次重建）"""
         if self.cursor is not None:
-            try:
-                self.cursor.remove()
-            except:
-                pass
-            self.cursor = None
+            for selection in list(self.cursor.selections):
+                self.cursor.remove_selection(selection)
 
+    @tracing.traced('messagebox')
     def show_custom_messagebox(self, title, message):
-        """创建自定义的大字体消息框"""
-        dialog = tk.Toplevel(self.root)
+        """大字体消息框；窗口只创建一次，之后更新文字再显示，长时间运行不会积累窗口"""
+        if self.dialog is None:
+            self._make_dialog()
+        dialog = self.dialog
         dialog.title(title)
-        dialog.geometry("650x500")
-        dialog.resizable(False, False)
-        dialog.configure(background='#f0f7f0')
-
-        # 居中显示
-        dialog.transient(self.root)
-        dialog.grab_set()
+        self.dialog_label.config(text=message)
 
         # 设置对话框位置居中
-        dialog.update_idletasks()
         x = (dialog.winfo_screenwidth() // 2) - (650 // 2)
         y = (dialog.winfo_screenheight() // 2) - (500 // 2)
         dialog.geometry(f"650x500+{x}+{y}")
+        dialog.deiconify()
+        dialog.grab_set()
+        dialog.focus_set()
+
+    def _make_dialog(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.withdraw()
+        dialog.resizable(False, False)
+        dialog.configure(background='#f0f7f0')
+        dialog.transient(self.root)
 
         # 创建消息标签
-        message_label = ttk.Label(dialog, text=message, font=('KaiTi', 30),
-                                  justify='center', background='#f0f7f0')
-        message_label.pack(expand=True, fill='both', padx=20, pady=20)
+        self.dialog_label = ttk.Label(dialog, text="", font=('KaiTi', 30), justify='center', background='#f0f7f0')
+        self.dialog_label.pack(expand=True, fill='both', padx=20, pady=20)
 
         # 确定按钮
-        ok_button = ttk.Button(dialog, text="确定",
-                               command=dialog.destroy,
-                               style='Custom.TButton')
-        ok_button.pack(pady=10)
+        ttk.Button(dialog, text="确定", command=self.close_dialog, style='Custom.TButton').pack(pady=10)
+
+        # 绑定回车键；关闭按钮同样只隐藏窗口
+        dialog.bind('<Return>', lambda e: self.close_dialog())
+        dialog.protocol("WM_DELETE_WINDOW", self.close_dialog)
+        self.dialog = dialog
+
+    def close_dialog(self):
+        if self.dialog is not None:
+            self.dialog.grab_release()
+            self.dialog.withdraw()
+
+    def _update_overlay(self):
+        """刷新性能信息栏：最近一秒的绘制帧率、上一帧耗时和上一步骤从点击到显示的延迟"""
+        frame = tracing.latest('draw.')
+        step = tracing.latest('latency.')
+        text = f"{tracing.rate('draw.'):.0f} fps"
+        if frame is not None:
+            text += f"  上一帧 {frame[0]} {frame[2] * 1000:.1f} ms"
+        if step is not None:
+            text += f"  {step[0]} {step[2] * 1000:.0f} ms"
+        self.perf_label.config(text=text)
+        self.root.after(OVERLAY_INTERVAL_MS, self._update_overlay)
+
+    def _record_latency(self, label):
+        if self._step_started is not None:
+            tracing.record(f"latency.{label}", self._step_started)
+            self._step_started = None
+
+    @tracing.traced('establish_coordinates')
+    def establish_coordinates(self):
+        """建立坐标轴和标签（背景已缓存时不再完整重绘）"""
+        self.renderer.set_background('coordinates', apply_coordinates)
+        self.coordinates_drawn = True
 
-        # 设置按钮样式
-        style = ttk.Style()
-        style.configure('Custom.TButton', font=('KaiTi', 20), background='#2e7d32')
+    def _set_status(self, text):
+        self.status.config(text=text)
 
-        # 绑定回车键
-        dialog.bind('<Return>', lambda e: dialog.destroy())
-        dialog.focus_set()
+    def _on_progress(self, fraction, message=None):
+        self._set_status(message or f"计算中… {fraction:.0%}")
 
-    def establish_coordinates(self):
-        """建立坐标轴和标签"""
-        # 设置坐标轴颜色和粗细
-        self.ax.spines['bottom'].set_color('green')
-        self.ax.spines['left'].set_color('green')
-        self.ax.spines['bottom'].set_linewidth(3)
-        self.ax.spines['left'].set_linewidth(3)
+    def _on_job_error(self, error):
+        self._set_status("")
+        self.show_custom_messagebox("计算出错", str(error))
 
-        
-        # 设置坐标轴标签
-        self.ax.set_xlabel("漆酚含量(%)", fontsize=32, fontname='KaiTi', color='green', weight='bold')
-        self.ax.set_ylabel("吸光度(A)", fontsize=32, fontname='KaiTi', color='green', weight='bold')
-        # 设置刻度颜色
-        self.ax.tick_params(axis='both', which='both', colors='green', width=3)
-        self.ax.xaxis.label.set_color('green')
-        self.ax.yaxis.label.set_color('green')
-        # 设置坐标轴范围
-        self.ax.set_xlim(45, 85)
-        self.ax.set_ylim(0, 0.9)
-        self.ax.set_xticks(np.arange(45, 90, 5))
-        self.ax.set_yticks(np.arange(0, 1.0, 0.1))
-        self.ax.tick_params(labelsize=14)
-        self.coordinates_drawn = True
-        self.ax.grid(True, linestyle='-', linewidth=1.5, color='gray', alpha=0.5)
-        self.canvas.draw()
-
-    def on_button(self, idx):
-        # 每次绘图前先清理之前的cursor
-        self._clear_cursor()
+    def _on_fitter_selected(self, event=None):
+        self.model.set_fitter(self.fitter_names[self.fitter_box.current()])
+        # 已显示拟合结果时视图只重新拟合、重画拟合线，散点不动；完成后照常弹出结果
+        if self.step == FIT:
+            self.on_button(3)
 
-        if idx == 1:
-            self.step = 1
-            self.ax.cla()
-            # 重新设置坐标轴
-            for spine in ['top', 'right']:
-                self.ax.spines[spine].set_visible(False)
-            self.ax.spines['bottom'].set_visible(True)
-            self.ax.spines['left'].set_visible(True)
-            self.establish_coordinates()  # 调用坐标轴设置方法
-            self.canvas.draw()
-        elif idx == 2 and self.step >= 1:
-            self.step = 2
-            self.ax.cla()
-            self.ax.scatter(self.percentages, self.absorbances, s=200, color='#1e3799')
+    def _show_axes(self, step):
+        """第 0 步只显示网格，其余步骤显示坐标轴（背景已缓存时不再完整重绘）"""
+        if step == BLANK:
+            self.renderer.set_background('blank', apply_blank_axes)
+        else:
             self.establish_coordinates()
-            self.canvas.draw()
-        elif idx == 3 and self.step >= 2:
-            self.step = 3
-            self.ax.cla()
-            self.ax.scatter(self.percentages, self.absorbances, s=200, color='#1e3799')
-            m, b = linregress(self.percentages, self.absorbances)[:2]
-
-            # 计算相关系数
-            r, _ = pearsonr(self.percentages, self.absorbances)
-
-            y_fit = m * np.array([46.0, 84.0]) + b
-            line, = self.ax.plot(np.array([46.0, 84.0]), y_fit, linestyle='-', color='#eb3b5a', linewidth=4)
-            formula = f"拟合公式：A = {m:.4f}x - {abs(b):.4f}"
-            correlation = f"相关系数：r = {r:.3f}"
-
-            # 仅在拟合曲线上启用提示
-            self.cursor = mplcursors.cursor(line, hover=0)
+        self.renderer.refresh()
+        # 动画按当前画布尺寸渲染，在主线程中取好渲染器再交给后台任务
+        self._frames = self._frame_renderer() if self.animate else None
+
+    def _on_step_done(self, step):
+        """按钮触发的步骤全部显示完（有动画时等播放结束）"""
+        if self.player.playing:
+            self.player.when_done(lambda: self._on_step_done(step))
+            return
+        if step == FIT:
+            self._fit_reported = True
+            self._set_status(self._fit_status)
+            self.show_custom_messagebox("拟合成功", self._fit_message)
+        else:
+            self._set_status(self._wavelength_text())
+        # 延迟与内存按按钮编号记录：step1 建立坐标 … step4 复位清屏
+        self._record_latency(f"step{step or 4}")
+        memory.record(f"step{step or 4}")
+
+    def _prepare_scatter(self, snapshot, frames=None):
+        """后台任务：按 x 排序散点数据（大数据量抽稀用），播放动画时再渲染散点逐个出现的帧"""
+        frames = frames or self._frames
+        sorted_xy = self.model.sorted_points(snapshot)
+        return sorted_xy, frames.frames(2, *sorted_xy) if frames is not None else None
+
+    def _prepare_fit(self, snapshot, frames=None):
+        """后台任务：完成拟合和残差诊断；播放动画时渲染拟合线扫过的帧"""
+        frames = frames or self._frames
+        method = snapshot.fitter
+        x, y = snapshot.x, snapshot.y
+        with tracing.span(f"fit.{method}", n=len(x)):
+            fit = self.model.fit(snapshot)
+        with tracing.span('fit.qc'):
+            qc = self.cache.get_or_compute(dataset_key('qc', x, y, method=method), calibration_qc, x, y, fit)
+        sweep = frames.frames(3, *self.model.sorted_points(snapshot), fit) if frames is not None else None
+        return fit, qc, sweep
+
+    def _prepare_ci(self, snapshot):
+        """后台任务：最小二乘时用自助法估计置信区间，其他拟合方法或不足三个点时为 None
+
+        反算含量的不确定度只取最小、中位、最大三个代表吸光度，不对每个标准溶液逐一反算。
+        """
+        x, y = snapshot.x, snapshot.y
+        if snapshot.fitter != 'ols' or len(x) < 3:
+            return None
+        absorbance = np.array([y.min(), np.median(y), y.max()], dtype=float)
+
+        def bootstrap():
+            with tracing.span('fit.bootstrap', n=len(x)):
+                return calibration_ci(x, y, absorbance, n_resamples=10_000, seed=0)
+        return self.cache.get_or_compute(dataset_key('ci', x, y, absorbance=absorbance), bootstrap)
+
+    def _frame_renderer(self):
+        """与当前画布同尺寸的离屏渲染器（在主线程中调用，尺寸变化时重建，帧缓存共用）"""
+        width, height = self.canvas.get_width_height(physical=True)
+        renderer = self._step_frames
+        if renderer is None or renderer.size != (width, height) or renderer.dpi != self.fig.dpi:
+            renderer = self._step_frames = animation.StepFrames(width, height, self.fig.dpi, cache=self.frame_cache)
+        return renderer
+
+    def _prerender_frames(self, snapshot, frames):
+        """后台任务：建立坐标后预先完成第二、三步的计算和渲染，点击时直接播放"""
+        self._prepare_scatter(snapshot, frames)
+        self._prepare_fit(snapshot, frames)
+
+    def _prerender(self):
+        if self.animate:
+            self.executor.cancel_all('prerender')
+            self.executor.submit(self._prerender_frames, self.model.snapshot(), self._frame_renderer(),
+                                 group='prerender')
+
+    def export_animation(self):
+        """把四个步骤的教学流程导出为 GIF/MP4，渲染和编码都在后台进行"""
+        path = filedialog.asksaveasfilename(title="导出动画", defaultextension='.gif', filetypes=ANIMATION_FILETYPES)
+        if not path:
+            return
+        self._set_status("正在导出动画…")
+        self.executor.submit(self._export_animation, path, self.model.snapshot(), self._frame_renderer(),
+                             on_done=lambda path: self._set_status(f"动画已导出：{path}"),
+                             on_error=self._on_job_error, on_progress=self._on_progress, group='export')
+
+    def _export_animation(self, path, snapshot, renderer):
+        sorted_xy = self.model.sorted_points(snapshot)
+        return animation.export(path, renderer.sequence(*sorted_xy, self.model.fit(snapshot)))
+
+    def _draw_scatter(self, result):
+        sorted_xy, frames = result
+        if frames:
+            self.player.play(frames, on_done=lambda: self._add_scatter(sorted_xy))
+        else:
+            self._add_scatter(sorted_xy)
+
+    def _add_scatter(self, sorted_xy):
+        x, y = sorted_xy
+        self.scatter = self.renderer.add_artist(lod.scatter(self.ax, x, y, presorted=True, s=200, color='#1e3799'))
+        # 悬停提示：索引建立在原始顺序的数据上，下标可直接对应漆酚含量
+        self.hover_index = PointIndex(self.ax, self.percentages, self.absorbances, radius=HOVER_RADIUS)
+        if self.hover_annotation is None:
+            self.hover_annotation = self.ax.annotate("", xy=(0, 0), xytext=(0, 0), ha="center", va="center",
+                                                     bbox=dict(), arrowprops=dict(), zorder=10)
+        self.renderer.add_artist(self.hover_annotation)
+        self.hover_annotation.set_visible(False)
+        self._hover_point = None
+        self.renderer.refresh()
+
+    def _clear_scatter(self):
+        # 尚未播放完的动画先跳到结束，其图元随后一并移除
+        self.player.finish()
+        self.hover_index = None
+        for artist in (self.scatter, self.hover_annotation):
+            if artist is not None:
+                self.renderer.remove_artist(artist)
+        self.scatter = None
+        self.renderer.refresh()
+
+    def _style_annotation(self, annotation, x, y, text):
+        """数值提示的统一样式：大字号深红色气泡，按数据点所在区域决定气泡方位"""
+        annotation.set_text(text)
+
+        if x > 75:
+            # 右上区域，气泡显示在左下
+            annotation.set_position((x - 6, y - 0.3))
+        elif x < 54:
+            annotation.set_position((x - 3, y + 0.1))
+        else:
+            # 设置气泡位置：左上角偏移
+            annotation.set_position((x - 8, y + 0.085))  # 向左向上偏移
+
+        annotation.get_bbox_patch().set(
+            fc="white",
+            ec="darkred",  # 深红色边框
+            lw=2,  # 加粗边框线宽
+            boxstyle="round,pad=0.65"  # 增加padding
+        )
+        annotation.set_fontsize(50)  # 数值大小翻倍
+        annotation.set_color("darkred")  # 深红色文字
+        annotation.set_weight("bold")  # 加粗文字
+        annotation.arrow_patch.set(
+            arrowstyle="->",  # 标准箭头样式
+            fc="darkred",  # 深红色填充
+            ec="darkred",  # 深红色边框
+            alpha=0.8,  # 稍微提高透明度
+            lw=3,  # 增加线宽让箭头更粗
+            mutation_scale=200  # 增大箭头大小，让箭头更长更明显
+        )
+
+    def _on_hover(self, event):
+        """鼠标移动时显示最近散点的数值和漆酚含量；网格索引查询与数据量基本无关，只在换点时重绘"""
+        if self.hover_index is None:
+            return
+        i = self.hover_index.nearest(event.x, event.y) if event.inaxes is self.ax else None
+        if i == self._hover_point:
+            return
+        self._hover_point = i
+        if i is None:
+            self.hover_annotation.set_visible(False)
+        else:
+            x, y = self.percentages[i], self.absorbances[i]
+            self.hover_annotation.xy = (x, y)
+            self._style_annotation(self.hover_annotation, x, y, f"x={x:.0f}%\nA={y:.3f}\n漆酚={self.qifen[i]:.2f}")
+            self.hover_annotation.set_visible(True)
+        with tracing.span('hover'):
+            self.renderer.refresh()
+
+    def _draw_fit(self, result):
+        fit, qc, frames = result
+        if frames:
+            self.player.play(frames, on_done=lambda: self._add_fit(fit, qc))
+        else:
+            self._add_fit(fit, qc)
+
+    def _fit_artist(self):
+        """拟合线与其数值提示光标，第一次拟合时创建，之后只更新数据"""
+        if self.fit_line is None:
+            self.fit_line, = self.ax.plot([], [], linestyle='-', color='#eb3b5a', linewidth=4)
+            # 仅在拟合曲线上启用提示；mplcursors 推迟到第一次拟合时再导入
+            with tracing.span('mplcursors'):
+                import mplcursors
+                self.cursor = mplcursors.cursor(self.fit_line, hover=0)
             # 增加线条的检测厚度，方便触发
-            line.set_picker(True)
-            line.set_pickradius(30)  # 增加可点击范围
+            self.fit_line.set_picker(True)
+            self.fit_line.set_pickradius(30)  # 增加可点击范围
 
             @self.cursor.connect("add")
             def on_add(sel):
                 x, y = sel.target
-                sel.annotation.set_text(f"x={x:.0f}%\ny={y:.3f}")
-
-                if x > 75:
-                    # 右上区域，气泡显示在左下
-                    sel.annotation.set_position((x - 6, y - 0.3))
-                elif x < 54:
-                    sel.annotation.set_position((x - 3, y + 0.1))
-                else:
-                    # 设置气泡位置：左上角偏移
-                    sel.annotation.set_position((x - 8, y + 0.085))  # 向左向上偏移
-
-                sel.annotation.get_bbox_patch().set(
-                    fc="white",
-                    ec="darkred",  # 深红色边框
-                    lw=2,  # 加粗边框线宽
-                    boxstyle="round,pad=0.65"  # 增加padding
-                )
-                sel.annotation.set_fontsize(50)  # 数值大小翻倍
-                sel.annotation.set_color("darkred")  # 深红色文字
-                sel.annotation.set_weight("bold")  # 加粗文字
-                sel.annotation.arrow_patch.set(
-                    arrowstyle="->",  # 标准箭头样式
-                    fc="darkred",  # 深红色填充
-                    ec="darkred",  # 深红色边框
-                    alpha=0.8,  # 稍微提高透明度
-                    lw=3,  # 增加线宽让箭头更粗
-                    mutation_scale=200  # 增大箭头大小，让箭头更长更明显
-                )
+                self._style_annotation(sel.annotation, x, y, f"x={x:.0f}%\ny={y:.3f}")
                 sel.annotation.draggable(False)
+                # 注释也作为动态图元，避免被截进背景缓存
+                self.renderer.add_artist(sel.annotation)
+        return self.fit_line
+
+    @tracing.traced('show_fit')
+    def _add_fit(self, fit, qc):
+        """在主线程中绘制拟合线，准备好结果对话框和状态栏的文字"""
+        # 直线两点即可，曲线模型取足够多的点画出弯曲
+        x_fit = np.array([46.0, 84.0]) if is_linear(fit) else np.linspace(46.0, 84.0, 200)
+        line = self._fit_artist()
+        line.set_data(x_fit, predict(fit, x_fit))
+        self.renderer.add_artist(line)
+        self.renderer.refresh()
+        self.qc_panel.config(text=summary_text(qc, self.percentages))
+        self.shown_fit = fit
+        self._update_fit_text()
+
+    def _update_fit_text(self):
+        """由显示中的拟合结果和置信区间生成对话框与状态栏的文字；置信区间后到时再调用一次"""
+        fit, ci = self.shown_fit, self.fit_ci
+        equation = f"拟合公式：A = {formula(fit)}"
+        correlation = f"相关系数：r = {fit.r:.3f}"
+        if ci:
+            interval = f"\n斜率95%置信区间：[{ci.slope.low:.4f}, {ci.slope.high:.4f}]"
+        elif fit.method == 'ols' and self.model.n >= 3:
+            interval = "\n斜率95%置信区间：计算中…"
+        else:
+            interval = ""
+        wavelength = self._wavelength_text()
+        if wavelength:
+            correlation += f"\n{wavelength}"
+        # 截距与反算含量的置信区间放在状态栏，避免对话框过长
+        self._fit_status = wavelength
+        if ci:
+            half_width = np.max(ci.concentration.high - ci.concentration.low) / 2
+            self._fit_status = (f"截距95%置信区间：[{ci.intercept.low:.3f}, {ci.intercept.high:.3f}]  "
+                                f"反算含量不确定度：±{half_width:.2f}%  {wavelength}")
+        self._fit_message = f"{'线性' if is_linear(fit) else '曲线'}拟合完成（{FITTERS[fit.method][0]}）\n\n{equation}{interval}\n\n{correlation}\n\n点击拟合线查看具体数值"
+
+    def _clear_fit(self):
+        self.player.finish()
+        self._clear_cursor()
+        if self.fit_line is not None:
+            self.renderer.remove_artist(self.fit_line)
+        self.shown_fit = None
+        self.qc_panel.config(text="")
+        self.renderer.refresh()
+
+    def _draw_ci(self, ci):
+        self.fit_ci = ci
+        if self.shown_fit is None:
+            return  # 拟合线还在计算或播放，显示时会用到
+        message = self._fit_message
+        self._update_fit_text()
+        if self._fit_reported:
+            # 结果已经显示：更新状态栏，对话框仍显示这次拟合结果时一并更新
+            self._set_status(self._fit_status)
+            if self.dialog is not None and self.dialog_label.cget('text') == message:
+                self.dialog_label.config(text=self._fit_message)
+
+    def _clear_ci(self):
+        self.fit_ci = None
+
+    def toggle_live(self):
+        if self.live_source is None:
+            self.start_live()
+        else:
+            self.stop_live()
+
+    def start_live(self, source=None):
+        """开始实时采集：读数由后台线程写入环形缓冲区，界面按 LIVE_FPS 刷新滚动标定和散点"""
+        self.on_button(1)
+        self.live_buffer.clear()
+        self.live_source = (source or open_source(self.live, self.live_buffer)).start()
+        self._live_total = -1
+        self.live_scatter = self.renderer.add_artist(self.ax.scatter([], [], s=20, color='#1e3799'))
+        self.live_line = self.renderer.add_artist(
+            self.ax.plot([46.0, 84.0], [np.nan, np.nan], linestyle='-', color='#eb3b5a', linewidth=4)[0])
+        self.live_text = self.renderer.add_artist(
+            self.ax.text(0.03, 0.95, "", transform=self.ax.transAxes, va='top', fontsize=20, color='#eb3b5a'))
+        # 实时画面不属于四步流程的图层，下次点击按钮时移除
+        self.live_artists = [self.live_scatter, self.live_line, self.live_text]
+        if self.live:
+            self.live_button.config(text="停止采集")
+        self._live_started = time.perf_counter()
+        self._live_frame()
+
+    def stop_live(self):
+        """停止采集，画面保留最后一帧"""
+        if self._live_after is not None:
+            self.root.after_cancel(self._live_after)
+            self._live_after = None
+        if self.live_source is not None:
+            self.live_source.stop()
+            self.live_source = None
+        if self.live:
+            self.live_button.config(text="实时采集")
+
+    def _live_frame(self):
+        """绘制一帧：对缓冲区快照做滚动标定并抽稀散点，只在有新读数时 blit"""
+        start = time.perf_counter()
+        self._live_after = None
+        source = self.live_source
+        if source is None:
+            return
+        if source.error is not None:
+            self.stop_live()
+            self._on_job_error(source.error)
+            return
+        rows, total = self.live_buffer.snapshot()
+        if total != self._live_total and rows.shape[0] >= 2:
+            self._live_total = total
+            x, y = lod.sort_by_x(rows[:, 0], rows[:, 1])
+            xs, ys = lod.minmax_decimate(x, y, self.ax.get_xlim(), max(int(self.ax.get_window_extent().width), 1))
+            self.live_scatter.set_offsets(np.column_stack([xs, ys]))
+            # 每帧只做闭式最小二乘，稳健/曲线拟合在停止采集后按所选方法进行
+            fit = fit_linear(x, y)
+            self.live_line.set_ydata(fit.slope * np.array([46.0, 84.0]) + fit.intercept)
+            self.live_text.set_text(f"A = {formula(fit)}\nr = {fit.r:.4f}")
+            self.renderer.refresh()
+            rate = total / max(time.perf_counter() - self._live_started, 1e-9)
+            self._set_status(f"实时采集：共 {total} 个读数（{rate:.0f} 个/秒），标定窗口 {rows.shape[0]} 个")
+        elif not source.running:
+            # 数据源已结束（如连接断开），保留最后一帧
+            self.stop_live()
+            self._set_status(f"采集结束：共 {total} 个读数")
+            return
+        tracing.record('live.frame', start)
+        # 绘制较慢时自动降低帧率，缓冲区照常接收读数，主线程不会积压
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._live_after = self.root.after(max(int(1000 / LIVE_FPS - elapsed_ms), 1), self._live_frame)
 
-            self.establish_coordinates()
-            self.canvas.draw()
-            self.show_custom_messagebox("拟合成功",
-                                        f"线性拟合完成\n\n{formula}\n\n{correlation}\n\n点击拟合线查看具体数值")
-        elif idx == 4:
-            self.step = 0
-            self.ax.cla()
-            # 初始只显示网格，不显示坐标轴标签
-            self.ax.grid(True, linestyle=':')
-            self.ax.set_xticks([])
-            self.ax.set_yticks([])
-            self.ax.set_xticklabels([])
-            self.ax.set_yticklabels([])
-            # 设置坐标轴范围
-            self.ax.set_xlim(45, 85)
-            self.ax.set_ylim(0, 0.9)
-
-            # 设置网格和刻度
-            self.ax.grid(True, linestyle='-', linewidth=1.5, color='gray', alpha=0.7)
-            self.ax.set_xticks(np.arange(45, 90, 5))
-            self.ax.set_yticks(np.arange(0, 1.0, 0.1))
-            # 移除图形边框
-            for spine in ['top', 'right', 'bottom', 'left']:
-                self.ax.spines[spine].set_visible(False)
-            self.canvas.draw()
+    def on_button(self, idx):
+        self._step_started = time.perf_counter()
+        with tracing.span(f"on_button.{idx}"):
+            self._run_step(idx)
+
+    def _run_step(self, idx):
+        # 停止实时采集并移除其画面；散点、拟合线等由视图按步骤保留或清除，尚未完成的计算随之取消
+        self._fit_reported = False
+        self.stop_live()
+        for artist in self.live_artists:
+            self.renderer.remove_artist(artist)
+        self.live_artists = []
 
+        if idx == 1:
+            self.view.goto(AXES)
+            self._prerender()
+        elif idx == 2 and self.step >= AXES:
+            self._set_status("正在绘制…")
+            self.view.goto(SCATTER)
+        elif idx == 3 and self.step >= SCATTER:
+            self._set_status("正在拟合…")
+            self.view.goto(FIT)
+        elif idx == 4:
+            self.view.goto(BLANK)
 
     def on_closing(self):
         """窗口关闭时的清理工作"""
         try:
-            # 清理mplcursors
-            self._clear_cursor()
+            # 停止后台任务、动画播放和实时采集
+            self.stop_live()
+            self.player.stop()
+            self.executor.shutdown()
+
+            # 清理mplcursors与对话框
+            if self.cursor is not None:
+                self.cursor.remove()
+            if self.dialog is not None:
+                self.dialog.destroy()
 
             # 清理matplotlib资源
             if hasattr(self, 'canvas'):
                 self.canvas.get_tk_widget().destroy()
 
             if hasattr(self, 'fig'):
-                plt.close(self.fig)
-
-            # 清理所有matplotlib图形
-            plt.close('all')
+                self.fig.clear()
 
         except Exception as e:
             print(f"清理资源时出错: {e}")
@@ -329,16 +788,59 @@ class AbsorbanceApp:
 
 
 if __name__ == "__main__":
-    plt.rcParams['font.sans-serif'] = ['SimHei']  # 解决中文显示问题
-    plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei']  # 解决中文显示问题
+    matplotlib.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+
+    parser = argparse.ArgumentParser(description="分光光度计法数据处理")
+    parser.add_argument('data', nargs='?',
+                        help="吸光度存储文件（见 spectrum_store.py）或 CSV/Parquet/Arrow/HDF5 测量数据，缺省为内置数据")
+    parser.add_argument('--wavelength-criterion', choices=['r2', 'sensitivity'], default='r2',
+                        help="全光谱数据选择分析波长的标准：线性(r2)或灵敏度(sensitivity)")
+    parser.add_argument('--fitter', choices=list(FITTERS), default='ols', help="默认的拟合方法")
+    parser.add_argument('--cache-dir', help="结果缓存目录，指定后重启程序仍可复用之前的拟合结果")
+    parser.add_argument('--live', metavar='SOURCE',
+                        help="实时采集数据源：sim[:速率]、tcp://主机:端口 或 serial:端口[@波特率]")
+    parser.add_argument('--live-capacity', type=int, default=DEFAULT_CAPACITY, help="实时采集保留的最近读数个数")
+    parser.add_argument('--animate', action='store_true',
+                        help="第二、三步播放过渡动画（散点逐个出现、拟合线扫过），帧在后台预先渲染")
+    parser.add_argument('--compact', action='store_true',
+                        help="紧凑模式：数据与实时读数以单精度保存、缓存更小，适合长时间运行的展示终端")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="每次按钮操作后记录内存（tracemalloc 快照差异与常驻内存），退出时输出统计")
+    parser.add_argument('--profile-startup', action='store_true', help="输出模块导入与首帧绘制耗时")
+    parser.add_argument('--trace', nargs='?', const='absorbance_trace.json', metavar='PATH',
+                        help="记录各步骤与绘制耗时并显示帧率，退出时导出 Chrome trace JSON（缺省 absorbance_trace.json）")
+    args = parser.parse_args()
+    if args.trace:
+        tracing.enable()
+    if args.memory_report:
+        memory.enable()
+    startup_profile.mark("模块导入完成")
 
     root = tk.Tk()
-    app = AbsorbanceApp(root)
+    cache = ResultCache(COMPACT_CACHE_BYTES, directory=args.cache_dir) if args.compact else ResultCache(
+        directory=args.cache_dir)
+    app = AbsorbanceApp(root, None, args.wavelength_criterion, args.fitter, cache,
+                        args.live, args.live_capacity, args.animate, args.compact)
+    if args.data:
+        app.load(args.data)  # 窗口先显示内置数据，文件在后台读入
+    startup_profile.mark("界面构建完成")
+    if args.profile_startup:
+        # 处理挂起的布局与绘制事件，即窗口首帧显示
+        root.update()
+        startup_profile.mark("首帧绘制完成")
+        startup_profile.report()
 
     try:
         root.mainloop()
     except KeyboardInterrupt:
         pass
     finally:
+        if args.trace:
+            tracing.export_chrome_trace(args.trace)
+            tracing.report()
+            print(f"耗时追踪已导出：{args.trace}", file=sys.stderr)
+        if args.memory_report:
+            memory.report()
         # 确保程序完全退出
         sys.exit(0)
@@ -0,0 +1,313 @@
+"""仪器实时采集：读数源（模拟、TCP、串口）在后台线程中写入定长环形缓冲区
+
+每个读数为一对 (漆酚含量, 吸光度)。缓冲区容量固定，写满后覆盖最旧的读数，
+采集时间再长内存也不会增长；界面按固定帧率读取快照，采集速率与绘制速率互不影响。
+
+文本数据源（TCP、串口）每行一个读数 "含量,吸光度"。
+测试用：python -m acquisition serve --port 5025 以模拟仪器的方式发送读数。
+"""
+import abc
+import argparse
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+from spectrum_store import DEFAULT_ABSORBANCES, DEFAULT_PERCENTAGES
+
+DEFAULT_CAPACITY = 100_000
+
+# 文本数据源中未完成的一行最多保留的字节数，防止异常数据使缓存无限增长
+_MAX_PENDING = 1 << 16
+
+
+class RingBuffer:
+    """定长 NumPy 环形缓冲区，线程安全；写满后覆盖最旧的读数"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, n_columns=2, dtype=float):
+        self.capacity = capacity
+        self._data = np.empty((capacity, n_columns), dtype=dtype)
+        self._head = 0  # 下一次写入的位置
+        self._size = 0
+        self.total = 0  # 累计写入的读数（含已被覆盖的）
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def extend(self, rows):
+        """写入一批读数，rows 形状为 (k, n_columns)；超过容量时只保留最后 capacity 行"""
+        rows = np.asarray(rows, dtype=self._data.dtype).reshape(-1, self._data.shape[1])
+        k = rows.shape[0]
+        with self._lock:
+            self.total += k
+            if k >= self.capacity:
+                self._data[:] = rows[k - self.capacity:]
+                self._head = 0
+                self._size = self.capacity
+                return
+            end = self._head + k
+            if end <= self.capacity:
+                self._data[self._head:end] = rows
+            else:
+                # 跨过末尾时分两段写入
+                split = self.capacity - self._head
+                self._data[self._head:] = rows[:split]
+                self._data[:end - self.capacity] = rows[split:]
+            self._head = end % self.capacity
+            self._size = min(self._size + k, self.capacity)
+
+    def snapshot(self):
+        """按写入顺序复制当前内容，返回 (rows, 累计读数)"""
+        with self._lock:
+            if self._size < self.capacity:
+                rows = self._data[:self._size].copy()
+            else:
+                rows = np.concatenate([self._data[self._head:], self._data[:self._head]])
+            return rows, self.total
+
+    def clear(self):
+        with self._lock:
+            self._head = self._size = self.total = 0
+
+
+class Source(abc.ABC):
+    """读数源：start() 后在后台线程中反复调用 read()，把读到的读数写入缓冲区
+
+    read() 返回 (k, 2) 数组，返回 None 表示数据源已结束。
+    采集线程中的异常保存在 error 中，由界面在刷新时检查。
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        try:
+            self.open()
+            while not self._stop.is_set():
+                rows = self.read()
+                if rows is None:
+                    break
+                if len(rows):
+                    self.buffer.extend(rows)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.close()
+
+    def open(self):
+        pass
+
+    @abc.abstractmethod
+    def read(self):
+        """读取下一批读数"""
+
+    def close(self):
+        pass
+
+
+class SimulatedSource(Source):
+    """模拟仪器：以 rate 个/秒的速率对内置标准溶液反复测量，吸光度带正态噪声"""
+
+    def __init__(self, buffer, rate=10_000, noise=0.005, chunk_seconds=0.01, seed=None):
+        super().__init__(buffer)
+        self.rate = rate
+        self.noise = noise
+        self.chunk_seconds = chunk_seconds
+        self._rng = np.random.default_rng(seed)
+        self._start = None
+        self._produced = 0
+
+    def open(self):
+        self._start = time.perf_counter()
+        self._produced = 0
+
+    def read(self):
+        self._stop.wait(self.chunk_seconds)
+        # 按实际经过的时间补足应产生的读数，线程调度延迟不会降低平均速率
+        due = int((time.perf_counter() - self._start) * self.rate) - self._produced
+        self._produced += due
+        return simulate_readings(due, self._rng, self.noise)
+
+
+def simulate_readings(n, rng, noise=0.005):
+    """n 个模拟读数：含量取自内置标准溶液，吸光度按内置数据插值并加噪声"""
+    x = rng.choice(DEFAULT_PERCENTAGES, n)
+    y = np.interp(x, DEFAULT_PERCENTAGES, DEFAULT_ABSORBANCES) + rng.normal(0, noise, n)
+    return np.column_stack([x, y])
+
+
+def parse_readings(text):
+    """把 "含量,吸光度" 文本行解析为 (k, 2) 数组，跳过空行和无法解析的行"""
+    lines = text.split()
+    try:
+        return np.array([line.split(',')[:2] for line in lines], dtype=float).reshape(-1, 2)
+    except ValueError:
+        pass
+    rows = []
+    for line in lines:
+        try:
+            x, y = line.split(',')[:2]
+            rows.append((float(x), float(y)))
+        except ValueError:
+            continue
+    return np.array(rows, dtype=float).reshape(-1, 2)
+
+
+class _TextSource(Source):
+    """按行读取文本读数的数据源，子类实现 _receive() 返回新到的字节（b'' 表示连接结束）"""
+
+    def __init__(self, buffer):
+        super().__init__(buffer)
+        self._pending = b''
+
+    def read(self):
+        data = self._receive()
+        if data is None:
+            return np.empty((0, 2))
+        if not data:
+            return None
+        data = self._pending + data
+        cut = data.rfind(b'\n') + 1
+        self._pending = data[cut:] if len(data) - cut <= _MAX_PENDING else b''
+        return parse_readings(data[:cut].decode('ascii', 'replace'))
+
+    @abc.abstractmethod
+    def _receive(self):
+        """新到的字节，暂无数据时返回 None"""
+
+
+class TCPSource(_TextSource):
+    """从 TCP 连接读取读数（仪器或 python -m acquisition serve）"""
+
+    def __init__(self, buffer, host, port, timeout=0.2):
+        super().__init__(buffer)
+        self.address = (host, port)
+        self.timeout = timeout
+        self._socket = None
+
+    def open(self):
+        self._socket = socket.create_connection(self.address, timeout=5)
+        self._socket.settimeout(self.timeout)  # 超时返回以便响应停止请求
+
+    def _receive(self):
+        try:
+            return self._socket.recv(1 << 16)
+        except socket.timeout:
+            return None
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class SerialSource(_TextSource):
+    """从串口读取读数，需要安装 pyserial"""
+
+    def __init__(self, buffer, port, baudrate=9600, timeout=0.2):
+        super().__init__(buffer)
+        try:
+            import serial
+        except ImportError:
+            raise ImportError("串口采集需要安装 pyserial：pip install pyserial") from None
+        self._serial_module = serial
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self._serial = None
+
+    def open(self):
+        self._serial = self._serial_module.Serial(self.port, self.baudrate, timeout=self.timeout)
+
+    def _receive(self):
+        data = self._serial.read(max(self._serial.in_waiting, 1))
+        return data or None  # 串口超时返回空字节，不代表连接结束
+
+    def close(self):
+        if self._serial is not None:
+            self._serial.close()
+            self._serial = None
+
+
+def open_source(spec, buffer):
+    """由字符串创建读数源（未启动）
+
+    sim 或 sim:速率 — 模拟仪器；tcp://主机:端口 — TCP；serial:端口[@波特率] — 串口。
+    """
+    if spec == 'sim' or spec.startswith('sim:'):
+        return SimulatedSource(buffer, rate=float(spec[4:]) if spec.startswith('sim:') else 10_000)
+    if spec.startswith('tcp://'):
+        host, _, port = spec[len('tcp://'):].rpartition(':')
+        return TCPSource(buffer, host or 'localhost', int(port))
+    if spec.startswith('serial:'):
+        port, _, baudrate = spec[len('serial:'):].partition('@')
+        return SerialSource(buffer, port, int(baudrate) if baudrate else 9600)
+    raise ValueError(f"无法识别的数据源: {spec}（可用 sim、tcp://主机:端口、serial:端口）")
+
+
+def serve(port, rate=10_000, host='localhost'):
+    """模拟仪器：接受一个连接，以 rate 个/秒的速率发送文本读数，直到对方断开"""
+    rng = np.random.default_rng()
+    with socket.create_server((host, port)) as server:
+        print(f"模拟仪器已在 {host}:{port} 等待连接", file=sys.stderr)
+        conn, address = server.accept()
+        with conn:
+            print(f"已连接：{address[0]}:{address[1]}", file=sys.stderr)
+            start = time.perf_counter()
+            sent = 0
+            while True:
+                time.sleep(0.01)
+                due = int((time.perf_counter() - start) * rate) - sent
+                rows = simulate_readings(due, rng)
+                sent += due
+                text = ''.join(f"{x:g},{y:.4f}\n" for x, y in rows)
+                try:
+                    conn.sendall(text.encode('ascii'))
+                except OSError:
+                    return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m acquisition', description="实时采集工具")
+    commands = parser.add_subparsers(dest='command', required=True)
+    server = commands.add_parser('serve', help="在本机端口上模拟仪器发送读数")
+    server.add_argument('--host', default='localhost')
+    server.add_argument('--port', type=int, default=5025)
+    server.add_argument('--rate', type=float, default=10_000, help="每秒读数")
+    args = parser.parse_args(argv)
+    try:
+        serve(args.port, args.rate, args.host)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""教学流程动画：后台预先渲染四个步骤及过渡帧（RGBA 位图），播放时只把位图换到画布上
+
+第二步散点按数据顺序逐个出现，第三步拟合线从左向右扫过。帧在离屏 Agg 画布上绘制：
+静态部分（网格、坐标轴、标签、已出现的散点）每个步骤只完整绘制一次，其余各帧恢复背景后
+只画变化的图元。结果按数据内容、拟合结果和画面尺寸缓存，重复演示时直接取用。
+
+整个流程可导出为 GIF（Pillow）或 MP4（本机 ffmpeg）：
+
+    python -m animation 演示.gif [数据文件] --fitter ols --fps 25
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+from cache import ResultCache, dataset_key
+from fitters import formula, is_linear, predict, FITTERS
+import lod
+from render import apply_blank_axes, apply_coordinates
+import tracing
+from workers import check_cancelled, report_progress
+
+# 每个过渡动画的最多帧数与帧间隔
+TWEEN_FRAMES = 12
+FRAME_INTERVAL_MS = 40
+# 导出时每个步骤的完整画面停留的时间
+HOLD_MS = 1200
+# 帧缓存的内存上限（界面大小时每帧约 4 MB）
+FRAME_CACHE_BYTES = 256 << 20
+# 与界面画布相同的边距
+SUBPLOT_PARAMS = dict(left=0.08, right=0.95, bottom=0.15, top=0.98)
+# 导出格式 → 扩展名
+EXPORT_FORMATS = {'.gif': 'gif', '.mp4': 'mp4'}
+
+
+class StepFrames:
+    """离屏渲染器：与界面画布同尺寸、同版式，按步骤生成 RGBA 帧（形状为 高×宽×4 的 uint8 数组）
+
+    只有一张离屏画布，不同线程的请求依次渲染；已缓存的帧可在任意线程直接取用。
+    """
+
+    def __init__(self, width, height, dpi=100, cache=None, tween=TWEEN_FRAMES, subplot_params=SUBPLOT_PARAMS):
+        self.size = (int(width), int(height))
+        self.dpi = dpi
+        self.tween = tween
+        self.subplot_params = subplot_params
+        self.cache = cache if cache is not None else ResultCache(FRAME_CACHE_BYTES)
+        self._ax = None
+        self._lock = threading.Lock()
+
+    def _axes(self):
+        if self._ax is None:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            width, height = self.size
+            fig = Figure(figsize=(width / self.dpi, height / self.dpi), dpi=self.dpi)
+            FigureCanvasAgg(fig)
+            self._ax = fig.add_subplot()
+            fig.subplots_adjust(**self.subplot_params)
+        return self._ax
+
+    def frames(self, step, x=None, y=None, fit=None, annotate=False):
+        """第 step 步的帧列表：0 空白网格、1 坐标轴、2 散点逐个出现、3 拟合线扫过
+
+        最后一帧为该步骤的完整画面。x、y 为第二、三步的数据（lod.sort_by_x 的结果），
+        fit 为第三步的拟合结果；annotate=True 时第三步末帧写上拟合公式（导出用）。
+        """
+        if step < 2:
+            x = y = None
+        if step < 3:
+            fit = None
+            annotate = False
+        key = dataset_key('frames', x, y, fit, step=step, annotate=annotate, size=self.size, dpi=self.dpi,
+                          tween=self.tween)
+        frames = self.cache.get(key)
+        if frames is None:
+            frames = self._render(step, x, y, fit, annotate)
+            self.cache.put(key, frames, nbytes=sum(frame.nbytes for frame in frames))
+        return frames
+
+    def _render(self, step, x, y, fit, annotate):
+        with self._lock, tracing.span(f"animation.render{step}"):
+            ax = self._axes()
+            canvas = ax.figure.canvas
+            # cla() 不会清除 tick_params 的设置，按界面的顺序先设空白网格再建坐标，画面才完全一致
+            apply_blank_axes(ax)
+            if step > 0:
+                apply_coordinates(ax)
+            if step < 2:
+                canvas.draw()
+                return [self._capture(canvas)]
+
+            # 界面中散点是 blit 在背景之上的动态图元（压在网格线上面），这里也在完整绘制之后单独画
+            points = lod.scatter(ax, x, y, presorted=True, s=200, color='#1e3799', animated=True)
+            canvas.draw()
+            if step == 2:
+                frames = self._reveal_points(ax, points)
+            else:
+                ax.draw_artist(points)
+                frames = self._sweep_line(ax, fit, annotate)
+            ax.cla()
+            return frames
+
+    def _capture(self, canvas):
+        return np.array(canvas.buffer_rgba())
+
+    def _reveal_points(self, ax, points):
+        """散点按数据顺序逐个出现；点数多于帧数时每帧出现一批"""
+        canvas = ax.figure.canvas
+        offsets = np.asarray(points.get_offsets())
+        background = canvas.copy_from_bbox(ax.figure.bbox)
+        n = len(offsets)
+        count = max(min(self.tween, n), 1)
+        frames = []
+        for shown in np.ceil(n * np.arange(1, count + 1) / count).astype(int):
+            check_cancelled()
+            canvas.restore_region(background)
+            points.set_offsets(offsets[:shown])
+            ax.draw_artist(points)
+            frames.append(self._capture(canvas))
+        return frames
+
+    def _sweep_line(self, ax, fit, annotate):
+        """散点已画好并作为背景，拟合线从 x=46 向右扫到 x=84"""
+        canvas = ax.figure.canvas
+        line, = ax.plot([], [], linestyle='-', color='#eb3b5a', linewidth=4, animated=True)
+        background = canvas.copy_from_bbox(ax.figure.bbox)
+        frames = []
+        for k in range(1, self.tween + 1):
+            check_cancelled()
+            end = 46.0 + (84.0 - 46.0) * k / self.tween
+            # 直线两点即可，曲线模型按扫过的比例取足够多的点
+            x_fit = np.array([46.0, end]) if is_linear(fit) else np.linspace(46.0, end, 2 + 198 * k // self.tween)
+            line.set_data(x_fit, predict(fit, x_fit))
+            canvas.restore_region(background)
+            ax.draw_artist(line)
+            frames.append(self._capture(canvas))
+        if annotate:
+            text = ax.text(0.03, 0.95, f"A = {formula(fit)}\nr = {fit.r:.4f}", transform=ax.transAxes, va='top',
+                           fontsize=20, color='#eb3b5a', animated=True)
+            ax.draw_artist(text)
+            frames[-1] = self._capture(canvas)
+        return frames
+
+    def sequence(self, x, y, fit, annotate=True, interval=FRAME_INTERVAL_MS, hold=HOLD_MS):
+        """整个教学流程的 [(帧, 显示毫秒数)]：每步的过渡帧按 interval 播放，完整画面停留 hold
+
+        在后台任务中调用时报告进度并响应取消。
+        """
+        sequence = []
+        for step in range(4):
+            check_cancelled()
+            report_progress(step / 4, f"正在渲染第 {step + 1} 步…")
+            frames = self.frames(step, x, y, fit, annotate)
+            sequence.extend((frame, interval) for frame in frames[:-1])
+            sequence.append((frames[-1], hold))
+        return sequence
+
+
+class FramePlayer:
+    """在 Tk 主线程中按帧间隔把预渲染的位图写入画布并 blit，不经过 matplotlib 绘制"""
+
+    def __init__(self, root, canvas, interval=FRAME_INTERVAL_MS):
+        self.root = root
+        self.canvas = canvas
+        self.interval = interval
+        self._frames = None
+        self._on_done = []
+        self._after_id = None
+
+    @property
+    def playing(self):
+        return self._frames is not None
+
+    def play(self, frames, on_done=None):
+        """依次显示 frames，播放完（或画布尺寸已变化无法播放）后调用 on_done()
+
+        正在播放的上一段直接跳到结束（调用其 on_done），再开始新的一段。
+        """
+        self.finish()
+        self._frames = iter(frames)
+        self._on_done = [on_done] if on_done is not None else []
+        self._next()
+
+    def when_done(self, callback):
+        """播放结束后调用 callback()，没有在播放时立即调用"""
+        if self.playing:
+            self._on_done.append(callback)
+        else:
+            callback()
+
+    def stop(self):
+        """停止播放，不再调用 on_done"""
+        self._cancel()
+        self._on_done = []
+
+    def finish(self):
+        """停止播放并立即调用 on_done（跳到最终画面）"""
+        self._cancel()
+        callbacks, self._on_done = self._on_done, []
+        for callback in callbacks:
+            callback()
+
+    def _cancel(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._frames = None
+
+    def _next(self):
+        self._after_id = None
+        if self._frames is None:
+            return
+        frame = next(self._frames, None)
+        buffer = np.asarray(self.canvas.buffer_rgba())
+        if frame is None or frame.shape != buffer.shape:
+            # 播放结束，或帧渲染后窗口大小变了，直接显示最终画面
+            self.finish()
+            return
+        with tracing.span('draw.frame'):
+            buffer[...] = frame
+            self.canvas.blit()
+        self._after_id = self.root.after(self.interval, self._next)
+
+
+def ffmpeg_path():
+    """本机 ffmpeg 可执行文件（PATH 中或 matplotlib 的 animation.ffmpeg_path 设置），找不到时返回 None"""
+    import matplotlib
+    configured = matplotlib.rcParams['animation.ffmpeg_path']
+    return shutil.which(configured) or shutil.which('ffmpeg')
+
+
+def export(path, sequence):
+    """把 [(帧, 显示毫秒数)] 写为 GIF 或 MP4（按扩展名），返回 path"""
+    kind = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if kind is None:
+        raise ValueError(f"不支持的动画格式：{path}（可用 {', '.join(EXPORT_FORMATS)}）")
+    if not sequence:
+        raise ValueError("没有可导出的帧")
+    with tracing.span(f"animation.export.{kind}", frames=len(sequence)):
+        if kind == 'gif':
+            _write_gif(path, sequence)
+        else:
+            _write_mp4(path, sequence)
+    return path
+
+
+def _write_gif(path, sequence):
+    from PIL import Image
+
+    # 各帧颜色基本相同，用颜色最全的最后一帧生成一次调色板，其余帧直接映射
+    palette = Image.fromarray(sequence[-1][0][..., :3]).quantize(colors=255)
+    images = []
+    for i, (frame, _) in enumerate(sequence):
+        check_cancelled()
+        report_progress(i / len(sequence), "正在编码 GIF…")
+        images.append(Image.fromarray(frame[..., :3]).quantize(palette=palette, dither=Image.Dither.NONE))
+    images[0].save(path, save_all=True, append_images=images[1:], duration=[ms for _, ms in sequence],
+                   loop=0, optimize=False, disposal=1)
+
+
+def _write_mp4(path, sequence):
+    executable = ffmpeg_path()
+    if executable is None:
+        raise RuntimeError("导出 MP4 需要 ffmpeg，请安装后加入 PATH（或导出为 GIF）")
+    height, width = sequence[0][0].shape[:2]
+    # 以最短显示时间为一帧，停留的画面重复写入
+    unit = min(ms for _, ms in sequence)
+    command = [executable, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgba',
+               '-s', f"{width}x{height}", '-r', f"{1000 / unit:g}", '-i', '-',
+               # H.264 要求宽高为偶数
+               '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-c:v', 'libx264', '-pix_fmt', 'yuv420p', path]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for i, (frame, ms) in enumerate(sequence):
+            check_cancelled()
+            report_progress(i / len(sequence), "正在编码 MP4…")
+            data = frame.tobytes()
+            for _ in range(max(round(ms / unit), 1)):
+                process.stdin.write(data)
+        process.stdin.close()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    error = process.stderr.read().decode('utf-8', 'replace')
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg 编码失败：{error.strip()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m animation', description="把四个步骤的教学流程导出为动画")
+    parser.add_argument('output', help="输出文件（.gif 或 .mp4）")
+    parser.add_argument('data', nargs='?', help="测量数据或存储文件，缺省为内置数据")
+    parser.add_argument('--fitter', choices=list(FITTERS), default='ols', help="拟合方法")
+    parser.add_argument('--fps', type=float, default=1000 / FRAME_INTERVAL_MS, help="过渡动画的帧率")
+    parser.add_argument('--hold', type=float, default=HOLD_MS / 1000, help="每步完整画面停留的秒数")
+    parser.add_argument('--size', default='1000x900', help="画面像素尺寸，宽x高")
+    parser.add_argument('--dpi', type=float, default=100)
+    args = parser.parse_args(argv)
+
+    import matplotlib
+    matplotlib.use('Agg')
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    from fitters import fit_line
+    from spectrum_store import open_store
+
+    store = open_store(args.data)
+    x, y = lod.sort_by_x(np.asarray(store.percentages), np.asarray(store.absorbance(0)))
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    renderer = StepFrames(width, height, args.dpi)
+    sequence = renderer.sequence(x, y, fit_line(x, y, args.fitter), interval=round(1000 / args.fps),
+                                 hold=round(args.hold * 1000))
+    export(args.output, sequence)
+    print(f"已导出 {len(sequence)} 帧：{args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
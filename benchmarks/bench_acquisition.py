@@ -0,0 +1,37 @@
+"""实时采集：环形缓冲区写入吞吐量与每帧的快照、抽稀和滚动标定开销"""
+import numpy as np
+
+from acquisition import RingBuffer, parse_readings, simulate_readings
+from calibration import fit_linear
+from harness import benchmark
+import lod
+
+
+@benchmark('live.ingest', (10, 100, 1_000), number=1_000)
+def bench_ingest(chunk):
+    # 每批 chunk 个读数写入已写满的缓冲区（稳态，每次都覆盖旧读数）
+    buffer = RingBuffer(100_000)
+    rows = simulate_readings(chunk, np.random.default_rng(0))
+    buffer.extend(simulate_readings(buffer.capacity, np.random.default_rng(1)))
+    return lambda: buffer.extend(rows)
+
+
+@benchmark('live.parse', (100, 10_000))
+def bench_parse(n):
+    rows = simulate_readings(n, np.random.default_rng(0))
+    text = ''.join(f"{x:g},{y:.4f}\n" for x, y in rows)
+    return lambda: parse_readings(text)
+
+
+@benchmark('live.frame', (10_000, 100_000, 1_000_000), repeat=5)
+def bench_frame(capacity):
+    # 界面每帧的计算部分（不含 blit）：快照、排序抽稀、闭式拟合
+    buffer = RingBuffer(capacity)
+    buffer.extend(simulate_readings(capacity, np.random.default_rng(0)))
+
+    def body():
+        rows, _ = buffer.snapshot()
+        x, y = lod.sort_by_x(rows[:, 0], rows[:, 1])
+        lod.minmax_decimate(x, y, (45, 85), 800)
+        fit_linear(x, y)
+    return body
@@ -0,0 +1,23 @@
+"""吸光度 → 漆酚含量换算"""
+import numpy as np
+
+from calibration import qifen_from_absorbance
+from conversion import convert_chunks
+from harness import benchmark
+
+
+@benchmark('qifen.vectorized', (1_000_000, 10_000_000))
+def bench_qifen(n):
+    a = np.random.default_rng(0).random(n)
+    return lambda: qifen_from_absorbance(a)
+
+
+@benchmark('qifen.chunked_stream', (10_000_000,))
+def bench_stream(n):
+    a = np.random.default_rng(0).random(n)
+    chunks = [a[i:i + (1 << 20)] for i in range(0, n, 1 << 20)]
+
+    def body():
+        for _ in convert_chunks(chunks):
+            pass
+    return body
@@ -0,0 +1,67 @@
+"""数据导入导出：CSV 流式解析与列投影，Parquet/HDF5 需要可选依赖（未安装时跳过）"""
+import os
+import tempfile
+
+import numpy as np
+
+import dataio
+from harness import benchmark, SkipBenchmark
+
+_files = {}
+
+
+def _measurements(n):
+    rng = np.random.default_rng(0)
+    concentration = rng.uniform(45, 85, n)
+    concentration[::10] = np.nan  # 每十行一个样品
+    return {
+        'concentration': concentration,
+        'absorbance': rng.random(n),
+        'wavelength': np.full(n, 510.0),
+        'sample_id': np.array([f"S{i}" for i in range(n)]),
+        'timestamp': np.datetime64('2026-01-01T08:00') + np.arange(n).astype('m8[ms]'),
+    }
+
+
+def _file(n, ext):
+    """同一规模、格式的测试文件只生成一次"""
+    key = (n, ext)
+    if key not in _files:
+        path = os.path.join(tempfile.mkdtemp(prefix='bench_dataio_'), f"data{ext}")
+        try:
+            dataio.write(path, _measurements(n))
+        except ImportError as e:
+            raise SkipBenchmark(str(e))
+        _files[key] = path
+    return _files[key]
+
+
+@benchmark('io.csv_read', (100_000, 1_000_000), repeat=3)
+def bench_csv_read(n):
+    path = _file(n, '.csv')
+    return lambda: dataio.read(path)
+
+
+@benchmark('io.csv_read_projected', (1_000_000,), repeat=3)
+def bench_csv_projected(n):
+    path = _file(n, '.csv')
+    return lambda: dataio.read(path, columns=('concentration', 'absorbance'))
+
+
+@benchmark('io.csv_write', (1_000_000,), repeat=3)
+def bench_csv_write(n):
+    columns = _measurements(n)
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_dataio_'), 'out.csv')
+    return lambda: dataio.write(path, columns)
+
+
+@benchmark('io.parquet_read_projected', (1_000_000,), repeat=3)
+def bench_parquet_projected(n):
+    path = _file(n, '.parquet')
+    return lambda: dataio.read(path, columns=('concentration', 'absorbance'))
+
+
+@benchmark('io.hdf5_read_projected', (1_000_000,), repeat=3)
+def bench_hdf5_projected(n):
+    path = _file(n, '.h5')
+    return lambda: dataio.read(path, columns=('concentration', 'absorbance'))
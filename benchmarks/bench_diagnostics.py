@@ -0,0 +1,40 @@
+"""回归诊断与检出限：多组重复标定的向量化诊断，以及单组大数据量、曲线模型的诊断"""
+import numpy as np
+
+from diagnostics import calibration_qc, diagnose_batch, qc_batch
+from fitters import fit_line
+from harness import benchmark
+
+# (组数, 每组点数)，总残差数约 10^6
+SHAPES = ((1_000, 1_000), (100_000, 10))
+
+
+def _series(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.broadcast_to(np.linspace(45, 85, shape[1]), shape)
+    return x, 0.02 * x - 0.9 + rng.normal(0, 0.01, shape)
+
+
+@benchmark('qc.diagnose_batch', SHAPES)
+def bench_diagnose_batch(shape):
+    x, y = _series(shape)
+    return lambda: diagnose_batch(x, y)
+
+
+@benchmark('qc.batch_with_blanks', SHAPES)
+def bench_qc_batch(shape):
+    """拟合 + 诊断 + 每组 20 次空白（部分组只有 15 次，nan 补齐）的 LOD/LOQ"""
+    x, y = _series(shape)
+    blanks = np.random.default_rng(1).normal(0.002, 0.001, (shape[0], 20))
+    blanks[::3, 15:] = np.nan
+    return lambda: qc_batch(x, y, blanks)
+
+
+@benchmark('qc.single', ((1_000_000, 'ols'), (1_000_000, 'cubic'), (7, 'langmuir')))
+def bench_single(param):
+    n, method = param
+    rng = np.random.default_rng(0)
+    x = rng.uniform(45, 85, n)
+    y = 1.8 * x / (40 + x) - 0.3 + rng.normal(0, 0.01, n)
+    fit = fit_line(x, y, method)
+    return lambda: calibration_qc(x, y, fit)
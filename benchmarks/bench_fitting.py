@@ -0,0 +1,137 @@
+"""拟合：linregress、np.polyfit 与闭式解（calibration 模块）对比，以及稳健拟合与曲线模型"""
+import numpy as np
+
+from bootstrap import calibration_ci
+from cache import ResultCache, memoize
+from calibration import fit_linear, fit_linear_batch, fit_spectra, RunningFit
+from fitters import fit_line
+from harness import benchmark, SkipBenchmark
+from model import CalibrationModel
+from spectrum_store import SpectrumStore
+
+SIZES = (7, 10_000, 1_000_000)
+
+
+def _data(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(45, 85, n)
+    return x, 0.02 * x - 0.9 + rng.normal(0, 0.01, n)
+
+
+def _curve_data(n, seed=0):
+    # 高吸光度处趋于饱和的标准曲线
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(45, 85, n)
+    return x, 1.8 * x / (40 + x) - 0.3 + rng.normal(0, 0.01, n)
+
+
+@benchmark('fit.linregress', SIZES)
+def bench_linregress(n):
+    try:
+        from scipy.stats import linregress
+    except ImportError:
+        raise SkipBenchmark("未安装 scipy")
+    x, y = _data(n)
+    return lambda: linregress(x, y)
+
+
+@benchmark('fit.polyfit', SIZES)
+def bench_polyfit(n):
+    x, y = _data(n)
+    return lambda: (np.polyfit(x, y, 1), np.corrcoef(x, y))
+
+
+@benchmark('fit.closed_form', SIZES)
+def bench_closed_form(n):
+    x, y = _data(n)
+    return lambda: fit_linear(x, y)
+
+
+@benchmark('fit.batch_series', (1_000, 100_000))
+def bench_batch(n_series):
+    x = np.arange(50, 85, 5, dtype=float)
+    y = np.random.default_rng(0).random((n_series, x.size))
+    return lambda: fit_linear_batch(x, y)
+
+
+@benchmark('fit.spectra_500x1000')
+def bench_spectra(_):
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 100, 500)
+    a = rng.random((500, 1000))
+    return lambda: fit_spectra(x, a)
+
+
+@benchmark('fit.running_update', number=10_000)
+def bench_running_update(_):
+    x, y = _data(10_000)
+    fit = RunningFit.from_arrays(x, y)
+
+    def body():
+        fit.replace(x[0], y[0], x[0], y[0] + 0.001)
+        fit.result()
+    return body
+
+
+@benchmark('fit.bootstrap', (10_000, 100_000), repeat=3)
+def bench_bootstrap(n_resamples):
+    x, y = _data(7)
+    return lambda: calibration_ci(x, y, n_resamples=n_resamples, seed=0)
+
+
+@benchmark('fit.bootstrap_points', (1000, 10_000), repeat=3)
+def bench_bootstrap_points(n):
+    # 与界面相同：一万次重抽样，只反算最小、中位、最大三个吸光度
+    x, y = _data(n)
+    absorbance = np.array([y.min(), np.median(y), y.max()])
+    return lambda: calibration_ci(x, y, absorbance, n_resamples=10_000, seed=0)
+
+
+@benchmark('fit.robust', ('wls', 'theil_sen', 'huber', 'ransac'), repeat=3)
+def bench_robust(method):
+    x, y = _data(100_000)
+    return lambda: fit_line(x, y, method)
+
+
+@benchmark('fit.cache_hit', SIZES)
+def bench_cache_hit(n):
+    # 命中时的开销主要是对数据做哈希
+    x, y = _data(n)
+    cache = ResultCache()
+    fit = memoize(cache, 'fit')(fit_line)
+    fit(x, y, 'huber')
+    return lambda: fit(x, y, 'huber')
+
+
+@benchmark('fit.langmuir', ('cold', 'warm'), repeat=3)
+def bench_langmuir(start):
+    # 编辑一个点后重新拟合：热启动跳过网格搜索，从上一次的参数出发
+    x, y = _curve_data(100_000)
+    previous = fit_line(x, y, 'langmuir') if start == 'warm' else None
+    edited = y.copy()
+    edited[0] += 0.5
+    return lambda: fit_line(x, edited, 'langmuir', previous=previous)
+
+
+@benchmark('fit.curve', ('quadratic', 'cubic', 'langmuir'), repeat=3)
+def bench_curve(method):
+    x, y = _curve_data(100_000)
+    return lambda: fit_line(x, y, method)
+
+
+@benchmark('model.refit', ('unchanged', 'fitter_switch', 'edit_ols'))
+def bench_model_refit(change):
+    # 输入未变时按版本号直接复用（不哈希数据）；换回已算过的方法命中缓存；编辑一点后最小二乘 O(1) 更新
+    x, y = _data(1_000_000)
+    model = CalibrationModel(SpectrumStore.from_arrays(x, y[:, None]))
+    model.fit()
+    model.fit(method='wls')
+
+    def body():
+        if change == 'fitter_switch':
+            model.set_fitter('wls' if model.fitter == 'ols' else 'ols')
+        elif change == 'edit_ols':
+            model.set_point(0, y=model.y[0] + 0.001)
+            return model.fit_now()
+        return model.fit_now() or model.fit()
+    return body
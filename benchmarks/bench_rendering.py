@@ -0,0 +1,138 @@
+"""绘图：on_button 的重绘序列（Agg 后端，复用 render 模块与 AbsorbanceApp 相同的样式）"""
+import itertools
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+import lod
+from animation import StepFrames
+from cache import ResultCache
+from calibration import fit_linear
+from fitters import fit_line
+from harness import benchmark
+from picking import PointIndex
+from render import BlitRenderer, apply_blank_axes, apply_coordinates
+from spectrum_store import DEFAULT_PERCENTAGES, DEFAULT_ABSORBANCES
+
+
+def _figure():
+    fig = Figure(figsize=(10, 9), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    fig.subplots_adjust(left=0.08, right=0.95, bottom=0.15, top=0.98)
+    return fig, ax
+
+
+def _data(n):
+    if n == 7:
+        return DEFAULT_PERCENTAGES, DEFAULT_ABSORBANCES
+    rng = np.random.default_rng(0)
+    x = rng.uniform(45, 85, n)
+    return x, 0.02 * x - 0.9 + rng.normal(0, 0.01, n)
+
+
+@benchmark('render.full_redraw_sequence', (7,))
+def bench_full_redraw(n):
+    """原先每次按钮都 cla() 并完整重绘"""
+    fig, ax = _figure()
+    x, y = _data(n)
+
+    def body():
+        apply_coordinates(ax)
+        fig.canvas.draw()
+        apply_coordinates(ax)
+        ax.scatter(x, y, s=200, color='#1e3799')
+        fig.canvas.draw()
+        apply_coordinates(ax)
+        ax.scatter(x, y, s=200, color='#1e3799')
+        fit = fit_linear(x, y)
+        ax.plot([46.0, 84.0], fit.slope * np.array([46.0, 84.0]) + fit.intercept, color='#eb3b5a', linewidth=4)
+        fig.canvas.draw()
+        apply_blank_axes(ax)
+        fig.canvas.draw()
+    return body
+
+
+@benchmark('render.blit_sequence', (7, 1_000_000))
+def bench_blit(n):
+    """BlitRenderer：背景缓存后只 blit 散点和拟合线"""
+    fig, ax = _figure()
+    renderer = BlitRenderer(fig.canvas, ax)
+    x, y = lod.sort_by_x(*_data(n))
+
+    def body():
+        renderer.clear_artists()
+        renderer.set_background('coordinates', apply_coordinates)
+        renderer.refresh()
+        renderer.add_artist(lod.scatter(ax, x, y, presorted=True, s=200, color='#1e3799'))
+        renderer.refresh()
+        renderer.clear_artists()
+        renderer.add_artist(lod.scatter(ax, x, y, presorted=True, s=200, color='#1e3799'))
+        fit = fit_linear(x, y)
+        line, = ax.plot([46.0, 84.0], fit.slope * np.array([46.0, 84.0]) + fit.intercept,
+                        color='#eb3b5a', linewidth=4)
+        renderer.add_artist(line)
+        renderer.refresh()
+        renderer.set_background('blank', apply_blank_axes)
+        renderer.refresh()
+    return body
+
+
+@benchmark('render.lod_decimate', (1_000_000, 10_000_000))
+def bench_lod(n):
+    x, y = lod.sort_by_x(*_data(n))
+    return lambda: lod.minmax_decimate(x, y, (45, 85), 1000)
+
+
+@benchmark('render.hover_pick', (7, 100_000, 1_000_000), number=1_000)
+def bench_hover_pick(n):
+    # 悬停拾取：鼠标依次移到各数据点附近时的网格索引查询（索引已建立），对比 hover_scan 的全量扫描
+    fig, ax = _figure()
+    apply_coordinates(ax)
+    x, y = _data(n)
+    index = PointIndex(ax, x, y)
+    points = ax.transData.transform(np.column_stack([x, y]))[:1_000]
+    index.nearest(*points[0])
+    it = itertools.cycle(points)
+    return lambda: index.nearest(*next(it))
+
+
+@benchmark('render.hover_scan', (7, 100_000, 1_000_000), number=10)
+def bench_hover_scan(n):
+    fig, ax = _figure()
+    apply_coordinates(ax)
+    x, y = _data(n)
+    px, py = ax.transData.transform((65, 0.4))
+
+    def body():
+        xy = ax.transData.transform(np.column_stack([x, y]))
+        np.argmin((xy[:, 0] - px) ** 2 + (xy[:, 1] - py) ** 2)
+    return body
+
+
+@benchmark('render.step_frames', (7, 1_000_000), number=1)
+def bench_step_frames(n):
+    """预渲染第二、三步的过渡帧（缓存为空，即首次演示时后台的工作量）"""
+    x, y = lod.sort_by_x(*_data(n))
+    fit = fit_line(x, y, 'ols')
+
+    def body():
+        renderer = StepFrames(1000, 900, cache=ResultCache())
+        renderer.frames(2, x, y)
+        renderer.frames(3, x, y, fit)
+    return body
+
+
+@benchmark('render.frame_swap', (7,), number=100)
+def bench_frame_swap(n):
+    """播放一帧：把预渲染的位图写入画布缓冲区（FramePlayer 的工作量，不含推送到 Tk）"""
+    fig, ax = _figure()
+    fig.canvas.draw()
+    frames = StepFrames(1000, 900).frames(3, *lod.sort_by_x(*_data(n)), fit_line(*_data(n), 'ols'))
+    it = itertools.cycle(frames)
+    buffer = np.asarray(fig.canvas.buffer_rgba())
+
+    def body():
+        buffer[...] = next(it)
+    return body
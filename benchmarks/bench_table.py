@@ -0,0 +1,35 @@
+"""表格：_populate_table 填充 N 行数据（需要显示器，无显示环境时跳过）"""
+from types import SimpleNamespace
+
+import numpy as np
+
+from harness import benchmark, SkipBenchmark
+
+_root = None
+
+
+def _tk_root():
+    global _root
+    if _root is None:
+        import tkinter as tk
+        try:
+            _root = tk.Tk()
+        except tk.TclError as e:
+            raise SkipBenchmark(f"无法创建 Tk 窗口（{e}）")
+        _root.withdraw()
+    return _root
+
+
+@benchmark('table.populate', (1_000, 50_000), repeat=3)
+def bench_populate(n):
+    from absorbance_app import AbsorbanceApp
+    from virtual_table import VirtualTable
+
+    root = _tk_root()
+    table = VirtualTable(root, ("pct", "abs"), (lambda p: f"{p:.0f}%", lambda a: f"{a:.3f}"))
+    rng = np.random.default_rng(0)
+    app = SimpleNamespace(table=table, percentages=rng.uniform(45, 85, n), absorbances=rng.random(n))
+
+    def body():
+        AbsorbanceApp._populate_table(app)
+    return body
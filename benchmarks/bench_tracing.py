@@ -0,0 +1,16 @@
+"""耗时追踪本身的开销：关闭时 span 应接近空操作"""
+from harness import benchmark
+import tracing
+
+
+@benchmark('trace.span', ('off', 'on'), number=100_000)
+def bench_span(state):
+    if state == 'on':
+        tracing.enable()
+    else:
+        tracing.disable()
+
+    def body():
+        with tracing.span('bench'):
+            pass
+    return body
@@ -0,0 +1,85 @@
+"""基准测试框架：注册、计时、保存 JSON 结果并与历史结果比较"""
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+
+_registry = []
+
+
+class SkipBenchmark(Exception):
+    """当前环境无法运行该项（如缺少可选依赖或没有显示器）"""
+
+
+def benchmark(name, params=(None,), repeat=5, number=1):
+    """注册基准测试
+
+    被装饰的函数接收参数 param，返回一个无参的可调用对象作为计时主体，
+    准备数据的开销因此不计入结果。
+    """
+    def decorator(setup):
+        for param in params:
+            _registry.append({'name': name, 'param': param, 'setup': setup,
+                              'repeat': repeat, 'number': number})
+        return setup
+    return decorator
+
+
+def run_all(pattern=None, quick=False):
+    """运行所有（或名称包含 pattern 的）基准，返回结果列表"""
+    results = []
+    for case in _registry:
+        label = case['name'] if case['param'] is None else f"{case['name']}[{case['param']}]"
+        if pattern and pattern not in label:
+            continue
+        try:
+            body = case['setup'](case['param'])
+        except SkipBenchmark as e:
+            print(f"{label:<48s} 跳过：{e}")
+            continue
+        repeat = 2 if quick else case['repeat']
+        body()  # 预热
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(case['number']):
+                body()
+            times.append((time.perf_counter() - start) / case['number'])
+        result = {'name': label, 'min': min(times), 'median': statistics.median(times),
+                  'mean': statistics.fmean(times), 'repeat': repeat}
+        print(f"{label:<48s} {result['min'] * 1000:10.3f} ms  (中位数 {result['median'] * 1000:.3f} ms)")
+        results.append(result)
+    return results
+
+
+def save(results, path):
+    """结果连同运行环境写入 JSON"""
+    import numpy as np
+    import matplotlib
+    data = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor(), 'numpy': np.__version__,
+                    'matplotlib': matplotlib.__version__},
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def compare(results, baseline_path, threshold=0.2):
+    """与历史结果比较最小耗时，变慢超过 threshold 的项视为退化，返回退化项列表"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {r['name']: r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        old = baseline.get(result['name'])
+        if old is None or old['min'] <= 0:
+            continue
+        ratio = result['min'] / old['min']
+        flag = "退化" if ratio > 1 + threshold else ("提升" if ratio < 1 - threshold else "")
+        print(f"{result['name']:<48s} {ratio:6.2f}x {flag}")
+        if ratio > 1 + threshold:
+            regressions.append((result['name'], ratio))
+    return regressions
@@ -0,0 +1,54 @@
+"""基准测试入口（无界面，使用 Agg 后端）
+
+    python benchmarks/run.py                         # 运行全部并写入 benchmarks/results/
+    python benchmarks/run.py -k fit                  # 只运行名称包含 fit 的项
+    python benchmarks/run.py --compare old.json      # 与历史结果比较，退化时返回非零
+"""
+import argparse
+import logging
+import os
+import sys
+import warnings
+from datetime import datetime
+
+import matplotlib
+matplotlib.use('Agg')
+# 无中文字体的机器上会大量提示缺字，不影响计时
+warnings.filterwarnings('ignore', message='Glyph .* missing')
+logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import harness  # noqa: E402
+import bench_acquisition, bench_dataio, bench_diagnostics, bench_fitting, bench_conversion, bench_rendering, bench_table, bench_tracing  # noqa: E402,F401
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="拟合、换算与绘图热点的基准测试")
+    parser.add_argument('-k', dest='pattern', help="只运行名称包含该字符串的基准")
+    parser.add_argument('--quick', action='store_true', help="每项只重复两次")
+    parser.add_argument('--output', help="结果 JSON 路径，默认 benchmarks/results/<时间>.json")
+    parser.add_argument('--compare', help="与该历史结果 JSON 比较")
+    parser.add_argument('--threshold', type=float, default=0.2, help="判定退化的变慢比例")
+    args = parser.parse_args(argv)
+
+    results = harness.run_all(args.pattern, args.quick)
+    output = args.output
+    if output is None:
+        os.makedirs(os.path.join(HERE, 'results'), exist_ok=True)
+        output = os.path.join(HERE, 'results', datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    harness.save(results, output)
+    print(f"结果已保存到 {output}")
+
+    if args.compare:
+        regressions = harness.compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} 项性能退化")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""标定曲线的自助法（bootstrap）与刀切法（jackknife）置信区间
+
+所有重抽样一次生成 (B, n) 的下标矩阵，用 fit_linear_batch 向量化拟合，
+B 很大时可分块交给进程池并行。
+"""
+import math
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from calibration import fit_linear_batch
+
+Interval = namedtuple('Interval', ['estimate', 'low', 'high'])
+CalibrationCI = namedtuple('CalibrationCI', ['slope', 'intercept', 'concentration', 'method', 'n_resamples'])
+
+# 单块下标矩阵的元素数上限，控制内存占用
+_BLOCK_ELEMENTS = 1 << 22
+
+
+# 自由度小于该值时对精确的分布函数二分求分位数，更大时 Cornish-Fisher 展开已足够准确
+_T_EXACT_DF = 30
+
+
+def _t_cdf(t, df):
+    """整数自由度 t 分布在 t ≥ 0 处的分布函数（Abramowitz & Stegun 26.7.3–4 的有限级数）"""
+    theta = math.atan(t / math.sqrt(df))
+    c2 = math.cos(theta) ** 2
+    if df % 2:
+        term, total = 1.0, 0.0
+        if df > 1:
+            total = term = math.cos(theta)
+            for k in range(3, df - 1, 2):
+                term *= c2 * (k - 1) / k
+                total += term
+        a = 2 / math.pi * (theta + math.sin(theta) * total)
+    else:
+        term = total = 1.0
+        for k in range(2, df - 1, 2):
+            term *= c2 * (k - 1) / k
+            total += term
+        a = math.sin(theta) * total
+    return (1 + a) / 2
+
+
+def _t_quantile(q, df):
+    """t 分布分位数，不依赖 scipy
+
+    自由度小于 _T_EXACT_DF 时对精确分布函数二分求解（相对误差 1e-10），少量点的刀切区间不会偏窄；
+    更大时用 Cornish-Fisher 展开（误差小于 1e-4）。
+    """
+    if df < _T_EXACT_DF:
+        p = max(q, 1 - q)
+        low, high = 0.0, 1.0
+        while _t_cdf(high, df) < p:
+            high *= 2
+        while high - low > 1e-10 * high:
+            mid = (low + high) / 2
+            low, high = (mid, high) if _t_cdf(mid, df) < p else (low, mid)
+        return math.copysign((low + high) / 2, q - 0.5)
+    z = NormalDist().inv_cdf(q)
+    return (z + (z ** 3 + z) / (4 * df)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+
+def _back_calculate(absorbance, slope, intercept):
+    """由吸光度反算浓度：c = (A - b) / m，slope、intercept 可为 (B,) 数组，结果形状 (B, n_abs)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (absorbance[None, :] - intercept[:, None]) / slope[:, None]
+
+
+def _fit_resamples(x, y, n_resamples, seed):
+    """生成 n_resamples 组有放回重抽样并拟合，返回 (slopes, intercepts)"""
+    rng = np.random.default_rng(seed)
+    n = x.size
+    block = max(_BLOCK_ELEMENTS // n, 1)
+    slopes = np.empty(n_resamples)
+    intercepts = np.empty(n_resamples)
+    for start in range(0, n_resamples, block):
+        stop = min(start + block, n_resamples)
+        idx = rng.integers(0, n, size=(stop - start, n))
+        fit = fit_linear_batch(x[idx], y[idx])
+        slopes[start:stop] = fit.slope
+        intercepts[start:stop] = fit.intercept
+    return slopes, intercepts
+
+
+def bootstrap_fits(x, y, n_resamples=10_000, seed=None, workers=1):
+    """自助法重抽样拟合，返回每组的 (slopes, intercepts)
+
+    workers > 1 时把重抽样分块交给进程池，各块使用独立的随机数流。
+    所有点 x 相同的退化重抽样斜率为 nan。
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size < 3:
+        raise ValueError("至少需要三个数据点才能估计置信区间")
+    if workers <= 1:
+        return _fit_resamples(x, y, n_resamples, seed)
+
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    counts = np.diff(np.linspace(0, n_resamples, workers + 1).astype(int))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_fit_resamples, [x] * workers, [y] * workers, counts, seeds))
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def jackknife_fits(x, y):
+    """刀切法：依次去掉一个点后拟合，返回每组的 (slopes, intercepts)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n < 3:
+        raise ValueError("至少需要三个数据点才能估计置信区间")
+    # 第 i 行是去掉第 i 个点后的下标
+    idx = np.broadcast_to(np.arange(n), (n, n))[~np.eye(n, dtype=bool)].reshape(n, n - 1)
+    fit = fit_linear_batch(x[idx], y[idx])
+    return fit.slope, fit.intercept
+
+
+def _percentile_interval(estimate, samples, level):
+    alpha = (1 - level) / 2 * 100
+    low, high = np.nanpercentile(samples, [alpha, 100 - alpha], axis=0)
+    return Interval(estimate, low, high)
+
+
+def _jackknife_interval(estimate, samples, level):
+    n = samples.shape[0]
+    se = np.sqrt((n - 1) / n * np.sum((samples - samples.mean(axis=0)) ** 2, axis=0))
+    half = _t_quantile(0.5 + level / 2, n - 2) * se
+    return Interval(estimate, estimate - half, estimate + half)
+
+
+def _concentration_interval(interval, estimate, absorbance, slopes, intercepts, level):
+    """按吸光度分块反算浓度并求区间，(B, n_abs) 的反算矩阵每块不超过 _BLOCK_ELEMENTS 个元素"""
+    block = max(_BLOCK_ELEMENTS // max(slopes.size, 1), 1)
+    parts = [interval(estimate[i:i + block], _back_calculate(absorbance[i:i + block], slopes, intercepts), level)
+             for i in range(0, absorbance.size, block)]
+    return Interval(estimate, np.concatenate([p.low for p in parts]), np.concatenate([p.high for p in parts]))
+
+
+def calibration_ci(x, y, absorbance=None, method='bootstrap', level=0.95,
+                   n_resamples=10_000, seed=None, workers=1):
+    """斜率、截距以及由吸光度反算浓度的置信区间
+
+    x 为标准溶液浓度，y 为吸光度；absorbance 为需要反算浓度的吸光度（缺省用 y 本身）。
+    method='bootstrap' 用百分位法，method='jackknife' 用刀切标准误 × t 分位数。
+    返回 CalibrationCI，concentration 的各字段为与 absorbance 等长的数组。
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    absorbance = np.atleast_1d(np.asarray(y if absorbance is None else absorbance, dtype=float))
+    fit = fit_linear_batch(x, y)
+    conc = _back_calculate(absorbance, fit.slope, fit.intercept)[0]
+
+    if method == 'bootstrap':
+        slopes, intercepts = bootstrap_fits(x, y, n_resamples, seed, workers)
+        interval = _percentile_interval
+    elif method == 'jackknife':
+        slopes, intercepts = jackknife_fits(x, y)
+        interval = _jackknife_interval
+    else:
+        raise ValueError(f"未知的置信区间方法: {method}")
+
+    return CalibrationCI(interval(float(fit.slope[0]), slopes, level),
+                         interval(float(fit.intercept[0]), intercepts, level),
+                         _concentration_interval(interval, conc, absorbance, slopes, intercepts, level),
+                         method, slopes.size)
@@ -0,0 +1,234 @@
+"""按数据内容哈希的结果缓存：内存 LRU（按字节数限制）+ 可选的磁盘层"""
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 128 << 20
+
+_MISSING = object()
+
+
+def dataset_key(namespace, *args, **params):
+    """由数据内容和参数生成缓存键（blake2b 十六进制摘要）
+
+    数组按 dtype、形状和字节内容参与哈希，其他参数按 repr 参与，
+    因此同一份数据无论来自哪个数组对象都得到同一个键，数据一旦修改键也随之改变。
+    """
+    h = hashlib.blake2b(namespace.encode('utf-8'), digest_size=20)
+    for value in args:
+        _hash_value(h, value)
+    for name, value in sorted(params.items()):
+        h.update(name.encode('utf-8'))
+        _hash_value(h, value)
+    return h.hexdigest()
+
+
+def _hash_value(h, value):
+    if isinstance(value, np.ndarray):
+        h.update(f"{value.dtype.str}{value.shape}".encode('ascii'))
+        h.update(np.ascontiguousarray(value).view(np.uint8).reshape(-1))
+    elif isinstance(value, (tuple, list)):
+        h.update(f"{type(value).__name__}{len(value)}".encode('ascii'))
+        for item in value:
+            _hash_value(h, item)
+    else:
+        h.update(repr(value).encode('utf-8'))
+    h.update(b'\0')
+
+
+def estimate_size(value):
+    """粗略估计对象占用的字节数（数组按 nbytes，元组逐项累加）"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def freeze(value):
+    """把结果中的数组设为只读（元组、列表逐项处理）并返回；缓存的结果由各处共用，不能原地修改"""
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            freeze(item)
+    return value
+
+
+class ResultCache:
+    """线程安全的 LRU 缓存，内存中总字节数超过 max_bytes 时淘汰最久未用的项
+
+    存入的结果中的数组设为只读（见 freeze），取用方需要修改时应先复制。
+    指定 directory 时同时把结果 pickle 到该目录，程序重启后仍可复用；
+    磁盘层总大小超过 max_disk_bytes 时按修改时间淘汰旧文件。只有字符串键会写入磁盘。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, directory=None, max_disk_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._items = OrderedDict()  # key -> (value, nbytes)
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._pending = {}  # 正在计算的键 -> 锁
+        self.hits = self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        if key in self._items:
+            return True
+        path = self._disk_path(key)
+        return path is not None and os.path.exists(path)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        value = self._disk_load(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return default
+        with self._lock:
+            self.hits += 1
+        self._memory_put(key, value, estimate_size(value))
+        return value
+
+    def put(self, key, value, nbytes=None):
+        """存入结果；nbytes 缺省时自动估计（无法估计大小的对象如位图应显式给出）"""
+        self._memory_put(key, value, estimate_size(value) if nbytes is None else nbytes)
+        self._disk_store(key, value)
+        return value
+
+    def get_or_compute(self, key, fn, *args, **kwargs):
+        """命中则直接返回，否则计算 fn(*args, **kwargs) 并缓存
+
+        多个线程同时请求同一个未命中的键时只计算一次，其余线程等待后直接取用结果。
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            pending = self._pending.setdefault(key, threading.Lock())
+        try:
+            with pending:
+                with self._lock:
+                    entry = self._items.get(key)
+                if entry is not None:
+                    return entry[0]
+                return self.put(key, fn(*args, **kwargs))
+        finally:
+            with self._lock:
+                if self._pending.get(key) is pending:
+                    del self._pending[key]
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is not None:
+                self._nbytes -= entry[1]
+
+    def clear(self):
+        """清空内存层（磁盘层保留）"""
+        with self._lock:
+            self._items.clear()
+            self._nbytes = 0
+
+    def _memory_put(self, key, value, nbytes):
+        freeze(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._nbytes -= old[1]
+            if nbytes > self.max_bytes:
+                return
+            self._items[key] = (value, nbytes)
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes:
+                _, (_, size) = self._items.popitem(last=False)
+                self._nbytes -= size
+
+    def _disk_path(self, key):
+        if self.directory is None or not isinstance(key, str):
+            return None
+        return os.path.join(self.directory, key + '.pkl')
+
+    def _disk_load(self, key):
+        path = self._disk_path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except Exception:
+            # 文件损坏或由不兼容的版本写入，视为未命中
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        os.utime(path)  # 更新修改时间，磁盘层也按最近使用淘汰
+        return value
+
+    def _disk_store(self, key, value):
+        path = self._disk_path(key)
+        if path is None:
+            return
+        tmp = None
+        try:
+            # 先写临时文件再替换，避免其他进程读到写了一半的文件
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # 磁盘层只是加速手段，写入失败（磁盘满、对象无法序列化）时忽略
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._trim_disk()
+
+    def _trim_disk(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+def memoize(cache, namespace):
+    """装饰器：按参数内容缓存函数结果，数组参数按内容哈希"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = dataset_key(namespace, *args, **kwargs)
+            return cache.get_or_compute(key, fn, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,173 @@
+"""标定曲线计算（不依赖界面，可批量向量化处理）"""
+from collections import namedtuple
+
+import numpy as np
+
+# 吸光度换算漆酚含量的默认系数：qifen = 80.81 * A - 1.076
+QIFEN_SLOPE = 80.81
+QIFEN_INTERCEPT = -1.076
+
+BatchFit = namedtuple('BatchFit', ['slope', 'intercept', 'r', 'slope_stderr', 'intercept_stderr'])
+
+
+def fit_linear_batch(x, y):
+    """对多组标定数据一次性做线性最小二乘拟合
+
+    x、y 的形状为 (n_series, n_points) 或 (n_points,)，一维输入会广播到所有组。
+    返回 BatchFit，每个字段都是长度为 n_series 的数组，结果与 scipy.stats.linregress 一致。
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    x, y = np.broadcast_arrays(x, y)
+    n = x.shape[-1]
+    if n < 2:
+        raise ValueError("每组至少需要两个数据点才能拟合")
+
+    dx = x - x.mean(axis=-1, keepdims=True)
+    dy = y - y.mean(axis=-1, keepdims=True)
+    # einsum 按行求内积，避免生成 (n_series, n_points) 的中间乘积数组
+    sxx = np.einsum('ij,ij->i', dx, dx)
+    syy = np.einsum('ij,ij->i', dy, dy)
+    sxy = np.einsum('ij,ij->i', dx, dy)
+    x_mean = x.mean(axis=-1)
+    y_mean = y.mean(axis=-1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = sxy / sxx
+        intercept = y_mean - slope * x_mean
+        r = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+        if n > 2:
+            slope_stderr = np.sqrt((1 - r ** 2) * syy / sxx / (n - 2))
+        else:
+            slope_stderr = np.zeros_like(slope)
+        intercept_stderr = slope_stderr * np.sqrt(sxx / n + x_mean ** 2)
+    return BatchFit(slope, intercept, r, slope_stderr, intercept_stderr)
+
+
+def fit_linear(x, y):
+    """单组数据的线性拟合，返回各字段为标量的 BatchFit"""
+    fit = fit_linear_batch(x, y)
+    return BatchFit(*(float(v[0]) for v in fit))
+
+
+def qifen_from_absorbance(absorbance, slope=QIFEN_SLOPE, intercept=QIFEN_INTERCEPT):
+    """由吸光度换算漆酚含量"""
+    return slope * np.asarray(absorbance, dtype=float) + intercept
+
+
+class RunningFit:
+    """维护充分统计量 (n, Σx, Σy, Σxy, Σx², Σy²)，增删改数据点时 O(1) 更新拟合结果
+
+    为减小大数值相减带来的误差，统计量基于第一个数据点平移后累加。
+    """
+
+    def __init__(self, shift_x=0.0, shift_y=0.0):
+        self.shift_x = float(shift_x)
+        self.shift_y = float(shift_y)
+        self.n = 0
+        self.sx = self.sy = self.sxy = self.sxx = self.syy = 0.0
+
+    @classmethod
+    def from_arrays(cls, x, y):
+        """由已有数据一次性累加统计量"""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        fit = cls(x[0], y[0]) if x.size else cls()
+        dx = x - fit.shift_x
+        dy = y - fit.shift_y
+        fit.n = x.size
+        fit.sx, fit.sy = float(dx.sum()), float(dy.sum())
+        fit.sxy, fit.sxx, fit.syy = float(dx @ dy), float(dx @ dx), float(dy @ dy)
+        return fit
+
+    def _accumulate(self, x, y, sign):
+        dx = x - self.shift_x
+        dy = y - self.shift_y
+        self.n += sign
+        self.sx += sign * dx
+        self.sy += sign * dy
+        self.sxy += sign * dx * dy
+        self.sxx += sign * dx * dx
+        self.syy += sign * dy * dy
+
+    def add(self, x, y):
+        self._accumulate(float(x), float(y), 1)
+
+    def remove(self, x, y):
+        self._accumulate(float(x), float(y), -1)
+
+    def replace(self, old_x, old_y, new_x, new_y):
+        """修改某个数据点"""
+        self.remove(old_x, old_y)
+        self.add(new_x, new_y)
+
+    def result(self):
+        """由当前统计量计算 BatchFit（各字段为标量）"""
+        n = self.n
+        if n < 2:
+            raise ValueError("至少需要两个数据点才能拟合")
+        # 离差平方和，舍入误差可能带来极小的负值
+        sxx = max(self.sxx - self.sx * self.sx / n, 0.0)
+        syy = max(self.syy - self.sy * self.sy / n, 0.0)
+        sxy = self.sxy - self.sx * self.sy / n
+        x_mean = self.sx / n + self.shift_x
+        y_mean = self.sy / n + self.shift_y
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.float64(sxy) / sxx
+            r = float(np.clip(sxy / np.sqrt(np.float64(sxx) * syy), -1.0, 1.0))
+            slope_stderr = np.sqrt((1 - r ** 2) * syy / sxx / (n - 2)) if n > 2 else 0.0
+        intercept = y_mean - slope * x_mean
+        intercept_stderr = slope_stderr * np.sqrt(sxx / n + x_mean ** 2)
+        return BatchFit(float(slope), float(intercept), r, float(slope_stderr), float(intercept_stderr))
+
+
+def fit_spectra(concentrations, absorbances):
+    """全光谱标定：对每个波长分别拟合 A = m·c + b
+
+    absorbances 形状为 (n_standards, n_wavelengths)，所有波长共用同一组浓度，
+    一次矩阵运算完成，返回的 BatchFit 各字段长度为 n_wavelengths。
+    """
+    x = np.asarray(concentrations, dtype=float)
+    a = np.asarray(absorbances, dtype=float)
+    n = x.size
+    if n < 2:
+        raise ValueError("至少需要两个标准溶液才能拟合")
+    if a.shape[0] != n:
+        raise ValueError("吸光度矩阵的行数应与标准溶液个数一致")
+
+    x_mean = x.mean()
+    dx = x - x_mean
+    a_mean = a.mean(axis=0)
+    da = a - a_mean
+    sxx = dx @ dx
+    sxy = dx @ da  # 矩阵-向量乘法，按列同时求协方差
+    syy = np.einsum('ij,ij->j', da, da)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = sxy / sxx
+        intercept = a_mean - slope * x_mean
+        r = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+        if n > 2:
+            slope_stderr = np.sqrt((1 - r ** 2) * syy / sxx / (n - 2))
+        else:
+            slope_stderr = np.zeros_like(slope)
+        intercept_stderr = slope_stderr * np.sqrt(sxx / n + x_mean ** 2)
+    return BatchFit(slope, intercept, r, slope_stderr, intercept_stderr)
+
+
+def best_wavelength(fit, criterion='r2', min_r2=0.99):
+    """从全光谱拟合结果中选出最佳分析波长的下标
+
+    criterion='r2' 取线性最好（r² 最大）的波长；
+    criterion='sensitivity' 在 r² ≥ min_r2 的波长中取斜率绝对值（灵敏度）最大的，
+    若没有波长满足线性要求则退回按 r² 选择。
+    """
+    r2 = np.nan_to_num(np.asarray(fit.r) ** 2, nan=-1.0)
+    if criterion == 'r2':
+        return int(np.argmax(r2))
+    if criterion != 'sensitivity':
+        raise ValueError(f"未知的波长选择标准: {criterion}")
+    sensitivity = np.where(r2 >= min_r2, np.abs(np.nan_to_num(fit.slope)), -1.0)
+    if sensitivity.max() < 0:
+        return int(np.argmax(r2))
+    return int(np.argmax(sensitivity))
@@ -0,0 +1,251 @@
+"""教室服务器的瘦客户端与压力测试（只用标准库，不加载 matplotlib、NumPy）
+
+python -m classroom_client gui http://教师机:8000      显示服务器渲染好的画面
+python -m classroom_client loadtest --clients 30      在本机模拟 30 个学生同时操作
+"""
+import argparse
+import base64
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+# 压力测试结果；latencies 为 {操作: [耗时(秒)]}
+LoadTestResult = namedtuple('LoadTestResult', ['clients', 'requests', 'elapsed', 'latencies', 'errors', 'stats'])
+
+
+class ClassroomError(Exception):
+    """服务器返回的错误（如未完成上一步、会话过期）"""
+
+
+class ClassroomClient:
+    """一个会话的客户端，同一连接上连续发送请求"""
+
+    def __init__(self, url, timeout=60):
+        parts = urlsplit(url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.state = None
+        self._connection = None
+
+    def _request(self, method, path, body=None):
+        headers = {}
+        if body is not None:
+            body = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            sent = False
+            try:
+                self._connection.request(method, path, body, headers)
+                sent = True
+                response = self._connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # 服务器关闭了空闲连接，重连一次；POST 已发出后不知服务器是否已执行（如已建好会话），不重发
+                self.close()
+                if attempt or (sent and method != 'GET'):
+                    raise
+
+    def _call(self, method, path, body=None):
+        status, data = self._request(method, path, body)
+        value = json.loads(data.decode('utf-8'))
+        if status >= 400:
+            raise ClassroomError(value.get('error', f"HTTP {status}"))
+        return value
+
+    def start(self, fitter=None):
+        """新建会话"""
+        self.state = self._call('POST', '/api/sessions', {'fitter': fitter} if fitter else None)
+        return self.state
+
+    def step(self, step):
+        """1 建立坐标、2 绘制图像、3 数据拟合、4 复位"""
+        self.state = self._call('POST', f"/api/sessions/{self.state['session']}/step/{step}")
+        return self.state
+
+    def set_fitter(self, name):
+        self.state = self._call('POST', f"/api/sessions/{self.state['session']}/fitter/{name}")
+        return self.state
+
+    def upload(self, concentrations, absorbances):
+        self.state = self._call('POST', f"/api/sessions/{self.state['session']}/data",
+                                {'concentration': list(concentrations), 'absorbance': list(absorbances)})
+        return self.state
+
+    def fitters(self):
+        return self._call('GET', '/api/fitters')
+
+    def stats(self):
+        return self._call('GET', '/api/stats')
+
+    def frame(self, fmt='png'):
+        """当前步骤的画面字节"""
+        path = self.state['frame']
+        if fmt != 'png':
+            path = path[:-len('png')] + fmt
+        status, data = self._request('GET', path)
+        if status >= 400:
+            raise ClassroomError(json.loads(data.decode('utf-8')).get('error', f"HTTP {status}"))
+        return data
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def run_gui(url):
+    """Tk 瘦客户端：按钮与桌面程序相同，画面由服务器渲染"""
+    import tkinter as tk
+    from tkinter import ttk
+
+    client = ClassroomClient(url)
+    client.start()
+    root = tk.Tk()
+    root.title("分光光度计法数据处理")
+    bar = ttk.Frame(root, padding=5)
+    bar.pack(side=tk.TOP, fill=tk.X)
+    image = ttk.Label(root)
+    image.pack(side=tk.TOP)
+    status = ttk.Label(bar, foreground='#eb3b5a')
+
+    def show():
+        photo = tk.PhotoImage(data=base64.b64encode(client.frame('png')))
+        image.configure(image=photo)
+        image.photo = photo  # 保持引用，否则图片会被回收
+        fit = client.state['fit']
+        status.configure(text=f"A = {fit['formula']}    r = {fit['r']:.4f}" if fit else "")
+
+    def run(action, *args):
+        try:
+            action(*args)
+        except ClassroomError as e:
+            status.configure(text=str(e))
+            return
+        show()
+
+    for step, text in enumerate(("建立坐标", "绘制图像", "数据拟合", "复位"), start=1):
+        ttk.Button(bar, text=text, command=lambda step=step: run(client.step, step)).pack(side=tk.LEFT, padx=2)
+    labels = client.fitters()
+    names = list(labels)
+    box = ttk.Combobox(bar, values=list(labels.values()), state='readonly', width=14)
+    box.current(names.index(client.state['fitter']))
+    box.bind('<<ComboboxSelected>>', lambda event: run(client.set_fitter, names[box.current()]))
+    box.pack(side=tk.LEFT, padx=10)
+    status.pack(side=tk.LEFT)
+    show()
+    try:
+        root.mainloop()
+    finally:
+        client.close()
+
+
+def load_test(url, clients=20, rounds=3, fitters=('ols',), fmt='png'):
+    """模拟 clients 个学生同时操作：每人 rounds 遍 建立坐标→绘制图像→数据拟合→复位，每步都取画面
+
+    学生轮流使用 fitters 中的拟合方法。返回 LoadTestResult。
+    """
+    latencies = {}
+    errors = []
+    lock = threading.Lock()
+    ready = threading.Barrier(clients)
+
+    def timed(name, action, *args):
+        start = time.perf_counter()
+        action(*args)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.setdefault(name, []).append(elapsed)
+
+    def student(i):
+        client = ClassroomClient(url)
+        try:
+            timed('session', client.start, fitters[i % len(fitters)])
+            ready.wait()  # 所有学生同时开始，模拟上课时一起点击
+            for _ in range(rounds):
+                for step in (1, 2, 3):
+                    timed(f'step{step}', client.step, step)
+                    timed('frame', client.frame, fmt)
+                timed('reset', client.step, 4)
+        except Exception as e:
+            ready.abort()
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=student, args=(i,), name=f"student-{i}") for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stats_client = ClassroomClient(url)
+    try:
+        stats = stats_client.stats()
+    finally:
+        stats_client.close()
+    requests = sum(len(values) for values in latencies.values())
+    return LoadTestResult(clients, requests, elapsed, latencies, errors, stats)
+
+
+def print_load_test(result, file=None):
+    file = file or sys.stdout
+    print(f"{result.clients} 个客户端，{result.requests} 个请求，耗时 {result.elapsed:.2f} 秒，"
+          f"{result.requests / result.elapsed:.0f} 请求/秒", file=file)
+    print(f"  {'操作':<10s}{'次数':>8s}{'平均ms':>10s}{'p50 ms':>10s}{'p95 ms':>10s}{'最大ms':>10s}", file=file)
+    for name, values in sorted(result.latencies.items()):
+        values = sorted(values)
+        p95 = values[min(int(0.95 * len(values)), len(values) - 1)]
+        print(f"  {name:<10s}{len(values):>8d}{statistics.fmean(values) * 1000:>10.2f}"
+              f"{statistics.median(values) * 1000:>10.2f}{p95 * 1000:>10.2f}{values[-1] * 1000:>10.2f}", file=file)
+    print("  服务器：" + "，".join(f"{name}={value}" for name, value in result.stats.items()), file=file)
+    for error in result.errors[:10]:
+        print(f"  出错：{error}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m classroom_client', description="教室服务器的瘦客户端与压力测试")
+    commands = parser.add_subparsers(dest='command', required=True)
+    gui = commands.add_parser('gui', help="打开瘦客户端窗口")
+    gui.add_argument('url', nargs='?', default='http://localhost:8000')
+    test = commands.add_parser('loadtest', help="模拟多个学生同时操作")
+    test.add_argument('--url', help="服务器地址，缺省时在本进程内启动一个服务器")
+    test.add_argument('-n', '--clients', type=int, default=20)
+    test.add_argument('--rounds', type=int, default=3, help="每个客户端重复整个流程的次数")
+    test.add_argument('--fitters', default='ols', help="逗号分隔的拟合方法，客户端轮流使用")
+    test.add_argument('--format', choices=['png', 'svg'], default='png')
+    args = parser.parse_args(argv)
+
+    if args.command == 'gui':
+        run_gui(args.url)
+        return 0
+
+    server = None
+    url = args.url
+    if url is None:
+        # 本进程内的服务器才需要计算相关的模块
+        import classroom_server
+        classroom_server.configure_matplotlib()
+        server = classroom_server.start_server(classroom_server.Engine(), port=0, quiet=True)
+        url = server.url
+    try:
+        result = load_test(url, args.clients, args.rounds, args.fitters.split(','), args.format)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    print_load_test(result)
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+"""教室服务器：python -m classroom_server [数据文件] --host 0.0.0.0 --port 8000
+
+一台机器集中完成拟合和出图，学生端（浏览器或 python -m classroom_client gui）只显示结果，
+不需要加载 matplotlib、scipy。每个学生是一个会话，记录所用数据、拟合方法和进行到的步骤；
+拟合结果和各步骤的 PNG/SVG 画面按数据内容缓存，所有会话共用，同一份数据只计算和渲染一次。
+只依赖标准库的 http.server（每个连接一个线程）。
+
+接口（均返回 JSON，画面除外）：
+  POST /api/sessions                       新建会话，可带 {"fitter": 名称}
+  GET  /api/sessions/<会话>                  会话状态
+  POST /api/sessions/<会话>/step/<1-4>       建立坐标、绘制图像、数据拟合、复位
+  POST /api/sessions/<会话>/fitter/<名称>     切换拟合方法
+  POST /api/sessions/<会话>/data             上传数据 {"concentration": [...], "absorbance": [...]}
+  GET  /api/fits/<数据>/<拟合方法>            拟合结果
+  GET  /api/fitters、/api/stats              拟合方法列表、缓存与会话统计
+  GET  /frames/<数据>/<拟合方法>/<步骤>.png|svg  渲染好的画面（内容不变，可长期缓存）
+"""
+import argparse
+import io
+import json
+import logging
+import secrets
+import sys
+import threading
+import time
+import warnings
+from collections import OrderedDict, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from cache import ResultCache, dataset_key
+from calibration import best_wavelength, fit_spectra
+from fitters import FITTERS, fit_line, fitter_labels, formula, is_linear
+from render import apply_blank_axes, draw_steps
+from spectrum_store import open_store
+import tracing
+
+# 画面尺寸（英寸）与分辨率，与批量出图相同的版式
+FRAME_SIZE = (10, 9)
+FRAME_DPI = 80
+FRAME_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# 学生上传的数据集最多保留的份数（按最近使用淘汰），以及闲置多久的会话被清除
+MAX_DATASETS = 256
+SESSION_TTL = 4 * 3600
+# 请求体上限
+MAX_BODY = 16 << 20
+
+Dataset = namedtuple('Dataset', ['id', 'x', 'y', 'wavelength'])
+
+
+class Engine:
+    """计算后端：数据集、拟合结果与渲染好的画面，所有会话共用一个缓存"""
+
+    def __init__(self, store=None, wavelength_criterion='r2', cache=None, max_datasets=MAX_DATASETS):
+        self.cache = cache if cache is not None else ResultCache()
+        self.max_datasets = max_datasets
+        self.renders = 0
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()  # 一个 Figure 依次渲染，结果都进缓存
+        self._axes = None
+        self.default = self.add_store(store if store is not None else open_store(), wavelength_criterion)
+
+    def add_store(self, store, wavelength_criterion='r2'):
+        """登记存储文件中的数据，多波长时按 wavelength_criterion 选出分析波长"""
+        index = 0
+        if store.n_wavelengths > 1:
+            key = dataset_key('spectra', store.percentages, store.absorbances, criterion=wavelength_criterion)
+            index = self.cache.get_or_compute(
+                key, lambda: best_wavelength(fit_spectra(store.percentages, store.absorbances), wavelength_criterion))
+        return self.add(store.percentages, store.absorbance(index), store.wavelengths[index])
+
+    def add(self, x, y, wavelength=float('nan')):
+        """登记一份数据，返回 Dataset；内容相同的数据得到同一个 id，共用缓存"""
+        x = np.array(x, dtype=float).ravel()
+        y = np.array(y, dtype=float).ravel()
+        if x.shape != y.shape:
+            raise ValueError("浓度与吸光度的个数不一致")
+        if x.size < 2 or not (np.all(np.isfinite(x)) and np.all(np.isfinite(y))):
+            raise ValueError("至少需要两个有效的数据点")
+        wavelength = float(wavelength)
+        dataset_id = dataset_key('dataset', x, y, wavelength=wavelength)[:16]
+        with self._lock:
+            dataset = self._datasets.pop(dataset_id, None) or Dataset(dataset_id, x, y, wavelength)
+            self._datasets[dataset_id] = dataset
+            while len(self._datasets) > self.max_datasets:
+                self._datasets.popitem(last=False)
+        return dataset
+
+    def get(self, dataset_id):
+        if dataset_id == self.default.id:
+            return self.default
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is None:
+                raise KeyError(f"数据 {dataset_id} 不存在或已过期")
+            self._datasets.move_to_end(dataset_id)
+            return dataset
+
+    def fit(self, dataset, method):
+        if method not in FITTERS:
+            raise ValueError(f"未知的拟合方法: {method}")
+        key = dataset_key('fit', dataset.x, dataset.y, method=method)
+        return self.cache.get_or_compute(key, self._fit, dataset, method)
+
+    def _fit(self, dataset, method):
+        with tracing.span('server.fit', method=method):
+            return fit_line(dataset.x, dataset.y, method)
+
+    def frame(self, dataset, step, fmt='png', method='ols'):
+        """第 step 步（0 空白网格，1 建立坐标，2 绘制散点，3 拟合曲线）的画面字节"""
+        if fmt not in FRAME_FORMATS:
+            raise ValueError(f"不支持的画面格式: {fmt}")
+        if step not in (0, 1, 2, 3):
+            raise ValueError(f"步骤应为 0–3：{step}")
+        # 前两步与数据无关，所有数据集共用
+        data = (dataset.x, dataset.y) if step >= 2 else ()
+        key = dataset_key('frame', *data, step=step, fmt=fmt, method=method if step >= 3 else None,
+                          size=FRAME_SIZE, dpi=FRAME_DPI)
+        return self.cache.get_or_compute(key, self._render, dataset, step, fmt, method)
+
+    def _render(self, dataset, step, fmt, method):
+        fit = self.fit(dataset, method) if step >= 3 else None
+        with self._render_lock, tracing.span('server.render', step=step, fmt=fmt):
+            if self._axes is None:
+                from matplotlib.backends.backend_agg import FigureCanvasAgg
+                from matplotlib.figure import Figure
+                figure = Figure(figsize=FRAME_SIZE, dpi=FRAME_DPI)
+                FigureCanvasAgg(figure)
+                self._axes = figure.add_subplot()
+                figure.subplots_adjust(left=0.12, right=0.95, bottom=0.15, top=0.98)
+            if step == 0:
+                apply_blank_axes(self._axes)
+            else:
+                draw_steps(self._axes, dataset.x, dataset.y, fit, step)
+            buffer = io.BytesIO()
+            self._axes.figure.savefig(buffer, format=fmt, dpi=FRAME_DPI)
+            self.renders += 1
+            return buffer.getvalue()
+
+    def prewarm(self, dataset=None, method='ols', fmt='png'):
+        """预先渲染一套画面，第一个学生点击时不必等待"""
+        dataset = dataset or self.default
+        for step in range(4):
+            self.frame(dataset, step, fmt, method)
+
+    def stats(self):
+        with self._lock:
+            datasets = len({self.default.id, *self._datasets})
+        return {'datasets': datasets, 'renders': self.renders, 'cache_hits': self.cache.hits,
+                'cache_misses': self.cache.misses, 'cache_bytes': self.cache.nbytes}
+
+
+def fit_json(fit):
+    """拟合结果 → JSON 对象（nan 写为 null）"""
+    def number(value):
+        value = float(value)
+        return value if np.isfinite(value) else None
+
+    result = {'method': fit.method, 'label': FITTERS[fit.method][0], 'formula': formula(fit), 'r': number(fit.r)}
+    if is_linear(fit):
+        result.update(slope=number(fit.slope), intercept=number(fit.intercept))
+    else:
+        result.update(params=[number(p) for p in fit.params], converged=bool(fit.converged))
+    return result
+
+
+class Session:
+    """一个学生的操作状态，与桌面程序相同：必须先建立坐标、再绘制图像、再拟合"""
+
+    def __init__(self, session_id, dataset, fitter):
+        self.id = session_id
+        self.dataset = dataset
+        self.fitter = fitter
+        self.step = 0
+        self.last_seen = time.monotonic()
+
+
+class _HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_object(body):
+    """请求体须为 JSON 对象"""
+    try:
+        value = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        raise _HTTPError(400, "请求体不是有效的 JSON") from None
+    if not isinstance(value, dict):
+        raise _HTTPError(400, "请求体应为 JSON 对象")
+    return value
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _is_number_list(value):
+    return isinstance(value, list) and all(map(_is_number, value))
+
+
+class ClassroomServer(ThreadingHTTPServer):
+    """HTTP 服务器，持有计算后端和所有会话"""
+
+    daemon_threads = True
+    request_queue_size = 128  # 全班同时连接时，默认的 5 个排队名额会让其余连接超时重试
+
+    def __init__(self, address, engine, default_fitter='ols', quiet=False):
+        super().__init__(address, _Handler)
+        self.engine = engine
+        self.default_fitter = default_fitter
+        self.quiet = quiet
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{'localhost' if host in ('0.0.0.0', '') else host}:{port}"
+
+    def create_session(self, fitter=None):
+        fitter = fitter or self.default_fitter
+        if fitter not in FITTERS:
+            raise _HTTPError(400, f"未知的拟合方法: {fitter}")
+        session = Session(secrets.token_hex(8), self.engine.default, fitter)
+        now = time.monotonic()
+        with self._sessions_lock:
+            expired = [sid for sid, s in self._sessions.items() if now - s.last_seen > SESSION_TTL]
+            for sid in expired:
+                del self._sessions[sid]
+            self._sessions[session.id] = session
+        return session
+
+    def session(self, session_id):
+        with self._sessions_lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise _HTTPError(404, f"会话 {session_id} 不存在或已过期")
+        session.last_seen = time.monotonic()
+        return session
+
+    def state(self, session):
+        dataset = session.dataset
+        if dataset is not self.engine.default:
+            # 上传的数据可能已被淘汰，重新登记（内容相同则 id 不变）
+            dataset = session.dataset = self.engine.add(dataset.x, dataset.y, dataset.wavelength)
+        state = {'session': session.id, 'dataset': dataset.id, 'n': int(dataset.x.size),
+                 'wavelength': dataset.wavelength if np.isfinite(dataset.wavelength) else None,
+                 'fitter': session.fitter, 'step': session.step,
+                 'frame': f"/frames/{dataset.id}/{session.fitter}/{session.step}.png", 'fit': None}
+        if session.step >= 3:
+            state['fit'] = fit_json(self.engine.fit(dataset, session.fitter))
+        return state
+
+    def stats(self):
+        with self._sessions_lock:
+            sessions = len(self._sessions)
+        return {'sessions': sessions, **self.engine.stats()}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 保持连接，瘦客户端连续请求时不必反复握手
+    # 响应头与响应体分两次写出，关闭 Nagle 算法以免与对方的延迟确认叠加出约 40 ms 的等待
+    disable_nagle_algorithm = True
+    server_version = 'AbsorbanceClassroom/1.0'
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method):
+        start = time.perf_counter()
+        parts = [p for p in urlsplit(self.path).path.split('/') if p]
+        try:
+            body = self._read_body() if method == 'POST' else b''
+            self._route(method, parts, body)
+        except _HTTPError as e:
+            self._send_json({'error': str(e)}, e.status)
+        except KeyError as e:
+            self._send_json({'error': e.args[0] if e.args else "不存在"}, 404)
+        except ValueError as e:
+            self._send_json({'error': str(e)}, 400)
+        except Exception:
+            # 程序错误：记录调用栈，返回 500 后关闭连接，不让处理线程带着异常退出
+            logging.exception("处理请求出错：%s %s", method, self.path)
+            self.close_connection = True
+            self._send_json({'error': "服务器内部错误"}, 500)
+        finally:
+            tracing.record(f"server.{method} /{parts[0] if parts else ''}", start)
+
+    def _route(self, method, parts, body):
+        server = self.server
+        if method == 'GET' and not parts:
+            return self._send(CLIENT_HTML.encode('utf-8'), 'text/html; charset=utf-8')
+        if method == 'GET' and len(parts) == 4 and parts[0] == 'frames':
+            return self._send_frame(*parts[1:])
+        if len(parts) < 2 or parts[0] != 'api':
+            raise _HTTPError(404, f"没有此路径: {self.path}")
+        resource, args = parts[1], parts[2:]
+        if method == 'GET' and resource == 'fitters' and not args:
+            return self._send_json(fitter_labels())
+        if method == 'GET' and resource == 'stats' and not args:
+            return self._send_json(server.stats())
+        if method == 'GET' and resource == 'fits' and len(args) == 2:
+            return self._send_json(fit_json(server.engine.fit(server.engine.get(args[0]), args[1])))
+        if resource == 'sessions':
+            if method == 'POST' and not args:
+                options = _json_object(body) if body else {}
+                fitter = options.get('fitter')
+                if fitter is not None and not isinstance(fitter, str):
+                    raise _HTTPError(400, "fitter 应为拟合方法名称")
+                return self._send_json(server.state(server.create_session(fitter)), 201)
+            if not args:
+                raise _HTTPError(405, "新建会话请使用 POST")
+            session = server.session(args[0])
+            action = args[1:]
+            if method == 'GET' and not action:
+                return self._send_json(server.state(session))
+            if method == 'POST' and len(action) == 2 and action[0] == 'step':
+                return self._send_json(server.state(self._step(session, action[1])))
+            if method == 'POST' and len(action) == 2 and action[0] == 'fitter':
+                if action[1] not in FITTERS:
+                    raise _HTTPError(400, f"未知的拟合方法: {action[1]}")
+                session.fitter = action[1]
+                return self._send_json(server.state(session))
+            if method == 'POST' and action == ['data']:
+                data = _json_object(body)
+                wavelength = data.get('wavelength')
+                if not (_is_number_list(data.get('concentration')) and _is_number_list(data.get('absorbance'))
+                        and (wavelength is None or _is_number(wavelength))):
+                    raise _HTTPError(400, "数据应为 {\"concentration\": [数值...], \"absorbance\": [数值...]}")
+                session.dataset = server.engine.add(data['concentration'], data['absorbance'],
+                                                    float('nan') if wavelength is None else wavelength)
+                session.step = min(session.step, 1)  # 与桌面程序一样，换数据后需重新绘制
+                return self._send_json(server.state(session))
+        raise _HTTPError(404, f"没有此路径: {method} {self.path}")
+
+    def _step(self, session, value):
+        try:
+            step = int(value)
+        except ValueError:
+            raise _HTTPError(400, f"步骤应为 1–4：{value}") from None
+        if step == 4:
+            session.step = 0
+        elif step in (1, 2, 3):
+            if step > session.step + 1:
+                raise _HTTPError(409, "请先完成上一步")
+            if step == 3:
+                # 先拟合，失败（如数据不足）时保持在上一步
+                self.server.engine.fit(session.dataset, session.fitter)
+            session.step = step
+        else:
+            raise _HTTPError(400, f"步骤应为 1–4：{value}")
+        return session
+
+    def _send_frame(self, dataset_id, method, name):
+        step, _, fmt = name.partition('.')
+        if not step.isdigit():
+            raise _HTTPError(404, f"没有此画面: {name}")
+        etag = f'"{dataset_id}-{method}-{name}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        engine = self.server.engine
+        data = engine.frame(engine.get(dataset_id), int(step), fmt, method)
+        # 地址由数据内容决定，内容不会变化，浏览器可长期缓存
+        self._send(data, FRAME_FORMATS[fmt], {'ETag': etag, 'Cache-Control': 'public, max-age=31536000, immutable'})
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            self.close_connection = True
+            raise _HTTPError(413, f"请求体超过 {MAX_BODY >> 20} MB")
+        return self.rfile.read(length)
+
+    def _send(self, data, content_type, headers=None, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, value, status=200):
+        self._send(json.dumps(value, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8',
+                   {'Cache-Control': 'no-store'}, status)
+
+
+# 浏览器端：只负责按按钮和显示服务器渲染好的画面
+CLIENT_HTML = """<!doctype html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>分光光度计法数据处理</title>
+<style>
+body { font-family: SimHei, sans-serif; margin: 1em; }
+button { font-size: 1.1em; margin: 0.2em; padding: 0.4em 1em; border: 0; color: #fff; background: #4CAF50; }
+button:hover { background: #45a049; }
+select { font-size: 1.1em; margin-left: 1em; }
+#status { margin-left: 1em; color: #eb3b5a; }
+img { display: block; margin-top: 0.5em; max-width: 100%; height: auto; }
+</style>
+</head>
+<body>
+<div>
+<button data-step="1">建立坐标</button><button data-step="2">绘制图像</button>
+<button data-step="3">数据拟合</button><button data-step="4">复位</button>
+<select id="fitter"></select><span id="status"></span>
+</div>
+<img id="frame" alt="">
+<script>
+let session = null;
+const status = document.getElementById('status');
+
+async function call(method, url) {
+  const response = await fetch(url, {method});
+  const data = await response.json();
+  if (!response.ok) throw new Error(data.error);
+  return data;
+}
+
+function show(state) {
+  session = state;
+  document.getElementById('frame').src = state.frame;
+  status.textContent = state.fit ? `A = ${state.fit.formula}    r = ${state.fit.r.toFixed(4)}` : '';
+}
+
+async function run(method, url) {
+  try { show(await call(method, url)); } catch (e) { status.textContent = e.message; }
+}
+
+async function init() {
+  const select = document.getElementById('fitter');
+  for (const [name, label] of Object.entries(await call('GET', '/api/fitters'))) select.add(new Option(label, name));
+  show(await call('POST', '/api/sessions'));
+  select.value = session.fitter;
+  select.onchange = () => run('POST', `/api/sessions/${session.session}/fitter/${select.value}`);
+  for (const button of document.querySelectorAll('button[data-step]')) {
+    button.onclick = () => run('POST', `/api/sessions/${session.session}/step/${button.dataset.step}`);
+  }
+}
+
+init();
+</script>
+</body>
+</html>
+"""
+
+
+def start_server(engine, host='localhost', port=8000, default_fitter='ols', quiet=False):
+    """在后台线程中启动服务器并返回（port=0 时自动选择空闲端口），用 shutdown() 停止"""
+    server = ClassroomServer((host, port), engine, default_fitter, quiet)
+    threading.Thread(target=server.serve_forever, name='ClassroomServer', daemon=True).start()
+    return server
+
+
+def configure_matplotlib():
+    import matplotlib
+    matplotlib.rcParams['font.sans-serif'] = ['SimHei']
+    matplotlib.rcParams['axes.unicode_minus'] = False
+    logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+    warnings.filterwarnings('ignore', message='Glyph .* missing', category=UserWarning)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m classroom_server', description="教室服务器：集中拟合和出图")
+    parser.add_argument('data', nargs='?', help="吸光度存储文件或 CSV/Parquet/Arrow/HDF5 测量数据，缺省为内置数据")
+    parser.add_argument('--host', default='localhost', help="监听地址，局域网内使用时设为 0.0.0.0")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--fitter', choices=list(FITTERS), default='ols', help="新会话的默认拟合方法")
+    parser.add_argument('--wavelength-criterion', choices=['r2', 'sensitivity'], default='r2',
+                        help="全光谱数据选择分析波长的标准")
+    parser.add_argument('--cache-dir', help="结果缓存目录，重启后仍可复用拟合结果")
+    parser.add_argument('-q', '--quiet', action='store_true', help="不输出每个请求的日志")
+    args = parser.parse_args(argv)
+
+    configure_matplotlib()
+    engine = Engine(open_store(args.data), args.wavelength_criterion, ResultCache(directory=args.cache_dir))
+    engine.prewarm(method=args.fitter)
+    server = ClassroomServer((args.host, args.port), engine, args.fitter, args.quiet)
+    print(f"教室服务器已启动：{server.url}（学生端用浏览器打开，或 python -m classroom_client gui {server.url}）",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
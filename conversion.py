@@ -0,0 +1,153 @@
+"""吸光度 → 漆酚含量的流式批量换算（分块读写，内存占用与文件大小无关）"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from calibration import QIFEN_SLOPE, QIFEN_INTERCEPT, fit_linear
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 每块约一百万条读数
+
+ConversionStats = namedtuple('ConversionStats', ['rows', 'seconds', 'rows_per_second'])
+
+
+def calibration_from_fit(fit):
+    """由标准曲线 A = m·x + b 求反算系数，使 x = slope·A + intercept"""
+    if fit.slope == 0:
+        raise ValueError("标准曲线斜率为0，无法反算含量")
+    return 1.0 / fit.slope, -fit.intercept / fit.slope
+
+
+def calibration_from_standards(path, delimiter=',', skip_header=1):
+    """从两列（含量, 吸光度）标准溶液文件拟合并返回反算系数"""
+    data = np.loadtxt(path, delimiter=delimiter, skiprows=skip_header, usecols=(0, 1), ndmin=2)
+    return calibration_from_fit(fit_linear(data[:, 0], data[:, 1]))
+
+
+def iter_csv_chunks(path, column=0, chunk_size=DEFAULT_CHUNK_SIZE, delimiter=',', skip_header=1):
+    """逐块读取文本文件中的一列读数，每次产出一个一维 float64 数组"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for _ in range(skip_header):
+            f.readline()
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                break
+            yield np.loadtxt(lines, delimiter=delimiter, usecols=column, ndmin=1)
+
+
+def iter_binary_chunks(path, dtype='<f8', chunk_size=DEFAULT_CHUNK_SIZE):
+    """逐块读取原始二进制读数（.npy 走内存映射，其余按 dtype 解析）
+
+    为保持内存恒定，原始二进制文件复用同一块缓冲区，产出的数组在下一次迭代前有效。
+    """
+    if os.path.splitext(str(path))[1].lower() == '.npy':
+        data = np.load(path, mmap_mode='r').reshape(-1)
+        for start in range(0, data.size, chunk_size):
+            yield np.asarray(data[start:start + chunk_size], dtype=float)
+        return
+
+    dtype = np.dtype(dtype)
+    buf = bytearray(chunk_size * dtype.itemsize)
+    view = memoryview(buf)
+    filled = 0  # 缓冲区开头上次读到、尚不足一个读数的字节（如管道等短读），与下次读到的字节拼接
+    with open(path, 'rb') as f:
+        while True:
+            nbytes = f.readinto(view[filled:])
+            if not nbytes:
+                break
+            filled += nbytes
+            count = filled // dtype.itemsize
+            if not count:
+                continue
+            yield np.frombuffer(buf, dtype=dtype, count=count)
+            used = count * dtype.itemsize
+            view[:filled - used] = view[used:filled]
+            filled -= used
+    if filled:
+        raise ValueError(f"{path} 末尾有 {filled} 个字节不足一个读数（{dtype.itemsize} 字节），文件可能不完整或 dtype 不对")
+
+
+def is_text_file(path):
+    """.csv/.txt 按文本读写，其余按二进制"""
+    return os.path.splitext(str(path))[1].lower() in ('.csv', '.txt')
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, column=0, dtype='<f8'):
+    """按扩展名选择读取方式：.csv/.txt 为文本，其余按二进制处理"""
+    if is_text_file(path):
+        return iter_csv_chunks(path, column=column, chunk_size=chunk_size)
+    return iter_binary_chunks(path, dtype=dtype, chunk_size=chunk_size)
+
+
+def convert_chunks(chunks, slope=QIFEN_SLOPE, intercept=QIFEN_INTERCEPT):
+    """对每块吸光度做换算，输出缓冲区复用以保持内存恒定"""
+    out = None
+    for chunk in chunks:
+        if out is None or out.size < chunk.size:
+            out = np.empty(chunk.size, dtype=float)
+        result = out[:chunk.size]
+        np.multiply(chunk, slope, out=result)
+        result += intercept
+        yield result
+
+
+def convert_file(src, dst, slope=QIFEN_SLOPE, intercept=QIFEN_INTERCEPT,
+                 chunk_size=DEFAULT_CHUNK_SIZE, column=0, dtype='<f8', progress=None):
+    """把 src 中的吸光度逐块换算后写入 dst，返回 ConversionStats
+
+    dst 为 .csv/.txt 时写文本，否则写 float64 原始二进制。
+    progress 若提供，会在每块写完后以 (已处理行数, 当前速率) 调用。
+    """
+    text_output = is_text_file(dst)
+    rows = 0
+    start = time.perf_counter()
+    with open(dst, 'w' if text_output else 'wb', encoding='utf-8' if text_output else None) as out:
+        if text_output:
+            out.write("qifen\n")
+        chunks = iter_chunks(src, chunk_size, column, dtype)
+        for result in convert_chunks(chunks, slope, intercept):
+            if text_output:
+                np.savetxt(out, result, fmt='%.6f')
+            else:
+                result.tofile(out)
+            rows += result.size
+            if progress is not None:
+                elapsed = time.perf_counter() - start
+                progress(rows, rows / elapsed if elapsed > 0 else 0.0)
+    seconds = time.perf_counter() - start
+    return ConversionStats(rows, seconds, rows / seconds if seconds > 0 else 0.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="吸光度批量换算漆酚含量")
+    parser.add_argument('src', help="输入读数文件（.csv/.txt/.npy 或原始二进制）")
+    parser.add_argument('dst', help="输出文件（.csv/.txt 为文本，否则为 float64 二进制）")
+    parser.add_argument('--slope', type=float, default=QIFEN_SLOPE)
+    parser.add_argument('--intercept', type=float, default=QIFEN_INTERCEPT)
+    parser.add_argument('--standards', help="由标准溶液文件（含量, 吸光度）拟合换算系数，覆盖 --slope/--intercept")
+    parser.add_argument('--column', type=int, default=0, help="文本输入中吸光度所在列")
+    parser.add_argument('--dtype', default='<f8', help="原始二进制输入的数据类型")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    slope, intercept = args.slope, args.intercept
+    if args.standards:
+        slope, intercept = calibration_from_standards(args.standards)
+
+    def report(rows, rate):
+        print(f"\r已处理 {rows} 行，{rate:,.0f} 行/秒", end='', file=sys.stderr)
+
+    stats = convert_file(args.src, args.dst, slope, intercept, args.chunk_size,
+                         args.column, args.dtype, report)
+    print(file=sys.stderr)
+    print(f"共 {stats.rows} 行，耗时 {stats.seconds:.2f} 秒，{stats.rows_per_second:,.0f} 行/秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
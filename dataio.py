@@ -0,0 +1,457 @@
+"""数据导入导出：按统一的列式结构读写 CSV、Parquet、Arrow (Feather) 与 HDF5
+
+测量数据每行一个读数，列见 MEASUREMENT_SCHEMA（含量、吸光度、波长、样品编号、时间），
+在内存中表示为 {列名: NumPy 数组}。CSV 分块流式读取，只转换需要的列（安装了 pyarrow 时用其
+多线程解析器）；Parquet、Arrow、HDF5 按列存储，读取时只读所需的列（分别需要安装 pyarrow、h5py）。
+拟合结果（RESULT_SCHEMA）可用同样的格式导出，供 LIMS 等下游系统导入。
+"""
+import csv
+import itertools
+import json
+import operator
+import os
+
+import numpy as np
+
+from calibration import qifen_from_absorbance
+from fitters import formula, inverse, is_linear
+from spectrum_store import SpectrumStore
+
+# 测量数据：含量为空（nan）的行是待测样品
+MEASUREMENT_SCHEMA = {
+    'concentration': np.dtype('f8'),
+    'absorbance': np.dtype('f8'),
+    'wavelength': np.dtype('f8'),
+    'sample_id': np.dtype('U'),
+    'timestamp': np.dtype('M8[ms]'),
+}
+
+# 拟合结果：每个吸光度一行，concentration 为由标准曲线反算的含量；曲线模型的 slope、intercept 为空
+RESULT_SCHEMA = {
+    'sample_id': np.dtype('U'),
+    'timestamp': np.dtype('M8[ms]'),
+    'wavelength': np.dtype('f8'),
+    'absorbance': np.dtype('f8'),
+    'concentration': np.dtype('f8'),
+    'qifen': np.dtype('f8'),
+    'method': np.dtype('U'),
+    'formula': np.dtype('U'),
+    'r': np.dtype('f8'),
+    'slope': np.dtype('f8'),
+    'intercept': np.dtype('f8'),
+}
+
+FORMATS = {'.csv': 'csv', '.txt': 'csv', '.parquet': 'parquet', '.pq': 'parquet',
+           '.feather': 'arrow', '.arrow': 'arrow', '.h5': 'hdf5', '.hdf5': 'hdf5'}
+
+# 流式读写时每块的行数
+CHUNK_ROWS = 100_000
+
+# 常见的中英文表头 → 标准列名（比较时忽略大小写和空格）
+_ALIASES = {
+    'conc': 'concentration', 'c': 'concentration', 'percentage': 'concentration', '浓度': 'concentration',
+    '含量': 'concentration', '浓度(%)': 'concentration', '含量(%)': 'concentration',
+    '漆酚含量': 'concentration', '漆酚含量(%)': 'concentration', '浓度含量(%)': 'concentration',
+    'abs': 'absorbance', 'a': 'absorbance', '吸光度': 'absorbance', '吸光度(a)': 'absorbance',
+    'λ': 'wavelength', 'wavelength(nm)': 'wavelength', '波长': 'wavelength', '波长(nm)': 'wavelength',
+    'sample': 'sample_id', 'id': 'sample_id', '样品': 'sample_id', '样品编号': 'sample_id', '编号': 'sample_id',
+    'time': 'timestamp', 'datetime': 'timestamp', '时间': 'timestamp',
+    '漆酚': 'qifen', '漆酚含量换算': 'qifen',
+}
+
+
+def _canonical(name):
+    key = str(name).strip().lower().replace(' ', '')
+    return _ALIASES.get(key, key)
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"不支持的文件格式: {ext or path}（可用 {', '.join(sorted(FORMATS))}）")
+    return FORMATS[ext]
+
+
+# ---------- 类型转换 ----------
+
+def _parse_floats(values):
+    """字符串转浮点数，空字符串为 nan；整列一次转换，个别格式不规范时才逐个解析"""
+    try:
+        return np.array(values, dtype=float)
+    except ValueError:
+        pass
+    text = np.asarray(values, dtype=str)
+    try:
+        return np.where(text == '', 'nan', text).astype(float)
+    except ValueError:
+        return np.array([float(v) if v.strip() else np.nan for v in text.tolist()], dtype=float)
+
+
+def _parse_datetimes(values, dtype):
+    """ISO 8601 字符串转时间，空字符串为 NaT"""
+    text = np.asarray(values, dtype=str)
+    try:
+        return np.where(text == '', 'NaT', text).astype(dtype)
+    except ValueError:
+        return np.array([v.strip() or 'NaT' for v in text.tolist()], dtype=dtype)
+
+
+def _as_dtype(values, dtype):
+    kind = dtype.kind
+    arr = np.asarray(values)
+    if arr.dtype.kind == 'O':
+        # 可选依赖读出的字符串列中，空值为 None
+        arr = np.array(['' if v is None else str(v) for v in arr.tolist()], dtype=str)
+    if kind == 'f':
+        return _parse_floats(arr) if arr.dtype.kind in 'US' else arr.astype(dtype, copy=False)
+    if kind == 'U':
+        return arr.astype(str, copy=False)
+    if kind == 'M':
+        if arr.dtype.kind in 'US':
+            return _parse_datetimes(arr, dtype)
+        if arr.dtype.kind in 'iu':
+            arr = arr.astype('i8').view('M8[ms]')  # 整数按 1970 年起的毫秒数
+        return arr.astype(dtype, copy=False)
+    raise TypeError(f"不支持的列类型: {dtype}")
+
+
+def _fill(dtype, n):
+    if dtype.kind == 'f':
+        return np.full(n, np.nan)
+    if dtype.kind == 'U':
+        return np.full(n, '', dtype='U1')
+    return np.full(n, np.datetime64('NaT'), dtype=dtype)
+
+
+def conform(columns, schema=MEASUREMENT_SCHEMA, n=None):
+    """按 schema 转换各列类型，缺少的列用缺省值（nan、空字符串、NaT）补齐，schema 外的列忽略"""
+    present = {name: columns[name] for name in schema if columns.get(name) is not None}
+    if n is None:
+        n = len(next(iter(present.values()))) if present else 0
+    result = {}
+    for name, dtype in schema.items():
+        if name in present:
+            arr = _as_dtype(present[name], dtype)
+            if arr.shape != (n,):
+                raise ValueError(f"列 {name} 的长度 {arr.size} 与其他列（{n}）不一致")
+            result[name] = arr
+        else:
+            result[name] = _fill(dtype, n)
+    return result
+
+
+def _project(schema, columns):
+    if columns is None:
+        return dict(schema)
+    unknown = [name for name in columns if name not in schema]
+    if unknown:
+        raise ValueError(f"未知的列: {', '.join(unknown)}")
+    return {name: schema[name] for name in columns}
+
+
+def concat(chunks, schema):
+    chunks = list(chunks)
+    if not chunks:
+        return conform({}, schema, 0)
+    return {name: np.concatenate([c[name] for c in chunks]) for name in schema}
+
+
+# ---------- CSV ----------
+
+def _is_number(text):
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_data_row(row, names):
+    """各数值列的字段都是数字（允许为空，至少有一个数字）"""
+    values = [v.strip() for v, name in zip(row, names) if MEASUREMENT_SCHEMA[name].kind == 'f']
+    return any(values) and all(_is_number(v) for v in values if v)
+
+
+def _csv_names(header):
+    """首行 → (标准列名, 首行是否为表头)
+
+    首行不是已知列名时按位置对应：第一列含量、第二列吸光度……（兼容原来的两列文本文件）；
+    此时若首行的数值列都是数字，说明文件没有表头，首行也是数据。
+    """
+    names = [_canonical(h) for h in header]
+    if any(name in MEASUREMENT_SCHEMA or name in RESULT_SCHEMA for name in names):
+        return names, True
+    names = list(MEASUREMENT_SCHEMA)[:len(header)]
+    return names, not _is_data_row(header, names)
+
+
+def _iter_csv(path, schema, chunk_rows, delimiter=','):
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        names, has_header = _csv_names(header)
+        try:
+            pa = _pyarrow()
+        except ImportError:
+            pa = None
+        if pa is not None:
+            yield from _iter_csv_arrow(path, names, schema, delimiter, skip_rows=1 if has_header else 0)
+            return
+        if not has_header:
+            reader = itertools.chain([header], reader)
+        positions = {name: names.index(name) for name in schema if name in names}
+        width = len(header)
+        while True:
+            rows = list(filter(None, itertools.islice(reader, chunk_rows)))  # 跳过空行
+            if not rows:
+                break
+            if min(map(len, rows)) < width:
+                rows = [row + [''] * (width - len(row)) for row in rows]  # 短行用空字段补齐
+            # 只取出并转换需要的列
+            chunk = {name: list(map(operator.itemgetter(pos), rows)) for name, pos in positions.items()}
+            yield conform(chunk, schema, len(rows))
+
+
+def _iter_csv_arrow(path, names, schema, delimiter, skip_rows=1):
+    """安装了 pyarrow 时用其多线程 CSV 解析器，未选中的列只切分不转换"""
+    pa = _pyarrow()
+    # 列名须唯一，不需要的列和重复的列另起名字
+    column_names = [name if name in schema and name not in names[:i] else f"_{i}" for i, name in enumerate(names)]
+    wanted = [name for name in column_names if name in schema]
+    types = {'f': pa.float64(), 'U': pa.string(), 'M': pa.timestamp('ms')}
+    reader = pa.csv.open_csv(
+        path,
+        read_options=pa.csv.ReadOptions(column_names=column_names, skip_rows=skip_rows),
+        parse_options=pa.csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa.csv.ConvertOptions(column_types={name: types[schema[name].kind] for name in wanted},
+                                              include_columns=wanted, strings_can_be_null=False))
+    yield from _iter_batches(reader, {name: name for name in wanted}, schema)
+
+
+def _format_column(arr):
+    """一列转为 csv 写入的值：浮点数交给 csv 模块格式化，nan、NaT 写为空字段"""
+    if arr.dtype.kind == 'f':
+        values = arr.astype(object)
+        values[np.isnan(arr)] = None
+        return values.tolist()
+    if arr.dtype.kind == 'M':
+        text = np.datetime_as_string(arr, unit='ms')
+        text[np.isnat(arr)] = ''
+        return text.tolist()
+    return arr.tolist()
+
+
+def _write_csv(path, columns, schema, chunk_rows):
+    n = len(next(iter(columns.values()))) if columns else 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(schema))
+        for start in range(0, n, chunk_rows):
+            writer.writerows(zip(*(_format_column(columns[name][start:start + chunk_rows]) for name in schema)))
+
+
+# ---------- Parquet / Arrow ----------
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("读写 Parquet/Arrow 文件需要安装 pyarrow：pip install pyarrow") from None
+    return pyarrow
+
+
+def _arrow_table(columns, schema):
+    pa = _pyarrow()
+    types = {'f': pa.float64(), 'U': pa.string(), 'M': pa.timestamp('ms')}
+    # from_pandas=True：nan、NaT 存为空值
+    arrays = [pa.array(columns[name], type=types[dtype.kind], from_pandas=True) for name, dtype in schema.items()]
+    return pa.Table.from_arrays(arrays, names=list(schema))
+
+
+def _from_arrow(array):
+    pa = _pyarrow()
+    if pa.types.is_timestamp(array.type):
+        array = array.cast(pa.timestamp('ms'))
+    return array.to_numpy(zero_copy_only=False)
+
+
+def _file_columns(names, schema):
+    """文件中的列名 → 标准列名，只保留需要读取的列"""
+    return {name: _canonical(name) for name in names if _canonical(name) in schema}
+
+
+def _iter_batches(batches, mapping, schema):
+    for batch in batches:
+        chunk = {mapping[name]: _from_arrow(batch.column(i)) for i, name in enumerate(batch.schema.names)}
+        yield conform(chunk, schema, batch.num_rows)
+
+
+def _iter_parquet(path, schema, chunk_rows):
+    pa = _pyarrow()
+    parquet = pa.parquet.ParquetFile(path)
+    mapping = _file_columns(parquet.schema_arrow.names, schema)
+    yield from _iter_batches(parquet.iter_batches(batch_size=chunk_rows, columns=list(mapping)), mapping, schema)
+
+
+def _iter_arrow(path, schema, chunk_rows):
+    pa = _pyarrow()
+    with pa.memory_map(path) as source:
+        names = pa.ipc.open_file(source).schema.names
+    mapping = _file_columns(names, schema)
+    # 内存映射读取，未选中的列不会从磁盘载入
+    table = pa.feather.read_table(path, columns=list(mapping), memory_map=True)
+    yield from _iter_batches(table.to_batches(max_chunksize=chunk_rows), mapping, schema)
+
+
+# ---------- HDF5 ----------
+
+def _h5py():
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("读写 HDF5 文件需要安装 h5py：pip install h5py") from None
+    return h5py
+
+
+def _write_hdf5(path, columns, schema, key):
+    h5py = _h5py()
+    n = len(next(iter(columns.values()))) if columns else 0
+    # 每列一个分块压缩的数据集，读取时可以只读部分列、部分行
+    options = dict(chunks=True, compression='gzip') if n else {}
+    with h5py.File(path, 'w') as f:
+        group = f.create_group(key)
+        group.attrs['schema'] = json.dumps({name: dtype.str for name, dtype in schema.items()})
+        for name, dtype in schema.items():
+            arr = columns[name]
+            if dtype.kind == 'U':
+                group.create_dataset(name, data=arr.astype(object), dtype=h5py.string_dtype(), **options)
+            elif dtype.kind == 'M':
+                dataset = group.create_dataset(name, data=arr.view('i8'), **options)
+                dataset.attrs['unit'] = 'ms'  # 1970 年起的毫秒数，NaT 为 int64 最小值
+            else:
+                group.create_dataset(name, data=arr, **options)
+
+
+def _iter_hdf5(path, schema, chunk_rows, key):
+    h5py = _h5py()
+    with h5py.File(path, 'r') as f:
+        if key not in f:
+            raise ValueError(f"{path} 中没有 {key} 数据组")
+        group = f[key]
+        mapping = _file_columns(group.keys(), schema)
+        n = group[next(iter(mapping))].shape[0] if mapping else 0
+        for start in range(0, n, chunk_rows):
+            chunk = {}
+            for name, column in mapping.items():
+                dataset = group[name]
+                if h5py.check_string_dtype(dataset.dtype) is not None:
+                    chunk[column] = dataset.asstr()[start:start + chunk_rows]
+                elif schema[column].kind == 'M' and dataset.dtype.kind in 'iu':
+                    chunk[column] = dataset[start:start + chunk_rows].astype('i8').view('M8[ms]')
+                else:
+                    chunk[column] = dataset[start:start + chunk_rows]
+            yield conform(chunk, schema, min(chunk_rows, n - start))
+
+
+# ---------- 对外接口 ----------
+
+def iter_chunks(path, columns=None, schema=MEASUREMENT_SCHEMA, chunk_rows=CHUNK_ROWS, format=None,
+                key='measurements'):
+    """分块读取，每块为 {列名: 数组}；columns 为需要的列（缺省为 schema 中的全部列）
+
+    文件中没有的列按缺省值补齐。HDF5 文件的数据放在名为 key 的组中。
+    """
+    schema = _project(schema, columns)
+    format = format or detect_format(path)
+    if format == 'csv':
+        return _iter_csv(path, schema, chunk_rows)
+    if format == 'parquet':
+        return _iter_parquet(path, schema, chunk_rows)
+    if format == 'arrow':
+        return _iter_arrow(path, schema, chunk_rows)
+    if format == 'hdf5':
+        return _iter_hdf5(path, schema, chunk_rows, key)
+    raise ValueError(f"不支持的文件格式: {format}")
+
+
+def read(path, columns=None, schema=MEASUREMENT_SCHEMA, format=None, key='measurements'):
+    """读取整个文件，返回 {列名: 数组}"""
+    return concat(iter_chunks(path, columns, schema, CHUNK_ROWS, format, key), _project(schema, columns))
+
+
+def write(path, columns, schema=MEASUREMENT_SCHEMA, format=None, key='measurements', chunk_rows=CHUNK_ROWS):
+    """按 schema 写出所有列（缺少的列写为空值）"""
+    columns = conform(columns, schema)
+    format = format or detect_format(path)
+    if format == 'csv':
+        _write_csv(path, columns, schema, chunk_rows)
+    elif format == 'parquet':
+        _pyarrow().parquet.write_table(_arrow_table(columns, schema), path, row_group_size=chunk_rows)
+    elif format == 'arrow':
+        _pyarrow().feather.write_feather(_arrow_table(columns, schema), path, chunksize=chunk_rows)
+    elif format == 'hdf5':
+        _write_hdf5(path, columns, schema, key)
+    else:
+        raise ValueError(f"不支持的文件格式: {format}")
+    return path
+
+
+def from_store(store):
+    """SpectrumStore → 测量数据列（每个标准溶液、每个波长一行）"""
+    n, n_wavelengths = store.absorbances.shape
+    return conform({
+        'concentration': np.tile(np.asarray(store.percentages, dtype=float), n_wavelengths),
+        'absorbance': np.asarray(store.absorbances, dtype=float).T.ravel(),
+        'wavelength': np.repeat(np.asarray(store.wavelengths, dtype=float), n),
+    })
+
+
+def to_store(columns):
+    """测量数据列 → SpectrumStore（只取含量不为空的标准溶液）
+
+    有多个波长时各波长须包含同样的一组标准溶液，按含量排序后组成吸光度矩阵。
+    """
+    columns = conform(columns)
+    standard = ~np.isnan(columns['concentration'])
+    x = columns['concentration'][standard]
+    a = columns['absorbance'][standard]
+    w = columns['wavelength'][standard]
+    if x.size == 0:
+        raise ValueError("数据中没有标准溶液（含量列为空）")
+    key = np.where(np.isnan(w), -np.inf, w)
+    wavelengths, counts = np.unique(key, return_counts=True)
+    if wavelengths.size == 1:
+        return SpectrumStore.from_arrays(x, a, w[:1])
+    if np.any(counts != counts[0]):
+        raise ValueError("各波长的标准溶液个数不一致，无法组成吸光度矩阵")
+    order = np.lexsort((x, key))
+    x_sorted = x[order].reshape(wavelengths.size, -1)
+    if np.any(x_sorted != x_sorted[0]):
+        raise ValueError("各波长的标准溶液含量不一致，无法组成吸光度矩阵")
+    wavelengths = np.where(np.isinf(wavelengths), np.nan, wavelengths)
+    return SpectrumStore.from_arrays(x_sorted[0], a[order].reshape(wavelengths.size, -1).T, wavelengths)
+
+
+def fit_results(fit, absorbance, sample_id=None, timestamp=None, wavelength=np.nan):
+    """拟合结果表：每个吸光度反算的含量、漆酚含量，以及拟合方法和参数（每行重复，便于直接导入）"""
+    absorbance = np.atleast_1d(np.asarray(absorbance, dtype=float))
+    n = absorbance.size
+    linear = is_linear(fit)
+    return conform({
+        'sample_id': sample_id,
+        'timestamp': timestamp,
+        'wavelength': np.full(n, wavelength, dtype=float),
+        'absorbance': absorbance,
+        'concentration': inverse(fit, absorbance),
+        'qifen': qifen_from_absorbance(absorbance),
+        'method': np.full(n, getattr(fit, 'method', 'ols')),
+        'formula': np.full(n, formula(fit)),
+        'r': np.full(n, fit.r),
+        'slope': np.full(n, fit.slope if linear else np.nan),
+        'intercept': np.full(n, fit.intercept if linear else np.nan),
+    }, RESULT_SCHEMA, n)
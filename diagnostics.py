@@ -0,0 +1,204 @@
+"""回归诊断与检出限：残差、标准化残差、杠杆值、Cook 距离与 LOD/LOQ
+
+全部按数组整体计算。多组标定（如成千上万次重复测定）排成 (n_series, n_points) 一次完成，
+10^6 个残差也不需要 Python 循环；单组数据可用任一拟合方法（见 fitters.py）的结果做诊断。
+
+检出限 LOD = 3σ/灵敏度，定量限 LOQ = 10σ/灵敏度（含量单位）。σ 优先取空白重复测定的标准差，
+没有空白数据时取标定残差的标准差 s(y/x)。
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from calibration import fit_linear_batch
+from fitters import is_linear, predict
+
+LOD_FACTOR = 3.0
+LOQ_FACTOR = 10.0
+# |标准化残差| 超过该值视为可疑点
+OUTLIER_THRESHOLD = 2.5
+# Cook 距离超过 INFLUENCE_FACTOR/n 视为强影响点
+INFLUENCE_FACTOR = 4.0
+# 质控面板最多列出的点数
+SUMMARY_POINTS = 5
+
+# 各字段与数据同形状；sigma 为残差标准差 s(y/x)，dof 为残差自由度 n - p
+Diagnostics = namedtuple('Diagnostics', ['residuals', 'standardized', 'leverage', 'cooks', 'sigma', 'dof'])
+# sigma_source 为 'blank'（空白重复测定）或 'residual'（标定残差）
+DetectionLimits = namedtuple('DetectionLimits', ['lod', 'loq', 'sigma', 'sensitivity', 'sigma_source',
+                                                 'n_blanks', 'blank_mean'])
+# outliers、influential 为可疑点、强影响点的下标
+CalibrationQC = namedtuple('CalibrationQC', ['diagnostics', 'limits', 'outliers', 'influential'])
+# 多组标定的统计：limits 各字段为每组的数组，outlier_count/influential_count 为每组的点数
+BatchQC = namedtuple('BatchQC', ['fit', 'diagnostics', 'limits', 'outlier_count', 'influential_count'])
+
+
+def _finish(residuals, leverage, n_params):
+    """由残差和杠杆值（形状 (n_series, n_points)）计算标准化残差和 Cook 距离"""
+    dof = residuals.shape[-1] - n_params
+    sse = np.einsum('ij,ij->i', residuals, residuals)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = np.sqrt(sse / dof) if dof > 0 else np.full(sse.shape, np.nan)
+        standardized = residuals / (sigma[:, None] * np.sqrt(1.0 - leverage))
+        cooks = standardized ** 2 * leverage / (n_params * (1.0 - leverage))
+    return Diagnostics(residuals, standardized, leverage, cooks, sigma, dof)
+
+
+def diagnose_batch(x, y, fit=None):
+    """多组直线标定的回归诊断
+
+    x、y 的形状为 (n_series, n_points) 或 (n_points,)，一维输入会广播到所有组；
+    fit 为这些数据的 calibration.BatchFit，缺省时用 fit_linear_batch 拟合。
+    返回 Diagnostics，前四个字段形状为 (n_series, n_points)，sigma 长度为 n_series。
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    x, y = np.broadcast_arrays(x, y)
+    if fit is None:
+        fit = fit_linear_batch(x, y)
+    n = x.shape[-1]
+    residuals = y - (np.reshape(fit.slope, (-1, 1)) * x + np.reshape(fit.intercept, (-1, 1)))
+    # 直线的杠杆值 h = 1/n + (x - x̄)² / Sxx
+    dx = x - x.mean(axis=-1, keepdims=True)
+    dx *= dx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        leverage = dx / dx.sum(axis=-1, keepdims=True)
+    leverage += 1.0 / n
+    return _finish(residuals, leverage, 2)
+
+
+def _jacobian(fit, x):
+    """拟合值对模型参数的导数 (n_points, n_params)；曲线模型用中心差分"""
+    if is_linear(fit):
+        return np.column_stack([x, np.ones_like(x)])
+    params = np.asarray(fit.params, dtype=float)
+    columns = []
+    for i, p in enumerate(params):
+        step = 1e-6 * max(abs(p), 1e-6)
+        hi, lo = params.copy(), params.copy()
+        hi[i] += step
+        lo[i] -= step
+        columns.append((predict(fit._replace(params=tuple(hi)), x) -
+                        predict(fit._replace(params=tuple(lo)), x)) / (2 * step))
+    return np.column_stack(columns)
+
+
+def diagnose(x, y, fit):
+    """单组数据在任一拟合结果（fitters.fit_line 的返回值）下的回归诊断
+
+    杠杆值取帽子矩阵 J(JᵀJ)⁻¹Jᵀ 的对角元，J 为拟合值对参数的导数（直线即设计矩阵），
+    按未加权的最小二乘计算；稳健方法的残差仍是相对其拟合线的残差，被压低权重的点照样显示出来。
+    返回 Diagnostics，sigma 为标量。
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    jacobian = _jacobian(fit, x)
+    # QR 分解求帽子矩阵对角元：h = Q 每行的平方和，不生成 n×n 矩阵
+    q, _ = np.linalg.qr(jacobian)
+    leverage = np.einsum('ij,ij->i', q, q)
+    diagnostics = _finish((y - predict(fit, x))[None, :], leverage[None, :], jacobian.shape[1])
+    return diagnostics._replace(residuals=diagnostics.residuals[0], standardized=diagnostics.standardized[0],
+                                leverage=diagnostics.leverage[0], cooks=diagnostics.cooks[0],
+                                sigma=float(diagnostics.sigma[0]))
+
+
+def sensitivity(fit):
+    """标定曲线的灵敏度 |dA/dc|：直线为斜率，曲线模型取拟合范围低端处的导数（检出限附近）"""
+    if is_linear(fit):
+        return np.abs(fit.slope)
+    lo, hi = fit.domain
+    step = 1e-4 * max(hi - lo, 1e-6)
+    return float(abs(predict(fit, lo + step) - predict(fit, lo - step)) / (2 * step))
+
+
+def blank_statistics(blanks):
+    """空白重复测定的 (平均值, 标准差, 次数)
+
+    blanks 的形状为 (n_replicates,) 或 (n_series, n_replicates)，各组次数不同时用 nan 补齐。
+    标准差按 n - 1 计算，次数少于 2 的组为 nan。
+    """
+    blanks = np.atleast_2d(np.asarray(blanks, dtype=float))
+    valid = ~np.isnan(blanks)
+    count = valid.sum(axis=-1)
+    filled = np.where(valid, blanks, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = filled.sum(axis=-1) / count
+        deviation = np.where(valid, blanks - mean[:, None], 0.0)
+        sd = np.sqrt(np.einsum('ij,ij->i', deviation, deviation) / (count - 1))
+    return mean, sd, count
+
+
+def detection_limits(sigma, slope, blanks=None, lod_factor=LOD_FACTOR, loq_factor=LOQ_FACTOR):
+    """LOD = lod_factor·σ/|斜率|，LOQ = loq_factor·σ/|斜率|，可按组向量化
+
+    给出 blanks（见 blank_statistics）时 σ 取空白的标准差，否则取 sigma（标定残差的标准差）。
+    单组输入返回各字段为标量的 DetectionLimits。
+    """
+    scalar = np.ndim(sigma) == 0 and np.ndim(slope) == 0 and (blanks is None or np.ndim(blanks) <= 1)
+    slope = np.abs(np.asarray(slope, dtype=float))
+    if blanks is not None:
+        blank_mean, sigma, n_blanks = blank_statistics(blanks)
+        source = 'blank'
+    else:
+        sigma = np.asarray(sigma, dtype=float)
+        blank_mean = np.full(np.broadcast(sigma, slope).shape, np.nan)
+        n_blanks = np.zeros(blank_mean.shape, dtype=int)
+        source = 'residual'
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lod = lod_factor * sigma / slope
+        loq = loq_factor * sigma / slope
+    if scalar:
+        return DetectionLimits(float(np.squeeze(lod)), float(np.squeeze(loq)), float(np.squeeze(sigma)),
+                               float(slope), source, int(np.squeeze(n_blanks)), float(np.squeeze(blank_mean)))
+    return DetectionLimits(lod, loq, sigma, slope, source, n_blanks, blank_mean)
+
+
+def calibration_qc(x, y, fit, blanks=None):
+    """单组标定的质控结果：回归诊断、LOD/LOQ 以及可疑点、强影响点的下标"""
+    diagnostics = diagnose(x, y, fit)
+    limits = detection_limits(diagnostics.sigma, sensitivity(fit), blanks)
+    with np.errstate(invalid='ignore'):
+        outliers = np.flatnonzero(np.abs(diagnostics.standardized) > OUTLIER_THRESHOLD)
+        influential = np.flatnonzero(diagnostics.cooks > INFLUENCE_FACTOR / len(diagnostics.residuals))
+    return CalibrationQC(diagnostics, limits, outliers, influential)
+
+
+def qc_batch(x, y, blanks=None):
+    """多组直线标定（如每天一次的重复标定）的诊断与 LOD/LOQ
+
+    x、y 同 diagnose_batch；blanks 为每组的空白重复测定 (n_series, n_replicates)，可用 nan 补齐。
+    """
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    y = np.atleast_2d(np.asarray(y, dtype=float))
+    fit = fit_linear_batch(x, y)
+    diagnostics = diagnose_batch(x, y, fit)
+    limits = detection_limits(diagnostics.sigma, fit.slope, blanks)
+    n = diagnostics.residuals.shape[-1]
+    with np.errstate(invalid='ignore'):
+        outlier_count = np.count_nonzero(np.abs(diagnostics.standardized) > OUTLIER_THRESHOLD, axis=-1)
+        influential_count = np.count_nonzero(diagnostics.cooks > INFLUENCE_FACTOR / n, axis=-1)
+    return BatchQC(fit, diagnostics, limits, outlier_count, influential_count)
+
+
+def summary_text(qc, x=None):
+    """质控面板的文字：LOD/LOQ、σ 来源以及可疑点、强影响点（x 给出时按含量列出）"""
+    limits = qc.limits
+    source = f"空白 {limits.n_blanks} 次" if limits.sigma_source == 'blank' else "标定残差"
+    lines = [f"检出限 LOD = {limits.lod:.3g}%    定量限 LOQ = {limits.loq:.3g}%",
+             f"σ = {limits.sigma:.3g}（{source}）    灵敏度 = {limits.sensitivity:.4g} A/%"]
+
+    def points(indices):
+        shown = [f"第{i + 1}点" if x is None else f"{x[i]:g}%" for i in indices[:SUMMARY_POINTS]]
+        more = f" 等 {len(indices)} 个" if len(indices) > SUMMARY_POINTS else ""
+        return "、".join(shown) + more
+
+    diagnostics = qc.diagnostics
+    if np.isfinite(diagnostics.standardized).any():
+        worst = int(np.nanargmax(np.abs(diagnostics.standardized)))
+        lines.append(f"最大标准化残差 {diagnostics.standardized[worst]:+.2f}（{points([worst])}），"
+                     f"最大 Cook 距离 {np.nanmax(diagnostics.cooks):.2f}")
+    if len(qc.outliers):
+        lines.append(f"可疑点（|标准化残差| > {OUTLIER_THRESHOLD:g}）：{points(qc.outliers)}")
+    if len(qc.influential):
+        lines.append(f"强影响点（Cook 距离 > {INFLUENCE_FACTOR:g}/n）：{points(qc.influential)}")
+    return "\n".join(lines)
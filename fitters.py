@@ -0,0 +1,320 @@
+"""可替换的拟合方法：普通/加权最小二乘与 Theil–Sen、Huber、RANSAC 稳健回归
+
+所有方法都通过 fit_line(x, y, method) 调用，直线方法返回统一的 LineFit，
+多项式与饱和型曲线（见 models.py）返回 ModelFit；predict、formula、inverse 对两者通用。
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from calibration import fit_linear
+
+# weights 为最终使用的权重（RANSAC 为 0/1 内点标记），不加权的方法为 None
+LineFit = namedtuple('LineFit', ['slope', 'intercept', 'r', 'method', 'weights'])
+
+# 名称 → (界面显示名, 拟合函数)
+FITTERS = {}
+# 曲线模型的 名称 → (predict(fit, x), formula(fit), inverse(fit, y))，直线方法不登记
+_CURVES = {}
+# 支持以上一次结果为初值（initial=params）热启动的方法
+WARM_START = set()
+
+# 点对数不超过该值时 Theil–Sen 直接枚举所有点对
+_PAIRWISE_LIMIT = 2_000_000
+# RANSAC 单块残差矩阵的元素数上限
+_BLOCK_ELEMENTS = 1 << 22
+
+
+def register(name, label, curve=None, warm_start=False):
+    """注册拟合方法，fn(x, y, **kwargs) 返回 LineFit
+
+    曲线模型需提供 curve=(predict, formula, inverse)，fn 返回带 params 的 ModelFit；
+    warm_start=True 表示 fn 接受 initial 参数作为迭代初值。
+    """
+    def decorator(fn):
+        FITTERS[name] = (label, fn)
+        if curve is not None:
+            _CURVES[name] = curve
+        if warm_start:
+            WARM_START.add(name)
+        return fn
+    return decorator
+
+
+def fitter_labels():
+    """{名称: 显示名}，供界面下拉框使用"""
+    return {name: label for name, (label, _) in FITTERS.items()}
+
+
+def fit_line(x, y, method='ols', previous=None, **kwargs):
+    """用指定方法拟合 y = f(x)
+
+    previous 为同一方法上一次的结果时，支持热启动的方法以其参数为初值，
+    数据只做了小改动（如编辑一个点）时几次迭代即可收敛。
+    """
+    if method not in FITTERS:
+        raise ValueError(f"未知的拟合方法: {method}")
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size < 2:
+        raise ValueError("至少需要两个数据点才能拟合")
+    if previous is not None and previous.method == method and method in WARM_START:
+        kwargs.setdefault('initial', previous.params)
+    return FITTERS[method][1](x, y, **kwargs)
+
+
+def is_linear(fit):
+    """是否为直线拟合结果（有 slope、intercept；calibration 的 BatchFit 也按直线处理）"""
+    return getattr(fit, 'method', None) not in _CURVES
+
+
+def predict(fit, x):
+    """拟合结果在 x 处的值"""
+    x = np.asarray(x, dtype=float)
+    if is_linear(fit):
+        return fit.slope * x + fit.intercept
+    return _CURVES[fit.method][0](fit, x)
+
+
+def formula(fit):
+    """拟合式右端的文字表示，如 0.0207x - 0.9098"""
+    if is_linear(fit):
+        return f"{fit.slope:.4f}x {'-' if fit.intercept < 0 else '+'} {abs(fit.intercept):.4f}"
+    return _CURVES[fit.method][1](fit)
+
+
+def inverse(fit, y):
+    """由测量值（吸光度）反算 x（含量）"""
+    y = np.asarray(y, dtype=float)
+    if is_linear(fit):
+        if fit.slope == 0:
+            raise ValueError("标准曲线斜率为0，无法反算含量")
+        return (y - fit.intercept) / fit.slope
+    return _CURVES[fit.method][2](fit, y)
+
+
+def _weighted_line(x, y, w):
+    """加权最小二乘闭式解，返回 (slope, intercept, 加权相关系数)"""
+    sw = w.sum()
+    x_mean = (w @ x) / sw
+    y_mean = (w @ y) / sw
+    dx = x - x_mean
+    dy = y - y_mean
+    sxx = w @ (dx * dx)
+    sxy = w @ (dx * dy)
+    syy = w @ (dy * dy)
+    slope = sxy / sxx
+    r = float(np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0))
+    return float(slope), float(y_mean - slope * x_mean), r
+
+
+def _mad_scale(residuals):
+    """中位数绝对偏差换算的稳健标准差"""
+    return 1.4826 * float(np.median(np.abs(residuals - np.median(residuals))))
+
+
+@register('ols', '普通最小二乘')
+def fit_ols(x, y):
+    fit = fit_linear(x, y)
+    return LineFit(fit.slope, fit.intercept, fit.r, 'ols', None)
+
+
+@register('wls', '加权最小二乘')
+def fit_wls(x, y, weights=None):
+    """加权最小二乘
+
+    未给出 weights 时按异方差处理：先做普通最小二乘，再用 |残差| 对 x 的直线估计
+    各点的标准差 σ(x)，取 w = 1/σ² 重新拟合。
+    """
+    if weights is None:
+        fit = fit_linear(x, y)
+        sigma_fit = fit_linear(x, np.abs(y - (fit.slope * x + fit.intercept)))
+        sigma = sigma_fit.slope * x + sigma_fit.intercept
+        # σ 估计值不能为零或负，下限取整体残差尺度的 1%
+        floor = max(_mad_scale(y - (fit.slope * x + fit.intercept)), np.finfo(float).tiny) * 0.01
+        weights = 1.0 / np.maximum(sigma, floor) ** 2
+    weights = np.asarray(weights, dtype=float)
+    slope, intercept, r = _weighted_line(x, y, weights)
+    return LineFit(slope, intercept, r, 'wls', weights)
+
+
+def _count_inversions(a):
+    """序列中 i < j 且 a[i] > a[j] 的对数，a 为 0..n-1 范围内的整数秩
+
+    按秩的二进制位从高到低逐层稳定划分：每一层同一前缀的元素保持原顺序，
+    当前位为 1 的元素排在为 0 的元素之前即构成逆序。每层 O(n)，共 log n 层。
+    """
+    n = a.size
+    values = a.copy()  # 按当前顺序排列的秩
+    starts = np.zeros(1, dtype=np.intp)  # 各组起始位置
+    group_start = np.zeros(n, dtype=np.intp)  # 每个位置所在组的起始位置
+    pos = np.arange(n)
+    total = 0
+    for bit in range(max(int(a.max()), 1).bit_length() - 1, -1, -1):
+        ones = (values >> bit) & 1
+        ones_before = np.cumsum(ones) - ones
+        ones_before -= ones_before[group_start]  # 组内位于之前的 1 的个数
+        is_zero = ones == 0
+        total += int(ones_before[is_zero].sum())
+
+        # 组内稳定划分：0 在前，1 在后，每组一分为二
+        sizes = np.diff(np.append(starts, n))
+        zeros_in_group = sizes - np.add.reduceat(ones, starts)
+        zeros_here = np.repeat(zeros_in_group, sizes)
+        new_pos = np.where(is_zero, pos - ones_before, group_start + zeros_here + ones_before)
+        new_values = np.empty_like(values)
+        new_values[new_pos] = values
+        values = new_values
+        starts = np.column_stack([starts, starts + zeros_in_group]).ravel()
+        starts = starts[(np.diff(starts, append=n) > 0)]  # 去掉空的半组
+        group_start = np.repeat(starts, np.diff(np.append(starts, n)))
+    return total
+
+
+def _count_slopes_below(x, y, t):
+    """斜率小于 t 的点对数（x 已排序，x 相同时 y 升序，这样的点对不会被计入）"""
+    z = y - t * x
+    # 斜率 (y_j - y_i)/(x_j - x_i) < t 等价于 z_j < z_i，即 z 的逆序对
+    _, ranks = np.unique(z, return_inverse=True)
+    return _count_inversions(ranks.ravel())
+
+
+def _median_slope(x, y, n_pairs, rtol):
+    """不枚举点对求斜率中位数（点对数为偶数时取下中位数）
+
+    先用随机点对的斜率估计包含中位数的小区间，再在区间内搜索：按逆序对计数做线性插值，
+    插值收缩不足一半时改用二分。
+    """
+    target = (n_pairs - 1) // 2  # 中位数的（从 0 起）次序：count(t) <= target 当且仅当 t <= 中位数
+    rng = np.random.default_rng(0)
+    i, j = rng.integers(0, x.size, size=(2, 20_000))
+    keep = x[i] != x[j]
+    sample = (y[j] - y[i])[keep] / (x[j] - x[i])[keep]
+    half = 400 / np.sqrt(sample.size)  # 约 4 个标准误对应的百分位
+    lo, hi = np.percentile(sample, [50 - half, 50 + half])
+    count_lo = _count_slopes_below(x, y, lo)
+    count_hi = _count_slopes_below(x, y, hi)
+    # 区间两端应分别位于中位数两侧，否则向外扩展
+    while count_lo > target:
+        lo -= 2 * (hi - lo)
+        count_lo = _count_slopes_below(x, y, lo)
+    while count_hi <= target:
+        hi += 2 * (hi - lo)
+        count_hi = _count_slopes_below(x, y, hi)
+
+    bisect = False
+    while hi - lo > rtol * max(abs(lo), abs(hi), np.finfo(float).tiny):
+        width = hi - lo
+        if bisect:
+            mid = lo + width / 2
+        else:
+            fraction = (target + 0.5 - count_lo) / (count_hi - count_lo)
+            mid = lo + width * min(max(fraction, 0.01), 0.99)
+        count = _count_slopes_below(x, y, mid)
+        if count <= target:
+            lo, count_lo = mid, count
+        else:
+            hi, count_hi = mid, count
+        bisect = hi - lo > width / 2
+    return float((lo + hi) / 2)
+
+
+@register('theil_sen', 'Theil–Sen')
+def fit_theil_sen(x, y, rtol=1e-10):
+    """Theil–Sen 估计：斜率取所有点对斜率的中位数，截距取 y - slope·x 的中位数
+
+    点对数为偶数时斜率取下中位数（排序后第 (n_pairs - 1) // 2 个），两种算法结果一致，
+    估计量不随数据量在 _PAIRWISE_LIMIT 处改变。
+
+    点对较少时直接枚举；数据量大时在斜率上搜索，每步用逆序对计数求小于候选值的斜率个数，
+    单步 O(n log n)，避免生成 O(n²) 个点对。
+    """
+    order = np.lexsort((y, x))
+    x, y = x[order], y[order]
+    n = x.size
+    # x 相同的点对没有斜率，不参与中位数
+    _, tie_counts = np.unique(x, return_counts=True)
+    n_pairs = n * (n - 1) // 2 - int((tie_counts * (tie_counts - 1) // 2).sum())
+    if n_pairs == 0:
+        raise ValueError("所有数据点的 x 相同，无法拟合")
+
+    if n_pairs <= _PAIRWISE_LIMIT:
+        i, j = np.triu_indices(n, 1)
+        keep = x[j] != x[i]
+        slopes = (y[j] - y[i])[keep] / (x[j] - x[i])[keep]
+        k = (slopes.size - 1) // 2  # 与 _median_slope 相同取下中位数
+        slope = float(np.partition(slopes, k)[k])
+    else:
+        slope = _median_slope(x, y, n_pairs, rtol)
+    intercept = float(np.median(y - slope * x))
+    return LineFit(slope, intercept, fit_linear(x, y).r, 'theil_sen', None)
+
+
+@register('huber', 'Huber')
+def fit_huber(x, y, c=1.345, max_iter=50, tol=1e-10):
+    """Huber M 估计，迭代重加权最小二乘（IRLS）
+
+    |残差| ≤ c·s 的点权重为 1，更远的点权重按 c·s/|残差| 递减，s 为残差的 MAD 尺度。
+    """
+    fit = fit_linear(x, y)
+    slope, intercept = fit.slope, fit.intercept
+    weights = np.ones_like(x)
+    for _ in range(max_iter):
+        residuals = y - (slope * x + intercept)
+        scale = _mad_scale(residuals)
+        if scale == 0:
+            break
+        u = np.abs(residuals) / (c * scale)
+        weights = np.where(u <= 1, 1.0, 1.0 / np.maximum(u, 1))
+        new_slope, new_intercept, r = _weighted_line(x, y, weights)
+        converged = abs(new_slope - slope) <= tol * max(abs(slope), 1) and \
+            abs(new_intercept - intercept) <= tol * max(abs(intercept), 1)
+        slope, intercept = new_slope, new_intercept
+        if converged:
+            break
+    r = _weighted_line(x, y, weights)[2]
+    return LineFit(slope, intercept, r, 'huber', weights)
+
+
+@register('ransac', 'RANSAC')
+def fit_ransac(x, y, n_trials=200, threshold=None, seed=0):
+    """RANSAC：随机取两点确定候选直线，选内点最多的一条，再用其内点做最小二乘
+
+    所有候选直线的残差按块向量化计算。未给出 threshold 时，取各候选中残差中位数
+    最小者换算的稳健尺度（LMedS）的 2.5 倍。
+    """
+    rng = np.random.default_rng(seed)
+    n = x.size
+    i, j = rng.integers(0, n, size=(2, n_trials))
+    valid = x[i] != x[j]
+    i, j = i[valid], j[valid]
+    if i.size == 0:
+        raise ValueError("无法从数据中取到 x 不同的两点")
+    slopes = (y[j] - y[i]) / (x[j] - x[i])
+    intercepts = y[i] - slopes * x[i]
+
+    block = max(_BLOCK_ELEMENTS // n, 1)
+    if threshold is None:
+        # 残差中位数只需估计尺度，数据量大时用随机子集计算
+        sub = rng.choice(n, 10_000, replace=False) if n > 10_000 else slice(None)
+        res = np.abs(y[sub] - (slopes[:, None] * x[sub] + intercepts[:, None]))
+        medians = np.median(res, axis=1)
+        # 最小中位数残差的稳健尺度（LMedS），含小样本修正
+        scale = 1.4826 * (1 + 5 / max(n - 2, 1)) * max(float(medians.min()), np.finfo(float).tiny)
+        threshold = 2.5 * scale
+
+    counts = np.empty(slopes.size, dtype=np.intp)
+    for start in range(0, slopes.size, block):
+        res = np.abs(y - (slopes[start:start + block, None] * x + intercepts[start:start + block, None]))
+        counts[start:start + block] = np.count_nonzero(res <= threshold, axis=1)
+    best = int(np.argmax(counts))
+    inliers = np.abs(y - (slopes[best] * x + intercepts[best])) <= threshold
+    if np.count_nonzero(inliers) < 2 or np.ptp(x[inliers]) == 0:
+        return LineFit(float(slopes[best]), float(intercepts[best]), fit_linear(x, y).r, 'ransac',
+                       inliers.astype(float))
+    fit = fit_linear(x[inliers], y[inliers])
+    return LineFit(fit.slope, fit.intercept, fit.r, 'ransac', inliers.astype(float))
+
+
+# 注册多项式与饱和型曲线模型（models 反过来依赖本模块的 register）
+import models  # noqa: E402,F401
@@ -0,0 +1,115 @@
+"""大数据量散点图的分级显示（按像素列取最小/最大值抽稀）"""
+import weakref
+
+import numpy as np
+
+# 超过该点数时才启用抽稀，教学用的少量数据仍按原样绘制
+LOD_THRESHOLD = 5000
+# 散点图元 -> LODScatter，移除图元时据此断开回调（见 release）
+_owners = weakref.WeakKeyDictionary()
+
+
+def minmax_decimate(x, y, xlim, n_bins):
+    """在 xlim 范围内把已按 x 排序的数据分成 n_bins 列，每列只保留 y 最小和最大的点
+
+    返回抽稀后的 (x, y)，点数不超过 2 * n_bins，与数据总量无关。
+    """
+    lo, hi = np.searchsorted(x, xlim)  # 可见范围二分查找，O(log n)
+    xs, ys = x[lo:hi], y[lo:hi]
+    if xs.size <= 2 * n_bins:
+        return xs, ys
+
+    x0, x1 = xlim
+    bins = ((xs - x0) * (n_bins / (x1 - x0))).astype(np.intp)
+    np.clip(bins, 0, n_bins - 1, out=bins)
+    # x 已排序，所以每列的数据是连续的一段
+    starts = np.flatnonzero(np.diff(bins, prepend=-1))
+    counts = np.diff(np.append(starts, xs.size))
+    seg = np.repeat(np.arange(starts.size), counts)
+    # 各段最小/最大值广播回每个点，取每段第一个等于极值的位置
+    is_min = ys == np.repeat(np.minimum.reduceat(ys, starts), counts)
+    is_max = ys == np.repeat(np.maximum.reduceat(ys, starts), counts)
+    first_min = np.flatnonzero(is_min)
+    first_min = first_min[np.diff(seg[first_min], prepend=-1) != 0]
+    first_max = np.flatnonzero(is_max)
+    first_max = first_max[np.diff(seg[first_max], prepend=-1) != 0]
+    keep = np.union1d(first_min, first_max)
+    return xs[keep], ys[keep]
+
+
+def sort_by_x(x, y):
+    """按 x 排序（数据量大时较耗时，可放到后台任务中预先完成）"""
+    # 单精度数据（紧凑模式）保持单精度，其余转为双精度
+    dtype = np.result_type(x, y, np.float32)
+    if len(x) <= LOD_THRESHOLD:
+        # 不排序时也返回副本：结果会被缓存，不能与调用方（随后可能原地修改）的数组共用内存
+        return np.array(x, dtype=dtype), np.array(y, dtype=dtype)
+    x = np.asarray(x, dtype=dtype)
+    y = np.asarray(y, dtype=dtype)
+    order = np.argsort(x, kind='stable')
+    return x[order], y[order]
+
+
+class LODScatter:
+    """随坐标范围和画布尺寸自动重新抽稀的散点图"""
+
+    def __init__(self, ax, x, y, presorted=False, **scatter_kwargs):
+        if not presorted:
+            x, y = sort_by_x(x, y)
+        self.x = x
+        self.y = y
+        self.ax = ax
+        self.artist = ax.scatter([], [], **scatter_kwargs)
+        # 回调注册表对绑定方法只保留弱引用，这里用闭包让回调持有本对象
+        on_change = lambda *args: self._on_change()
+        self._cids = [
+            ax.callbacks.connect('xlim_changed', on_change),
+            ax.callbacks.connect('ylim_changed', on_change),
+        ]
+        self._canvas_cid = ax.figure.canvas.mpl_connect('resize_event', on_change)
+        _owners[self.artist] = self
+        self.update()
+
+    def n_bins(self):
+        """每个像素列一个分箱"""
+        return max(int(self.ax.get_window_extent().width), 1)
+
+    def update(self):
+        xs, ys = minmax_decimate(self.x, self.y, self.ax.get_xlim(), self.n_bins())
+        self.artist.set_offsets(np.column_stack([xs, ys]))
+
+    def _on_change(self):
+        # 散点已被移除（如清屏）时自动断开回调
+        if self.artist.axes is None:
+            self.disconnect()
+            return
+        self.update()
+
+    def disconnect(self):
+        for cid in self._cids:
+            self.ax.callbacks.disconnect(cid)
+        if self._canvas_cid is not None:
+            self.ax.figure.canvas.mpl_disconnect(self._canvas_cid)
+        self._cids = []
+        self._canvas_cid = None
+
+
+def release(artist):
+    """断开抽稀散点的回调
+
+    回调持有整份数据，散点被移除后要等到下一次坐标范围或窗口尺寸变化才会自动断开；
+    长时间运行、反复加载大数据集时应在移除散点时立即调用。普通散点直接忽略。
+    """
+    owner = _owners.pop(artist, None)
+    if owner is not None:
+        owner.disconnect()
+
+
+def scatter(ax, x, y, presorted=False, **scatter_kwargs):
+    """数据量小时直接绘制，超过 LOD_THRESHOLD 时改用抽稀散点，返回散点图元
+
+    presorted=True 表示 x、y 已经过 sort_by_x 处理。
+    """
+    if len(x) <= LOD_THRESHOLD:
+        return ax.scatter(x, y, **scatter_kwargs)
+    return LODScatter(ax, x, y, presorted, **scatter_kwargs).artist
@@ -0,0 +1,236 @@
+"""内存统计（--memory-report）：每次按钮操作后的 tracemalloc 快照差异与进程常驻内存
+
+默认关闭，关闭时 record() 不做任何事。开启后每个操作完成时记录常驻内存（RSS）、
+Python 分配总量以及与上一次操作相比增长最多的代码位置，保存在定长队列中；
+退出时输出按操作汇总的统计表、最近若干次操作的 RSS 变化趋势，以及自开启以来
+增长最多的代码位置，用于确认反复加载、拟合、复位后内存保持平稳。只依赖标准库。
+
+也可直接运行做长时间测试（需要显示器）：
+    python memory.py --cycles 2000 --points 100000 --compact
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque, namedtuple
+
+# 保留的最近操作数
+MAX_ACTIONS = 10_000
+# 每个操作记录的增长最多的代码位置数
+TOP_SITES = 5
+# 统计 RSS 趋势的最近操作数
+TREND_WINDOW = 200
+
+# rss、traced 为操作完成时的常驻内存与 Python 分配总量，delta 为 Python 分配相对上一次操作的增量（字节）；
+# top 为 [(位置, 字节增量, 块数增量)]
+ActionMemory = namedtuple('ActionMemory', ['label', 'time', 'rss', 'traced', 'delta', 'top'])
+
+_actions = deque(maxlen=MAX_ACTIONS)
+_baseline = None  # 开启时的快照
+_previous = None  # 上一次操作的快照
+enabled = False
+
+# 不统计 tracemalloc 自身与导入机制的分配
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def enable(frames=1):
+    """开始追踪 Python 内存分配；frames 为每次分配保存的调用栈深度（越深越慢）"""
+    global enabled, _baseline, _previous
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _baseline = _previous = _snapshot()
+    enabled = True
+
+
+def disable():
+    global enabled, _baseline, _previous
+    enabled = False
+    _baseline = _previous = None
+    tracemalloc.stop()
+
+
+def clear():
+    _actions.clear()
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+def rss():
+    """进程当前的常驻内存（字节），无法获取时为 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    # 其他平台只能取到峰值（macOS 单位为字节，其余为 KB）
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def record(label):
+    """记录一次操作完成时的内存，与上一次操作的快照比较；未开启时返回 None"""
+    global _previous
+    if not enabled:
+        return None
+    snapshot = _snapshot()
+    stats = snapshot.compare_to(_previous, 'lineno')
+    _previous = snapshot
+    top = [(str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+           for stat in sorted(stats, key=lambda stat: stat.size_diff, reverse=True)[:TOP_SITES]
+           if stat.size_diff > 0]
+    traced = tracemalloc.get_traced_memory()[0]
+    delta = sum(stat.size_diff for stat in stats)
+    action = ActionMemory(label, time.perf_counter(), rss(), traced, delta, top)
+    _actions.append(action)
+    return action
+
+
+def actions(label=None):
+    """已记录的操作（可按名称前缀筛选）"""
+    return [a for a in list(_actions) if label is None or a.label.startswith(label)]
+
+
+def latest():
+    return _actions[-1] if _actions else None
+
+
+def trend(window=TREND_WINDOW):
+    """最近 window 次操作 RSS 的最小二乘斜率（字节/次），操作少于 10 次或无法获取 RSS 时为 None"""
+    values = [a.rss for a in list(_actions)[-window:] if a.rss is not None]
+    n = len(values)
+    if n < 10:
+        return None
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    sxy = sum((i - mean_x) * (v - mean_y) for i, v in enumerate(values))
+    sxx = sum((i - mean_x) ** 2 for i in range(n))
+    return sxy / sxx
+
+
+def growth(limit=10):
+    """自开启以来 Python 分配增长最多的代码位置 [(位置, 字节增量, 块数增量)]"""
+    if _baseline is None or _previous is None:
+        return []
+    stats = _previous.compare_to(_baseline, 'lineno')
+    return [(str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+            for stat in sorted(stats, key=lambda stat: stat.size_diff, reverse=True)[:limit]
+            if stat.size_diff > 0]
+
+
+def summary():
+    """按名称汇总：{名称: (次数, 平均增量, 合计增量, 最后 RSS)}，单位为字节"""
+    result = {}
+    for action in list(_actions):
+        count, total, _ = result.get(action.label, (0, 0, None))
+        result[action.label] = (count + 1, total + action.delta, action.rss)
+    return {label: (count, total / count, total, last) for label, (count, total, last) in result.items()}
+
+
+def report(file=None):
+    """输出各操作的内存增量、RSS 趋势和增长最多的代码位置"""
+    file = file or sys.stderr
+    if file is None or not _actions:
+        return
+    mb = 1 / (1 << 20)
+    print("==== 内存统计 ====", file=file)
+    print(f"  {'操作':<24s}{'次数':>8s}{'平均增量KB':>12s}{'合计增量KB':>12s}{'最后RSS MB':>12s}", file=file)
+    for label, (count, mean, total, last) in sorted(summary().items()):
+        last_rss = f"{last * mb:.1f}" if last is not None else "-"
+        print(f"  {label:<24s}{count:>8d}{mean / 1024:>12.1f}{total / 1024:>12.1f}{last_rss:>12s}", file=file)
+    first, last = _actions[0], _actions[-1]
+    if first.rss is not None and last.rss is not None:
+        print(f"  RSS：{first.rss * mb:.1f} MB → {last.rss * mb:.1f} MB（共 {len(_actions)} 次操作）", file=file)
+    slope = trend()
+    if slope is not None:
+        print(f"  最近 {min(len(_actions), TREND_WINDOW)} 次操作 RSS 变化：{slope / 1024:+.2f} KB/次", file=file)
+    print(f"  Python 分配：{last.traced * mb:.1f} MB", file=file)
+    sites = growth()
+    if sites:
+        print("  自开启以来增长最多的位置：", file=file)
+        for site, size, count in sites:
+            print(f"    {size / 1024:>10.1f} KB  {count:>+8d} 块  {site}", file=file)
+
+
+def soak(cycles, n_points=7, compact=False, every=100, file=None):
+    """反复加载、建立坐标、绘制、拟合、复位（需要显示器），每 every 次输出常驻内存
+
+    每次加载一组新的随机数据，拟合结果对话框随即关闭；各操作由 record() 记录。
+    """
+    import tkinter as tk
+    import numpy as np
+    from absorbance_app import AbsorbanceApp
+    from spectrum_store import SpectrumStore
+
+    file = file or sys.stderr
+    root = tk.Tk()
+    app = AbsorbanceApp(root, compact=compact)
+    rng = np.random.default_rng(0)
+    if not enabled:
+        enable()
+
+    def wait():
+        while app.view.busy or app.view.stale_layers() or app.player.playing:
+            root.update()
+            time.sleep(0.001)
+        root.update()
+
+    try:
+        for cycle in range(1, cycles + 1):
+            x = rng.uniform(45, 85, n_points)
+            app.model.set_store(SpectrumStore.from_arrays(x, 0.02 * x - 0.9 + rng.normal(0, 0.01, n_points)))
+            for idx in (1, 2, 3, 4):
+                app.on_button(idx)
+                wait()
+            app.close_dialog()
+            if cycle % every == 0:
+                current = rss()
+                slope = trend()
+                print(f"{cycle:>8d} 次  RSS {current / (1 << 20) if current else float('nan'):.1f} MB  "
+                      f"Python 分配 {tracemalloc.get_traced_memory()[0] / (1 << 20):.1f} MB"
+                      + (f"  趋势 {slope / 1024:+.2f} KB/次" if slope is not None else ""), file=file)
+    finally:
+        app.on_closing()
+    report(file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="反复加载、拟合、复位，检查长时间运行时内存是否平稳")
+    parser.add_argument('--cycles', type=int, default=1000, help="循环次数")
+    parser.add_argument('--points', type=int, default=7, help="每次加载的数据点数")
+    parser.add_argument('--compact', action='store_true', help="紧凑模式（单精度数据、较小的缓存）")
+    parser.add_argument('--every', type=int, default=100, help="每多少次输出一次内存")
+    args = parser.parse_args(argv)
+    soak(args.cycles, args.points, args.compact, args.every)
+
+
+if __name__ == "__main__":
+    main()
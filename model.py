@@ -0,0 +1,202 @@
+"""两个界面共用的标定数据模型：数据、拟合方法与派生结果，修改时通知视图
+
+输入分为 DATA（浓度与吸光度）和 FITTER（拟合方法），每次修改对应的版本号加一并通知订阅者。
+派生结果（排序后的散点、各方法的拟合）记下所依据的版本号，输入没变时直接复用而不再哈希数据；
+版本变了但内容相同（如复位后重新读入同一份数据）时再由按内容哈希的 ResultCache 命中。
+视图据此只重算、重画输入确实变化了的部分，见 stepview.py。
+
+紧凑模式（compact=True）下数据以单精度保存（见 SpectrumStore.compact），编辑时仍保持单精度；
+拟合等计算在各自函数内转为双精度进行，只有临时数组。
+"""
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from cache import ResultCache, dataset_key
+from calibration import RunningFit, qifen_from_absorbance
+from fitters import fit_line, LineFit
+import lod
+from spectrum_store import open_store
+
+DATA = 'data'
+FITTER = 'fitter'
+INPUTS = (DATA, FITTER)
+
+# 某一时刻的输入；后台任务只读快照，主线程之后的修改（写时复制）不影响正在进行的计算
+Snapshot = namedtuple('Snapshot', ['x', 'y', 'fitter', 'versions'])
+
+
+class CalibrationModel:
+    """标准溶液数据与当前拟合方法；修改只在主线程进行，派生结果可在后台线程按快照计算"""
+
+    def __init__(self, store=None, fitter='ols', cache=None, compact=False):
+        self.compact = compact
+        self.store = self._adopt(store if store is not None else open_store())
+        self.fitter = fitter
+        # 按数据内容缓存派生结果，重复演示同一组数据时不再重新计算
+        self.cache = cache if cache is not None else ResultCache()
+        self.fits = {}  # 各拟合方法最近一次的结果，迭代求解的模型用作热启动初值
+        self._versions = dict.fromkeys(INPUTS, 0)
+        self._derived = {}  # 名称 -> (版本, 结果)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._load(0)
+
+    def _adopt(self, store):
+        return store.compact() if self.compact else store
+
+    def _load(self, wavelength_index):
+        self.wavelength_index = wavelength_index
+        # 紧凑模式的单波长数据：x、y 是同一个结构化数组的两个字段
+        self.readings = self.store.readings if self.store.n_wavelengths == 1 else None
+        self.x = self.store.percentages
+        self.y = self.store.absorbance(wavelength_index)
+        self._running_fit = None  # 最小二乘的累加统计量，第一次用到时才建立
+
+    def _use_readings(self, readings):
+        self.readings = readings
+        self.x = readings['concentration']
+        self.y = readings['absorbance']
+
+    # ---------- 变化通知 ----------
+
+    def subscribe(self, callback):
+        """登记 callback(changes)，changes 为发生变化的输入名称集合"""
+        self._listeners.append(callback)
+
+    def _changed(self, *inputs):
+        for name in inputs:
+            self._versions[name] += 1
+        for callback in list(self._listeners):
+            callback(set(inputs))
+
+    def version(self, inputs=INPUTS):
+        return tuple(self._versions[name] for name in inputs)
+
+    def snapshot(self):
+        return Snapshot(self.x, self.y, self.fitter, self.version())
+
+    # ---------- 修改 ----------
+
+    def set_store(self, store, wavelength_index=0):
+        """换一份数据（导入文件、实时采集结束等）"""
+        self.store = self._adopt(store)
+        self.fits.clear()
+        self._load(wavelength_index)
+        self._changed(DATA)
+
+    def use_wavelength(self, index):
+        """切换到某一波长下的吸光度"""
+        if index != self.wavelength_index:
+            self._load(index)
+            self._changed(DATA)
+
+    def reload(self, mode='c'):
+        """丢弃编辑，重新读取存储（写时复制映射的文件重新映射，内置数据恢复默认值）"""
+        self.store = self._adopt(self.store.reopen(mode))
+        self._load(min(self.wavelength_index, self.store.n_wavelengths - 1))
+        self._changed(DATA)
+
+    def set_point(self, index, x=None, y=None):
+        """修改一个数据点；最小二乘统计量 O(1) 增量更新"""
+        old_x, old_y = self.x[index], self.y[index]
+        # 写时复制：已交给后台任务的快照仍是修改前的数组；紧凑模式复制整个结构化数组，仍为单精度
+        if self.readings is not None:
+            self._use_readings(self.readings.copy())
+        dtype = np.float32 if self.compact else float
+        if x is not None:
+            if self.readings is None:
+                self.x = np.array(self.x, dtype=dtype)
+            self.x[index] = x
+        if y is not None:
+            if self.readings is None:
+                self.y = np.array(self.y, dtype=dtype)
+            self.y[index] = y
+        if self._running_fit is not None:
+            self._running_fit.replace(old_x, old_y, self.x[index], self.y[index])
+        self._changed(DATA)
+
+    def delete(self, indices):
+        """删除若干数据点"""
+        indices = np.asarray(indices, dtype=np.intp)
+        if self._running_fit is not None:
+            for i in indices:
+                self._running_fit.remove(self.x[i], self.y[i])
+        if self.readings is not None:
+            self._use_readings(np.delete(self.readings, indices))
+        else:
+            self.x = np.delete(self.x, indices)
+            self.y = np.delete(self.y, indices)
+        self._changed(DATA)
+
+    def set_fitter(self, name):
+        if name != self.fitter:
+            self.fitter = name
+            self._changed(FITTER)
+
+    # ---------- 派生结果 ----------
+
+    def derived(self, name, version, compute, *args):
+        """按输入版本缓存的派生结果：version 与上次相同时直接返回上次的值"""
+        with self._lock:
+            entry = self._derived.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = compute(*args)
+        with self._lock:
+            self._derived[name] = (version, value)
+        return value
+
+    def _data_version(self, snapshot):
+        return snapshot.versions[INPUTS.index(DATA)]
+
+    @property
+    def n(self):
+        return len(self.x)
+
+    @property
+    def qifen(self):
+        """各标准溶液换算的漆酚含量"""
+        return self.derived('qifen', self._versions[DATA], qifen_from_absorbance, self.y)
+
+    def sorted_points(self, snapshot=None):
+        """按 x 排序的散点数据（大数据量抽稀用，可在后台线程调用）"""
+        s = snapshot or self.snapshot()
+
+        def compute():
+            key = dataset_key('scatter', s.x, s.y)
+            return self.cache.get_or_compute(key, lod.sort_by_x, s.x, s.y)
+        return self.derived('scatter', self._data_version(s), compute)
+
+    def fit(self, snapshot=None, method=None):
+        """当前数据在 method（缺省为快照中的拟合方法）下的拟合结果（可在后台线程调用）"""
+        s = snapshot or self.snapshot()
+        method = method or s.fitter
+        previous = self.fits.get(method)
+
+        def compute():
+            # 热启动初值不参与缓存键，同一份数据无论从哪里出发都收敛到同一结果
+            key = dataset_key('calibration_fit', s.x, s.y, method=method)
+            return self.cache.get_or_compute(key, fit_line, s.x, s.y, method, previous=previous)
+        fit = self.derived(('fit', method), self._data_version(s), compute)
+        self.fits[method] = fit
+        return fit
+
+    def fit_now(self, method=None):
+        """不需要后台计算就能得到的拟合：已算过的结果，或由累加统计量 O(1) 得出的最小二乘；否则返回 None"""
+        method = method or self.fitter
+        with self._lock:
+            entry = self._derived.get(('fit', method))
+        if entry is not None and entry[0] == self._versions[DATA]:
+            return entry[1]
+        if method != 'ols' or self.n < 2:
+            return None
+        if self._running_fit is None:
+            self._running_fit = RunningFit.from_arrays(self.x, self.y)
+        fit = self._running_fit.result()
+        fit = LineFit(fit.slope, fit.intercept, fit.r, 'ols', None)
+        with self._lock:
+            self._derived[('fit', method)] = (self._versions[DATA], fit)
+        self.fits[method] = fit
+        return fit
@@ -0,0 +1,191 @@
+"""非线性标准曲线：二次、三次多项式与饱和型（Langmuir）模型
+
+吸光度较高时偏离朗伯-比尔定律，直线会掩盖这种弯曲。这里的模型都通过 fitters.register
+注册，与直线方法一样用 fit_line(x, y, method) 调用。饱和型模型用带解析雅可比矩阵的
+Levenberg–Marquardt（变量投影）求解，可以用上一次的参数热启动，交互编辑数据时几次迭代即可收敛。
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from fitters import register
+
+# params 为模型参数（多项式为从高次到低次的系数，饱和型为 (a, k, c)），
+# domain 为拟合数据的 x 范围，iterations/converged 为迭代求解的情况（闭式解为 0/True）
+ModelFit = namedtuple('ModelFit', ['params', 'r', 'method', 'iterations', 'converged', 'domain'])
+
+_SUPERSCRIPTS = {2: '²', 3: '³'}
+
+
+def _correlation(y, predicted):
+    """拟合优度换算的相关系数 r = √R²"""
+    ss_tot = float(np.sum((y - y.mean()) ** 2))
+    if ss_tot == 0:
+        return 1.0
+    return float(np.sqrt(np.clip(1 - np.sum((y - predicted) ** 2) / ss_tot, 0.0, 1.0)))
+
+
+def _signed(value, text=''):
+    return f"{'-' if value < 0 else '+'} {abs(value):.4g}{text}"
+
+
+# ---------- 多项式 ----------
+
+def _fit_polynomial(x, y, degree, method):
+    if np.unique(x).size <= degree:
+        raise ValueError(f"{degree}次多项式至少需要 {degree + 1} 个不同的浓度")
+    params = tuple(float(p) for p in np.polyfit(x, y, degree))
+    r = _correlation(y, np.polyval(params, x))
+    return ModelFit(params, r, method, 0, True, (float(x.min()), float(x.max())))
+
+
+def _polynomial_predict(fit, x):
+    return np.polyval(fit.params, x)
+
+
+def _polynomial_formula(fit):
+    degree = len(fit.params) - 1
+    terms = []
+    for power, p in zip(range(degree, -1, -1), fit.params):
+        text = 'x' + _SUPERSCRIPTS.get(power, '') if power else ''
+        terms.append(f"{p:.4g}{text}" if not terms else _signed(p, text))
+    return ' '.join(terms)
+
+
+def _polynomial_inverse(fit, y, max_iter=30):
+    """牛顿迭代反算 x，初值取拟合范围两端连线的反算值；导数为零处结果为 nan"""
+    y = np.asarray(y, dtype=float)
+    derivative = np.polyder(fit.params)
+    lo, hi = fit.domain
+    y_lo, y_hi = np.polyval(fit.params, [lo, hi])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = lo + (y - y_lo) * (hi - lo) / (y_hi - y_lo)
+        for _ in range(max_iter):
+            step = (np.polyval(fit.params, x) - y) / np.polyval(derivative, x)
+            x = x - step
+            if np.all((np.abs(step) <= 1e-12 * np.maximum(np.abs(x), 1)) | ~np.isfinite(step)):
+                break
+    return np.where(np.isfinite(x), x, np.nan)
+
+
+_POLYNOMIAL = (_polynomial_predict, _polynomial_formula, _polynomial_inverse)
+
+
+@register('quadratic', '二次多项式', curve=_POLYNOMIAL)
+def fit_quadratic(x, y):
+    return _fit_polynomial(x, y, 2, 'quadratic')
+
+
+@register('cubic', '三次多项式', curve=_POLYNOMIAL)
+def fit_cubic(x, y):
+    return _fit_polynomial(x, y, 3, 'cubic')
+
+
+# ---------- 饱和型 A = a·x / (k + x) + c ----------
+
+def _langmuir_project(x, y, k):
+    """k 固定时 (a, c) 是线性最小二乘问题，返回 (a, c, 残差, 残差对 k 的导数)
+
+    导数用解析式 ∂q/∂k = -x/(k+x)²，并去掉可由 (a, c) 吸收的分量（变量投影的 Kaufman 近似）。
+    """
+    q = x / (k + x)
+    q_mean = q.mean()
+    dq = q - q_mean
+    sqq = dq @ dq
+    a = (dq @ (y - y.mean())) / sqq
+    c = y.mean() - a * q_mean
+    residuals = a * q + c - y
+    dk = -a * q / (k + x)
+    dk = dk - dk.mean() - (dq @ dk) / sqq * dq
+    return a, c, residuals, dk
+
+
+def _langmuir_solve(x, y, k, max_iter=100, tol=1e-7):
+    """对 k 做 Levenberg–Marquardt 迭代，返回 (a, k, c, 迭代次数, 是否收敛)
+
+    迭代变量取 s = ln(k + min(x))，保证分母 k + x 始终为正；
+    (a, c) 每步由线性最小二乘给出，只剩一维的非线性问题，热启动时几步即收敛。
+    """
+    shift = x.min()
+    s = np.log(k + shift)
+    a, c, residuals, dk = _langmuir_project(x, y, k)
+    cost = residuals @ residuals
+    damping = 1e-6
+    for iteration in range(1, max_iter + 1):
+        jacobian = dk * (k + shift)  # ∂残差/∂s
+        gradient = jacobian @ residuals
+        curvature = jacobian @ jacobian
+        if curvature == 0 or not np.isfinite(curvature):
+            return a, k, c, iteration, True
+        while True:
+            step = -gradient / (curvature * (1 + damping))
+            if abs(step) <= tol * max(abs(s), 1):
+                # 步长已小于容差（包括因舍入误差被拒绝后缩小的步长），已在极小值处
+                return a, k, c, iteration, True
+            new_k = np.exp(s + step) - shift
+            new = _langmuir_project(x, y, new_k)
+            new_cost = new[2] @ new[2]
+            if np.isfinite(new_cost) and new_cost <= cost:
+                break
+            damping *= 10
+        s += step
+        k = new_k
+        a, c, residuals, dk = new
+        cost = new_cost
+        damping = max(damping / 10, 1e-12)
+        if abs(step) <= tol * max(abs(s), 1):
+            return a, k, c, iteration, True
+    return a, k, c, max_iter, False
+
+
+def _langmuir_initial(x, y):
+    """冷启动初值：在 k 的对数网格上对 (a, c) 做线性最小二乘，取残差最小的 k"""
+    span = max(float(np.ptp(x)), np.finfo(float).eps)
+    ks = -x.min() + span * np.logspace(-2, 3, 60)
+    ks = ks[ks + x.min() > 0]
+    q = x[None, :] / (ks[:, None] + x[None, :])  # (网格, n)
+    q_mean = q.mean(axis=1, keepdims=True)
+    dq = q - q_mean
+    dy = y - y.mean()
+    sqq = np.sum(dq * dq, axis=1)
+    a = (dq @ dy) / np.where(sqq > 0, sqq, np.inf)
+    c = y.mean() - a * q_mean[:, 0]
+    sse = np.sum((a[:, None] * q + c[:, None] - y) ** 2, axis=1)
+    return float(ks[int(np.argmin(sse))])
+
+
+def _langmuir_predict(fit, x):
+    a, k, c = fit.params
+    return a * x / (k + x) + c
+
+
+def _langmuir_formula(fit):
+    a, k, c = fit.params
+    return f"{a:.4g}x / ({k:.4g} + x) {_signed(c)}"
+
+
+def _langmuir_inverse(fit, y):
+    """x = k(A - c) / (a - (A - c))，超出饱和值的吸光度为 nan"""
+    a, k, c = fit.params
+    d = np.asarray(y, dtype=float) - c
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = k * d / (a - d)
+    return np.where((d / a < 1) & np.isfinite(x), x, np.nan)
+
+
+@register('langmuir', '饱和型（Langmuir）', curve=(_langmuir_predict, _langmuir_formula, _langmuir_inverse),
+          warm_start=True)
+def fit_langmuir(x, y, initial=None, max_iter=100):
+    """饱和型曲线 A = a·x / (k + x) + c
+
+    initial 为 (a, k, c) 初值，通常是上一次的拟合结果（只用到 k）；缺省或不可用时从网格搜索冷启动。
+    """
+    if np.unique(x).size < 3:
+        raise ValueError("饱和型模型至少需要 3 个不同的浓度")
+    k = None if initial is None else float(initial[1])
+    if k is None or not np.isfinite(k) or k + x.min() <= 0:
+        k = _langmuir_initial(x, y)
+    a, k, c, iterations, converged = _langmuir_solve(x, y, k, max_iter)
+    params = (float(a), float(k), float(c))
+    r = _correlation(y, a * x / (k + x) + c)
+    return ModelFit(params, r, 'langmuir', iterations, converged, (float(x.min()), float(x.max())))
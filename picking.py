@@ -0,0 +1,78 @@
+"""鼠标悬停拾取：在屏幕坐标下为散点建立网格索引，每次移动只查附近的格子
+
+mplcursors 对每个鼠标事件逐个检测图元上的点，数据量大时每次移动都是一次全量扫描。
+这里把所有点按像素坐标分到边长为拾取半径的格子中并按格子编号排序，
+查询时只需二分查找周围 3×3 个格子，与数据总量基本无关。
+坐标范围或画布尺寸变化后，下一次查询时自动重建索引。
+"""
+import numpy as np
+
+
+class PointIndex:
+    """数据点的屏幕坐标网格索引，nearest() 返回拾取半径内最近的点在原数组中的下标"""
+
+    def __init__(self, ax, x, y, radius=30):
+        self.ax = ax
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.radius = float(radius)
+        self._view = None  # 建立索引时的 (坐标范围, 坐标轴像素位置)
+
+    def _current_view(self):
+        return (*self.ax.get_xlim(), *self.ax.get_ylim(), *self.ax.bbox.bounds)
+
+    def _build(self):
+        xy = self.ax.transData.transform(np.column_stack([self.x, self.y]))
+        finite = np.flatnonzero(np.isfinite(xy).all(axis=1))
+        xy = xy[finite]
+        # 格子边长按点的密度选取，平均每格几个点；点少时取拾取半径
+        _, _, width, height = self.ax.bbox.bounds
+        self._cell = float(np.clip(2 * np.sqrt(width * height / max(xy.shape[0], 1)), 1.0, self.radius))
+        cells = np.floor(xy / self._cell).astype(np.int64)
+        self._origin = cells.min(axis=0) if cells.size else np.zeros(2, dtype=np.int64)
+        cells -= self._origin
+        self._rows = int(cells[:, 1].max()) + 1 if cells.size else 1
+        ids = cells[:, 0] * self._rows + cells[:, 1]
+        order = np.argsort(ids, kind='stable')
+        self._ids = ids[order]
+        self._xy = xy[order]
+        self._index = finite[order]
+        self._view = self._current_view()
+
+    def _square(self, cx, cy, k):
+        """以 (cx, cy) 为中心、半径 k 格的正方形内所有点在排序数组中的位置"""
+        lo_row, hi_row = max(cy - k, 0), min(cy + k, self._rows - 1)
+        if lo_row > hi_row:
+            return np.empty(0, dtype=np.intp)
+        # 同一列中相邻各行的格子编号连续，每列一次二分即可取出
+        columns = np.arange(cx - k, cx + k + 1) * self._rows
+        starts = np.searchsorted(self._ids, columns + lo_row, side='left')
+        stops = np.searchsorted(self._ids, columns + hi_row, side='right')
+        return np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)])
+
+    def nearest(self, px, py):
+        """像素坐标 (px, py) 拾取半径内最近的点的下标，没有时返回 None
+
+        从所在格子向外逐圈扩大搜索范围，已找到的最近距离不超过已搜索的范围时即停止。
+        """
+        if self._view != self._current_view():
+            self._build()
+        if self._ids.size == 0:
+            return None
+        cx, cy = (np.floor(np.array([px, py]) / self._cell).astype(np.int64) - self._origin).tolist()
+        best, best_d2 = None, np.inf
+        k = 0
+        while True:
+            candidates = self._square(cx, cy, k)
+            if candidates.size:
+                d2 = np.sum((self._xy[candidates] - (px, py)) ** 2, axis=1)
+                i = int(np.argmin(d2))
+                best, best_d2 = candidates[i], d2[i]
+            # 正方形外的点距离至少为 k 格
+            reach = k * self._cell
+            if best_d2 <= reach ** 2 or reach >= self.radius:
+                break
+            k += 1
+        if best is None or best_d2 > self.radius ** 2:
+            return None
+        return int(self._index[best])
@@ -0,0 +1,180 @@
+"""绘图样式与 blit 局部重绘"""
+import numpy as np
+
+from cache import ResultCache
+from fitters import formula, is_linear, predict
+import lod
+import tracing
+
+# 背景位图缓存的内存上限（每张约 宽×高×4 字节）
+BACKGROUND_CACHE_BYTES = 64 << 20
+
+
+def apply_blank_axes(ax):
+    """初始画面：只显示网格，不显示坐标轴和标签"""
+    ax.cla()
+    # cla() 不会清除 tick_params 的设置，需手动恢复，保证与启动时画面一致
+    ax.tick_params(axis='both', which='both', reset=True)
+    ax.grid(True, linestyle=':')
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.set_xticklabels([])
+    ax.set_yticklabels([])
+    # 设置坐标轴范围
+    ax.set_xlim(45, 85)
+    ax.set_ylim(0, 0.9)
+    # 设置网格和刻度
+    ax.grid(True, linestyle='-', linewidth=1.5, color='gray', alpha=0.7)
+    ax.set_xticks(np.arange(45, 90, 5))
+    ax.set_yticks(np.arange(0, 1.0, 0.1))
+    # 移除图形边框
+    for spine in ['top', 'right', 'bottom', 'left']:
+        ax.spines[spine].set_visible(False)
+
+
+def apply_plain_axes(ax):
+    """简洁样式的坐标轴（test.py 的界面）：黑体标签、浅色网格"""
+    ax.cla()
+    ax.set_xlabel('浓度含量(%)', fontproperties='SimHei', fontsize=12)
+    ax.set_ylabel('吸光度(A)', fontproperties='SimHei', fontsize=12)
+    # 使用细密的网格线
+    ax.grid(True, linestyle='-', alpha=0.3)
+    # 设置坐标轴范围
+    ax.set_xlim(45, 85)
+    ax.set_ylim(-0.05, 0.8)
+    # 设置刻度
+    ax.set_xticks(np.arange(50, 85, 5))
+    ax.set_yticks(np.arange(0, 0.8, 0.1))
+
+
+def clear_data(ax):
+    """移除散点、线条和文字，保留坐标轴样式"""
+    for artist in [*ax.collections, *ax.lines, *ax.texts]:
+        artist.remove()
+
+
+def apply_coordinates(ax):
+    """建立坐标轴和标签"""
+    ax.cla()
+    for spine in ['top', 'right']:
+        ax.spines[spine].set_visible(False)
+    # 设置坐标轴颜色和粗细
+    for spine in ['bottom', 'left']:
+        ax.spines[spine].set_visible(True)
+        ax.spines[spine].set_color('green')
+        ax.spines[spine].set_linewidth(3)
+    # 设置坐标轴标签
+    ax.set_xlabel("漆酚含量(%)", fontsize=32, fontname='KaiTi', color='green', weight='bold')
+    ax.set_ylabel("吸光度(A)", fontsize=32, fontname='KaiTi', color='green', weight='bold')
+    # 设置刻度颜色
+    ax.tick_params(axis='both', which='both', colors='green', width=3)
+    # 设置坐标轴范围
+    ax.set_xlim(45, 85)
+    ax.set_ylim(0, 0.9)
+    ax.set_xticks(np.arange(45, 90, 5))
+    ax.set_yticks(np.arange(0, 1.0, 0.1))
+    ax.tick_params(labelsize=14)
+    ax.grid(True, linestyle='-', linewidth=1.5, color='gray', alpha=0.5)
+
+
+def draw_steps(ax, x, y, fit=None, step=3, restyle=True):
+    """按教学流程绘制到第 step 步（1 建立坐标，2 绘制散点，3 拟合曲线），用于无界面出图
+
+    fit 为 fitters.fit_line 的结果（直线或曲线模型），step 为 3 时必须提供。
+    restyle=False 表示坐标轴已建立（重复出图时只需先清掉上一次的数据图元）。
+    """
+    if restyle:
+        apply_coordinates(ax)
+    if step >= 2:
+        lod.scatter(ax, x, y, s=200, color='#1e3799')
+    if step >= 3:
+        x_fit = np.array([46.0, 84.0]) if is_linear(fit) else np.linspace(46.0, 84.0, 200)
+        ax.plot(x_fit, predict(fit, x_fit), linestyle='-', color='#eb3b5a', linewidth=4)
+        ax.text(0.03, 0.95, f"A = {formula(fit)}\nr = {fit.r:.4f}",
+                transform=ax.transAxes, va='top', fontsize=20, color='#eb3b5a')
+
+
+class BlitRenderer:
+    """静态背景（网格、坐标轴、刻度、标签）只完整绘制一次并缓存，之后只 blit 变化的图元
+
+    背景按 (名称, 画布尺寸) 缓存，窗口尺寸变化后会在下一次完整绘制时重新截取；
+    缓存按字节数限制，反复调整窗口大小时淘汰最久未用的位图。
+    """
+
+    def __init__(self, canvas, ax, cache=None):
+        self.canvas = canvas
+        self.ax = ax
+        self.background = None  # 当前背景名称
+        self.backgrounds = cache if cache is not None else ResultCache(BACKGROUND_CACHE_BYTES)
+        self.artists = []
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _cache_key(self):
+        width, height = self.canvas.get_width_height()
+        return self.background, width, height
+
+    def _on_draw(self, event):
+        # 每次完整绘制后截取背景（动态图元不参与完整绘制），再补画动态图元
+        width, height = self.canvas.get_width_height()
+        region = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.backgrounds.put(self._cache_key(), region, nbytes=width * height * 4)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        # 已被移除的图元（如 mplcursors 删除的注释）不再绘制
+        self.artists = [a for a in self.artists if a.axes is not None]
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+
+    def set_background(self, name, setup):
+        """切换背景；名称变化时调用 setup(ax) 重新设置坐标轴样式"""
+        if name != self.background:
+            self.clear_artists()
+            setup(self.ax)
+            self.background = name
+
+    def add_artist(self, artist):
+        """登记动态图元，之后只通过 blit 绘制
+
+        复用的图元（之前已移除，或切换背景时随坐标轴一起清除）重新加入坐标轴。
+        """
+        if artist.axes is None:
+            # 原来按坐标区裁剪的改用当前的坐标区（清除坐标轴后会重建），原来不裁剪的（如注释）保持不裁剪
+            clipped = artist.get_clip_path() is not None
+            self.ax.add_artist(artist)
+            artist.set_clip_path(self.ax.patch if clipped else None)
+        artist.set_animated(True)
+        if artist not in self.artists:
+            self.artists.append(artist)
+        return artist
+
+    def remove_artist(self, artist):
+        """移除一个动态图元（抽稀散点同时断开回调）"""
+        if artist in self.artists:
+            self.artists.remove(artist)
+        if artist.axes is not None:
+            artist.remove()
+        lod.release(artist)
+
+    def clear_artists(self):
+        for artist in self.artists:
+            if artist.axes is not None:
+                artist.remove()
+            lod.release(artist)
+        self.artists = []
+
+    def refresh(self):
+        """有缓存背景时只恢复背景并 blit 动态图元，否则完整绘制一次"""
+        region = self.backgrounds.get(self._cache_key())
+        if region is None:
+            with tracing.span('draw.full'):
+                self.canvas.draw()
+            return
+        with tracing.span('draw.blit'):
+            self.canvas.restore_region(region)
+            self._draw_artists()
+            self.canvas.blit(self.canvas.figure.bbox)
+
+    def invalidate(self):
+        """丢弃所有缓存背景"""
+        self.backgrounds.clear()
@@ -0,0 +1,227 @@
+"""吸光度数据的二进制列式存储（np.memmap 零拷贝打开）
+
+文件结构：8 字节魔数 + 4 字节头长度 + JSON 头 + 按 64 字节对齐的各列原始数据。
+各列为 percentages (n_standards,)、wavelengths (n_wavelengths,)、
+absorbances (n_standards, n_wavelengths)，单波长数据 n_wavelengths 为 1。
+"""
+import argparse
+import itertools
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b'ABSSTORE'
+VERSION = 1
+ALIGN = 64
+COLUMNS = ('percentages', 'wavelengths', 'absorbances')
+
+# 内置的七个标准溶液数据
+DEFAULT_PERCENTAGES = np.array([50, 55, 60, 65, 70, 75, 80], dtype=float)
+DEFAULT_ABSORBANCES = np.array([0.120, 0.206, 0.338, 0.460, 0.547, 0.641, 0.725], dtype=float)
+# 紧凑模式下单波长数据的存放格式：每个标准溶液的含量与吸光度相邻存放，单精度
+READING_DTYPE = np.dtype([('concentration', '<f4'), ('absorbance', '<f4')])
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _layout(n_standards, n_wavelengths, dtype):
+    """计算头部与各列在文件中的偏移"""
+    itemsize = np.dtype(dtype).itemsize
+    shapes = {
+        'percentages': (n_standards,),
+        'wavelengths': (n_wavelengths,),
+        'absorbances': (n_standards, n_wavelengths),
+    }
+    header = {'version': VERSION, 'dtype': np.dtype(dtype).str,
+              'n_standards': n_standards, 'n_wavelengths': n_wavelengths, 'columns': {}}
+    # 先估算头部长度，偏移量写入后长度基本不变，再留出对齐余量
+    offset = _align(len(MAGIC) + 4 + len(json.dumps(header)) + 256)
+    for name in COLUMNS:
+        header['columns'][name] = {'offset': offset, 'shape': list(shapes[name])}
+        offset = _align(offset + itemsize * int(np.prod(shapes[name])))
+    raw = json.dumps(header).encode('utf-8')
+    if len(MAGIC) + 4 + len(raw) > header['columns']['percentages']['offset']:
+        raise ValueError("存储文件头过长")
+    return header, raw, offset
+
+
+def create_store(path, n_standards, n_wavelengths=1, dtype='<f8'):
+    """创建空的存储文件，返回可写入的 SpectrumStore"""
+    header, raw, size = _layout(n_standards, n_wavelengths, dtype)
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(raw)))
+        f.write(raw)
+        f.truncate(size)
+    return SpectrumStore.open(path, mode='r+')
+
+
+def write_store(path, percentages, absorbances, wavelengths=None, dtype='<f8'):
+    """把数组写入存储文件；absorbances 可为一维（单波长）或 (n_standards, n_wavelengths)"""
+    percentages = np.asarray(percentages, dtype=float)
+    absorbances = np.asarray(absorbances, dtype=float)
+    if absorbances.ndim == 1:
+        absorbances = absorbances[:, None]
+    if wavelengths is None:
+        wavelengths = np.full(absorbances.shape[1], np.nan)
+    store = create_store(path, absorbances.shape[0], absorbances.shape[1], dtype)
+    store.percentages[:] = percentages
+    store.wavelengths[:] = wavelengths
+    store.absorbances[:] = absorbances
+    store.flush()
+    return store
+
+
+def read_header(path):
+    """读取并校验文件头"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} 不是吸光度存储文件")
+        (length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length).decode('utf-8'))
+    if header.get('version') != VERSION:
+        raise ValueError(f"不支持的存储文件版本: {header.get('version')}")
+    return header
+
+
+class SpectrumStore:
+    """吸光度数据集，各列为 np.memmap（文件打开）或普通数组（内置数据）"""
+
+    def __init__(self, percentages, wavelengths, absorbances, path=None):
+        self.percentages = percentages
+        self.wavelengths = wavelengths
+        self.absorbances = absorbances
+        self.path = path
+        self.readings = None  # 紧凑模式下各列所在的结构化数组（见 compact）
+
+    @classmethod
+    def open(cls, path, mode='r'):
+        """以内存映射方式打开；mode='c' 为写时复制，修改只在内存中生效"""
+        header = read_header(path)
+        columns = {}
+        for name in COLUMNS:
+            info = header['columns'][name]
+            columns[name] = np.memmap(path, dtype=header['dtype'], mode=mode,
+                                      offset=info['offset'], shape=tuple(info['shape']))
+        return cls(columns['percentages'], columns['wavelengths'], columns['absorbances'], path)
+
+    @classmethod
+    def from_arrays(cls, percentages, absorbances, wavelengths=None):
+        """由内存数组构建（不落盘）"""
+        absorbances = np.array(absorbances, dtype=float)
+        if absorbances.ndim == 1:
+            absorbances = absorbances[:, None]
+        if wavelengths is None:
+            wavelengths = np.full(absorbances.shape[1], np.nan)
+        return cls(np.array(percentages, dtype=float), np.asarray(wavelengths, dtype=float), absorbances)
+
+    @classmethod
+    def default(cls):
+        """内置的七个标准溶液数据"""
+        return cls.from_arrays(DEFAULT_PERCENTAGES, DEFAULT_ABSORBANCES)
+
+    @property
+    def n_standards(self):
+        return self.absorbances.shape[0]
+
+    @property
+    def n_wavelengths(self):
+        return self.absorbances.shape[1]
+
+    def absorbance(self, wavelength_index=0):
+        """某一波长下各标准溶液的吸光度"""
+        return self.absorbances[:, wavelength_index]
+
+    def compact(self):
+        """单精度的内存副本（长时间运行的紧凑模式），内存减半
+
+        单波长数据的含量与吸光度存放在同一个 READING_DTYPE 结构化数组中，各列是它的字段视图，
+        保存在 readings 属性中。内存映射的列由操作系统按需换入换出，保持不变；
+        需要时可用 write_store(..., dtype='<f4') 直接写成单精度文件。
+        """
+        if isinstance(self.absorbances, np.memmap):
+            return self
+        if self.n_wavelengths == 1:
+            readings = np.empty(self.n_standards, READING_DTYPE)
+            readings['concentration'] = self.percentages
+            readings['absorbance'] = self.absorbances[:, 0]
+            store = SpectrumStore(readings['concentration'], self.wavelengths, readings['absorbance'][:, None],
+                                  self.path)
+            store.readings = readings
+            return store
+        return SpectrumStore(self.percentages.astype(np.float32), self.wavelengths,
+                             self.absorbances.astype(np.float32), self.path)
+
+    def reopen(self, mode='r'):
+        """重新打开同一份数据（丢弃写时复制的修改），内置数据则恢复默认值"""
+        return open_store(self.path, mode)
+
+    def flush(self):
+        for column in (self.percentages, self.wavelengths, self.absorbances):
+            if isinstance(column, np.memmap):
+                column.flush()
+
+
+def open_store(path=None, mode='r'):
+    """打开存储文件，未指定路径时返回内置数据
+
+    CSV、Parquet、Arrow、HDF5 测量数据（见 dataio）读入内存，mode 不起作用。
+    """
+    if path is None:
+        return SpectrumStore.default()
+    import dataio  # dataio 依赖本模块，在此处导入以免循环导入
+    if os.path.splitext(path)[1].lower() in dataio.FORMATS:
+        store = dataio.to_store(dataio.read(path, columns=('concentration', 'absorbance', 'wavelength')))
+        store.path = path
+        return store
+    return SpectrumStore.open(path, mode)
+
+
+def import_csv(csv_path, store_path, delimiter=',', chunk_size=100000):
+    """把文本数据（首列含量，其余各列为各波长吸光度）分块转存为存储文件
+
+    表头中除首列外若为数字，则作为波长写入。
+    """
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        names = f.readline().strip().split(delimiter)
+        n_rows = sum(1 for line in f if line.strip())
+    try:
+        wavelengths = np.array([float(v) for v in names[1:]])
+    except ValueError:
+        wavelengths = np.full(len(names) - 1, np.nan)
+
+    store = create_store(store_path, n_rows, len(names) - 1)
+    store.wavelengths[:] = wavelengths
+    row = 0
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        f.readline()
+        while True:
+            lines = [line for line in itertools.islice(f, chunk_size) if line.strip()]
+            if not lines:
+                break
+            block = np.loadtxt(lines, delimiter=delimiter, ndmin=2)
+            store.percentages[row:row + len(block)] = block[:, 0]
+            store.absorbances[row:row + len(block)] = block[:, 1:]
+            row += len(block)
+    store.flush()
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把文本吸光度数据转存为二进制存储文件")
+    parser.add_argument('src', help="文本数据文件（首行为表头）")
+    parser.add_argument('dst', help="输出存储文件")
+    parser.add_argument('--delimiter', default=',')
+    args = parser.parse_args(argv)
+    store = import_csv(args.src, args.dst, args.delimiter)
+    print(f"已写入 {store.n_standards} 个标准 × {store.n_wavelengths} 个波长")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
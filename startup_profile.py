@@ -0,0 +1,75 @@
+"""启动耗时分析（--profile-startup）：统计各模块导入和首帧绘制时间
+
+只依赖标准库，需在其他重量级模块导入之前启用。
+"""
+import builtins
+import sys
+import time
+
+_t0 = time.perf_counter()
+_imports = []
+_marks = []
+_depth = 0
+_original_import = builtins.__import__
+enabled = False
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # 只统计最外层、且尚未加载过的导入，嵌套导入计入外层模块
+    global _depth
+    label = name
+    if not _depth and not level and fromlist and name in sys.modules:
+        # from 包 import 子模块：按子模块记录
+        pending = [f"{name}.{item}" for item in fromlist if f"{name}.{item}" not in sys.modules]
+        if pending and hasattr(sys.modules[name], '__path__'):
+            label = pending[0]
+    if _depth or level or label in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _depth -= 1
+        _imports.append((label, time.perf_counter() - start))
+
+
+def enable():
+    """开始记录导入耗时"""
+    global enabled
+    if not enabled:
+        enabled = True
+        builtins.__import__ = _timed_import
+
+
+def disable():
+    global enabled
+    enabled = False
+    builtins.__import__ = _original_import
+
+
+def mark(label):
+    """记录从进程启动（本模块导入）到此刻的时间点"""
+    if enabled:
+        _marks.append((label, time.perf_counter() - _t0))
+
+
+def report(file=None):
+    """输出导入耗时（从高到低）与各时间点
+
+    打包为无控制台的 exe 时 sys.stderr 为 None，改写到当前目录的 startup_profile.log。
+    """
+    if file is None and sys.stderr is None:
+        with open('startup_profile.log', 'w', encoding='utf-8') as f:
+            report(f)
+        return
+    file = file or sys.stderr
+    total_import = sum(t for _, t in _imports)
+    print("==== 启动耗时分析 ====", file=file)
+    print(f"模块导入合计 {total_import * 1000:8.1f} ms", file=file)
+    for name, t in sorted(_imports, key=lambda item: item[1], reverse=True):
+        if t >= 0.001:
+            print(f"  {name:<40s}{t * 1000:8.1f} ms", file=file)
+    print("时间点（自启动起）", file=file)
+    for label, t in _marks:
+        print(f"  {label:<40s}{t * 1000:8.1f} ms", file=file)
@@ -0,0 +1,142 @@
+"""四步教学流程（建立坐标 → 绘制图像 → 数据拟合 → 复位清屏）的视图核心，两个界面共用
+
+界面登记图层：出现的步骤、依赖的模型输入（model.DATA、model.FITTER）、后台准备函数
+prepare(snapshot)、主线程绘制函数 draw(result) 与清除函数 clear()。每个图层记下已显示内容
+所依据的输入版本，切换步骤或模型变化时 sync() 只处理尚未显示或版本已过期的图层：
+只换拟合方法时散点不动只重画拟合线，再按一次同一步骤时什么都不用重算。
+较慢的附加结果（如置信区间）可登记为不阻塞的图层，步骤完成的通知不等它。
+"""
+STEP_LABELS = ("建立坐标", "绘制图像", "数据拟合", "复位清屏")
+BLANK, AXES, SCATTER, FIT = 0, 1, 2, 3
+
+
+class Layer:
+    """一个图层及其显示状态"""
+
+    def __init__(self, name, step, inputs, prepare, draw, clear, ready=None, blocking=True):
+        self.name = name
+        self.step = step
+        self.inputs = inputs
+        self.prepare = prepare
+        self.draw = draw
+        self.clear = clear
+        # ready(snapshot) 若能立即给出结果（如已缓存、O(1) 的最小二乘）则不提交后台任务
+        self.ready = ready
+        # blocking 为 False 的图层在后台慢慢算，算好后自行更新显示，on_step_done 不等它
+        self.blocking = blocking
+        self.version = None  # 已显示内容所依据的输入版本，未显示时为 None
+        self.job = None
+        self.job_version = None
+
+
+class StepView:
+    """按当前步骤维护各图层；show_axes(step) 负责坐标轴样式，on_step_done(step) 在按钮触发的步骤（不阻塞的图层除外）全部显示后调用"""
+
+    def __init__(self, model, executor, show_axes, on_step_done=None, on_error=None, on_progress=None):
+        self.model = model
+        self.executor = executor
+        self.show_axes = show_axes
+        self.on_step_done = on_step_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.step = BLANK
+        self.layers = []
+        self._pending_step = None  # 等待全部图层显示后通知的步骤
+        model.subscribe(self._on_model_changed)
+
+    def add_layer(self, name, step, inputs, prepare, draw, clear, ready=None, blocking=True):
+        layer = Layer(name, step, tuple(inputs), prepare, draw, clear, ready, blocking)
+        self.layers.append(layer)
+        return layer
+
+    def goto(self, step):
+        """切换到第 step 步：更后面的图层清除，已显示且输入未变的图层原样保留"""
+        self.step = step
+        for layer in self.layers:
+            if layer.step > step:
+                self._hide(layer)
+        self.show_axes(step)
+        self._pending_step = step
+        self.sync()
+
+    def invalidate(self):
+        """清除所有图层（如坐标轴被整个重建），下一次 sync() 全部重画"""
+        for layer in self.layers:
+            self._hide(layer)
+
+    def stale_layers(self):
+        """当前步骤应显示、但尚未显示或输入已变化的图层"""
+        return [layer for layer in self.layers
+                if layer.step <= self.step and layer.version != self.model.version(layer.inputs)]
+
+    @property
+    def busy(self):
+        return any(layer.job is not None for layer in self.layers)
+
+    def sync(self):
+        """重算、重画过期的图层；能立即得到结果的同步绘制，其余提交后台任务"""
+        snapshot = self.model.snapshot()
+        for layer in self.stale_layers():
+            version = self.model.version(layer.inputs)
+            if layer.job is not None:
+                if layer.job_version == version:
+                    continue  # 正在按最新输入计算
+                layer.job.cancel()
+                layer.job = None
+            result = layer.ready(snapshot) if layer.ready is not None else None
+            if result is not None:
+                self._draw(layer, version, result)
+                continue
+            layer.job_version = version
+            layer.job = self.executor.submit(
+                layer.prepare, snapshot, group=f"layer.{layer.name}", on_progress=self.on_progress,
+                on_done=lambda result, layer=layer, version=version: self._on_prepared(layer, version, result),
+                on_error=lambda error, layer=layer: self._on_failed(layer, error))
+        self._check_done()
+
+    def _hide(self, layer):
+        if layer.job is not None:
+            layer.job.cancel()
+            layer.job = None
+        if layer.version is not None:
+            layer.clear()
+            layer.version = None
+
+    def _draw(self, layer, version, result):
+        if layer.version is not None:
+            layer.clear()
+        layer.draw(result)
+        layer.version = version
+
+    def _on_prepared(self, layer, version, result):
+        layer.job = None
+        if layer.step > self.step:
+            return
+        if version != self.model.version(layer.inputs):
+            # 计算期间输入又变了，按最新输入重来
+            self.sync()
+            return
+        self._draw(layer, version, result)
+        self._check_done()
+
+    def _on_failed(self, layer, error):
+        layer.job = None
+        if layer.blocking:
+            self._pending_step = None
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def _check_done(self):
+        if self._pending_step is None:
+            return
+        stale = self.stale_layers()
+        if any(layer.blocking and (layer.job is not None or layer in stale) for layer in self.layers):
+            return
+        step, self._pending_step = self._pending_step, None
+        if self.on_step_done is not None:
+            self.on_step_done(step)
+
+    def _on_model_changed(self, changes):
+        if any(set(layer.inputs) & changes for layer in self.layers if layer.step <= self.step):
+            self.sync()
+
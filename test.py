@@ -1,28 +1,66 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import numpy as np
+import sys
+
+from spectrum_store import open_store
+import dataio
+import lod
+from workers import JobExecutor
+from virtual_table import VirtualTable
+from fitters import fitter_labels, formula, predict, FITTERS
+from model import CalibrationModel, DATA, FITTER
+from render import apply_plain_axes
+from stepview import StepView, STEP_LABELS, BLANK, AXES, SCATTER, FIT
+
+# 导入导出对话框中的文件类型
+DATA_FILETYPES = [("CSV", "*.csv"), ("Parquet", "*.parquet"), ("Arrow", "*.feather"), ("HDF5", "*.h5 *.hdf5")]
+
 
 class SpectrophotometerApp:
-    def __init__(self, root):
+    def __init__(self, root, store=None):
         self.root = root
         self.root.title("分光光度计数据处理 AI小程序")
         self.root.geometry("1000x600")
         
-        # 初始化数据
-        self.data = [
-            (50, 0.120),
-            (55, 0.206),
-            (60, 0.338),
-            (65, 0.460),
-            (70, 0.547),
-            (75, 0.641),
-            (80, 0.725)
-        ]
+        # 初始化数据（存储文件以写时复制方式映射，编辑只改内存，复位即重新映射）；
+        # 数据、拟合方法与派生结果放在与 absorbance_app.py 共用的模型中（见 model.py）
+        self.model = CalibrationModel(store)
+        self.executor = JobExecutor(self.root)  # 排序、抽稀等耗时计算放到后台线程
+        self.scatter = None
+        self.fit_line = None
+        self.fit_text = None
+        self.fit = None  # 当前显示的拟合结果
         
         self.create_widgets()
-        self.init_plot()
+        # 四步流程的图层：编辑数据时散点和拟合线按需重画，只换拟合方法时只重画拟合线
+        self.view = StepView(self.model, self.executor, self.show_axes, on_step_done=self.on_step_done,
+                             on_error=self.on_job_error)
+        self.view.add_layer('scatter', SCATTER, (DATA,), self.model.sorted_points, self.draw_scatter,
+                            self.clear_scatter, ready=self.scatter_ready)
+        self.view.add_layer('fit', FIT, (DATA, FITTER), self.prepare_fit,
+                            self.draw_fit, self.clear_fit, ready=lambda snapshot: self.model.fit_now())
+        self.model.subscribe(self.on_model_changed)
+        self.show_axes(BLANK)
+    
+    # 数据与拟合方法都在模型中，这里只是便于读取
+    @property
+    def store(self):
+        return self.model.store
+    
+    @property
+    def concentrations(self):
+        return self.model.x
+    
+    @property
+    def absorbances(self):
+        return self.model.y
+    
+    @property
+    def fitter(self):
+        return self.model.fitter
     
     def create_widgets(self):
         # 创建主框架
@@ -40,12 +78,13 @@ class SpectrophotometerApp:
         left_frame = ttk.Frame(main_frame, padding="10")
         left_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        # 数据表格
-        self.tree = ttk.Treeview(left_frame, columns=('浓度', '吸光度'), show='headings', height=7)
-        self.tree.heading('浓度', text='浓度含量(%)')
-        self.tree.heading('吸光度', text='吸光度(A)')
-        self.tree.column('浓度', width=100, anchor='center')
-        self.tree.column('吸光度', width=100, anchor='center')
+        # 数据表格（虚拟化，只为可见行创建条目，自带滚动条）
+        self.table = VirtualTable(left_frame, ('浓度', '吸光度'), (lambda c: f"{c:g}", lambda a: f"{a:g}"), height=7)
+        self.tree = self.table.tree
+        self.table.heading('浓度', text='浓度含量(%)')
+        self.table.heading('吸光度', text='吸光度(A)')
+        self.table.column('浓度', width=100, anchor='center')
+        self.table.column('吸光度', width=100, anchor='center')
         
         # 设置表格样式
         style = ttk.Style()
@@ -75,28 +114,23 @@ class SpectrophotometerApp:
                  background=[('active', '#45a049')])
         
         # 添加初始数据
-        for item in self.data:
-            self.tree.insert('', 'end', values=item)
+        self.fill_table()
         
-        # 允许编辑表格
+        # 允许编辑表格，Delete 键删除选中行
         self.tree.bind('<Double-1>', self.on_double_click)
-        
-        # 滚动条
-        scrollbar = ttk.Scrollbar(left_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.bind('<Delete>', self.on_delete)
         
         # 按钮框架
         button_frame = ttk.Frame(left_frame, padding="10")
         
         # 按钮
-        self.btn_create = ttk.Button(button_frame, text="建立坐标", command=self.create_coordinate)
-        self.btn_plot = ttk.Button(button_frame, text="绘制图像", command=self.plot_data)
-        self.btn_fit = ttk.Button(button_frame, text="数据拟合", command=self.fit_data)
-        self.btn_reset = ttk.Button(button_frame, text="复位清屏", command=self.reset_screen)
+        self.btn_create = ttk.Button(button_frame, text=STEP_LABELS[0], command=self.create_coordinate)
+        self.btn_plot = ttk.Button(button_frame, text=STEP_LABELS[1], command=self.plot_data)
+        self.btn_fit = ttk.Button(button_frame, text=STEP_LABELS[2], command=self.fit_data)
+        self.btn_reset = ttk.Button(button_frame, text=STEP_LABELS[3], command=self.reset_screen)
         
         # 布局左侧组件
-        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.table.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
         button_frame.grid(row=1, column=0, columnspan=2, pady=10)
         
         # 按钮布局
@@ -105,6 +139,21 @@ class SpectrophotometerApp:
         self.btn_fit.grid(row=1, column=0, padx=5, pady=5)
         self.btn_reset.grid(row=1, column=1, padx=5, pady=5)
         
+        # 拟合方法选择
+        self.fitter_names = list(fitter_labels())
+        self.fitter_box = ttk.Combobox(button_frame, values=list(fitter_labels().values()), state='readonly', width=14)
+        self.fitter_box.current(self.fitter_names.index(self.fitter))
+        self.fitter_box.bind('<<ComboboxSelected>>', self.on_fitter_selected)
+        self.fitter_box.grid(row=2, column=0, columnspan=2, pady=5)
+        
+        # 导入导出（CSV、Parquet、Arrow、HDF5，见 dataio.py）
+        self.btn_import = ttk.Button(button_frame, text="导入数据", command=self.import_data)
+        self.btn_export = ttk.Button(button_frame, text="导出数据", command=self.export_data)
+        self.btn_results = ttk.Button(button_frame, text="导出结果", command=self.export_results)
+        self.btn_import.grid(row=3, column=0, padx=5, pady=5)
+        self.btn_export.grid(row=3, column=1, padx=5, pady=5)
+        self.btn_results.grid(row=4, column=0, columnspan=2, padx=5, pady=5)
+        
         # 设置左侧框架权重
         left_frame.columnconfigure(0, weight=1)
         left_frame.rowconfigure(0, weight=1)
@@ -127,29 +176,36 @@ class SpectrophotometerApp:
         self.canvas = FigureCanvasTkAgg(self.figure, master=chart_frame)
         self.canvas.get_tk_widget().grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # 缩放/平移工具栏，大数据量散点会随坐标范围重新抽稀
+        self.toolbar = NavigationToolbar2Tk(self.canvas, chart_frame, pack_toolbar=False)
+        self.toolbar.grid(row=1, column=0, sticky=tk.W)
+        
         # 设置右侧框架权重
         right_frame.columnconfigure(0, weight=1)
         right_frame.rowconfigure(1, weight=1)
         chart_frame.columnconfigure(0, weight=1)
         chart_frame.rowconfigure(0, weight=1)
     
-    def init_plot(self):
-        # 初始化图表
-        self.ax.set_xlabel('浓度含量(%)', fontproperties='SimHei', fontsize=12)
-        self.ax.set_ylabel('吸光度(A)', fontproperties='SimHei', fontsize=12)
-        # 使用细密的网格线
-        self.ax.grid(True, linestyle='-', alpha=0.3)
-        # 设置坐标轴范围
-        self.ax.set_xlim(45, 85)
-        self.ax.set_ylim(-0.05, 0.8)
-        # 设置刻度
-        self.ax.set_xticks(np.arange(50, 85, 5))
-        self.ax.set_yticks(np.arange(0, 0.8, 0.1))
-        self.canvas.draw()
+    def show_axes(self, step):
+        # 建立坐标与复位时重置图表；之后的步骤保留坐标轴（包括工具栏缩放后的范围），只增删图层
+        if step <= AXES:
+            apply_plain_axes(self.ax)
+        # 有缩放工具栏，不缓存背景做 blit，由 draw_idle 合并同一轮事件中的多次重绘
+        self.canvas.draw_idle()
+    
+    def on_model_changed(self, changes):
+        if DATA in changes:
+            self.table.set_data(self.concentrations, self.absorbances, keep_position=True)
+    
+    def fill_table(self):
+        self.table.set_data(self.concentrations, self.absorbances)
     
     def on_double_click(self, event):
-        # 编辑表格数据
-        item = self.tree.selection()[0]
+        # 编辑表格数据（表格条目会随滚动复用，按数据下标编辑）
+        selection = self.tree.selection()
+        if not selection:
+            return
+        index = self.table.index_of(selection[0])
         column = self.tree.identify_column(event.x)
         
         # 创建编辑窗口
@@ -158,7 +214,7 @@ class SpectrophotometerApp:
         edit_window.geometry("300x150")
         
         # 获取当前值
-        current_value = self.tree.item(item, 'values')[int(column[1])-1]
+        current_value = f"{(self.concentrations if column == '#1' else self.absorbances)[index]:g}"
         
         # 创建标签和输入框
         ttk.Label(edit_window, text=f"请输入新的{'浓度' if column == '#1' else '吸光度'}值:").pack(pady=10)
@@ -170,13 +226,12 @@ class SpectrophotometerApp:
         def save_edit():
             try:
                 new_value = float(entry.get())
-                values = list(self.tree.item(item, 'values'))
-                values[int(column[1])-1] = new_value
-                self.tree.item(item, values=values)
                 
-                # 更新数据
-                index = self.tree.index(item)
-                self.data[index] = tuple(values)
+                # 更新数据，拟合统计量只做 O(1) 增量更新；表格与已显示的图层随模型变化刷新
+                if column == '#1':
+                    self.model.set_point(index, x=new_value)
+                else:
+                    self.model.set_point(index, y=new_value)
                 
                 edit_window.destroy()
             except ValueError:
@@ -185,104 +240,158 @@ class SpectrophotometerApp:
         # 保存按钮
         ttk.Button(edit_window, text="保存", command=save_edit).pack(pady=10)
     
+    def on_delete(self, event):
+        # 删除选中行
+        indices = self.table.selection_indices()
+        if indices:
+            self.model.delete(indices)
+    
+    def fit_text_content(self, fit):
+        return f"y={formula(fit)}\nr={fit.r:.4f}"
+    
+    def on_fitter_selected(self, event=None):
+        # 已显示拟合线时视图只重新拟合拟合线，散点不动
+        self.model.set_fitter(self.fitter_names[self.fitter_box.current()])
+    
     def create_coordinate(self):
         # 建立坐标（重置图表）
-        self.ax.clear()
-        self.ax.set_xlabel('浓度含量(%)', fontproperties='SimHei', fontsize=12)
-        self.ax.set_ylabel('吸光度(A)', fontproperties='SimHei', fontsize=12)
-        # 使用细密的网格线
-        self.ax.grid(True, linestyle='-', alpha=0.3)
-        
-        # 设置固定的坐标轴范围
-        self.ax.set_xlim(45, 85)
-        self.ax.set_ylim(-0.05, 0.8)
-        
-        # 设置刻度
-        self.ax.set_xticks(np.arange(50, 85, 5))
-        self.ax.set_yticks(np.arange(0, 0.8, 0.1))
-        
-        self.canvas.draw()
-        messagebox.showinfo("提示", "坐标已建立")
+        self.view.goto(AXES)
     
     def plot_data(self):
         # 绘制数据
-        if not self.data:
+        if self.model.n == 0:
             messagebox.showwarning("警告", "没有数据可绘制")
             return
-        
-        # 清除之前的散点和线条
-        self.ax.clear()
-        self.init_plot()
-        
-        # 绘制新的散点
-        concentrations = [d[0] for d in self.data]
-        absorbances = [d[1] for d in self.data]
-        self.ax.scatter(concentrations, absorbances, color='blue', s=60, marker='o', edgecolors='black')
-        
-        self.canvas.draw()
-        messagebox.showinfo("提示", "图像绘制完成")
+        self.view.goto(SCATTER)
     
     def fit_data(self):
-        # 数据拟合
-        if not self.data or len(self.data) < 2:
+        # 数据拟合（同时显示散点）
+        if self.model.n < 2:
             messagebox.showwarning("警告", "数据不足，无法进行拟合")
             return
-        
-        concentrations = np.array([d[0] for d in self.data])
-        absorbances = np.array([d[1] for d in self.data])
-        
-        # 线性拟合
-        z = np.polyfit(concentrations, absorbances, 1)
-        p = np.poly1d(z)
-        
-        # 计算相关系数
-        correlation = np.corrcoef(concentrations, absorbances)[0, 1]
-        
-        # 清除之前的内容
-        self.ax.clear()
-        self.init_plot()
-        
-        # 绘制散点
-        self.ax.scatter(concentrations, absorbances, color='blue', s=60, marker='o', edgecolors='black')
-        
-        # 绘制拟合线
-        x_fit = np.linspace(min(concentrations), max(concentrations), 100)
-        y_fit = p(x_fit)
-        self.ax.plot(x_fit, y_fit, "r-", linewidth=2)
-        
-        self.canvas.draw()
-        messagebox.showinfo("提示", f"数据拟合完成\n拟合方程: y={z[0]:.4f}x+{z[1]:.4f}\n相关系数: r={correlation:.4f}")
+        self.view.goto(FIT)
+    
+    def on_step_done(self, step):
+        # 按钮触发的步骤显示完成后提示
+        if step == AXES:
+            messagebox.showinfo("提示", "坐标已建立")
+        elif step == SCATTER:
+            messagebox.showinfo("提示", "图像绘制完成")
+        elif step == FIT and self.fit is not None:
+            messagebox.showinfo("提示", f"数据拟合完成（{FITTERS[self.fit.method][0]}）\n"
+                                      f"拟合方程: y={formula(self.fit)}\n相关系数: r={self.fit.r:.4f}")
+    
+    def scatter_ready(self, snapshot):
+        # 数据量小时直接在主线程排序，不必提交后台任务
+        if len(snapshot.x) <= lod.LOD_THRESHOLD:
+            return self.model.sorted_points(snapshot)
+        return None
+    
+    def draw_scatter(self, sorted_xy):
+        x, y = sorted_xy
+        self.scatter = lod.scatter(self.ax, x, y, presorted=True, color='blue', s=60, marker='o', edgecolors='black')
+        self.canvas.draw_idle()
+    
+    def clear_scatter(self):
+        if self.scatter.axes is not None:
+            self.scatter.remove()
+        # 抽稀散点的回调持有整份数据，移除时立即断开
+        lod.release(self.scatter)
+        self.scatter = None
+        self.canvas.draw_idle()
+    
+    def prepare_fit(self, snapshot):
+        # 后台任务：按快照中的拟合方法拟合（最小二乘由模型的累加统计量直接得出，不经过这里）
+        if len(snapshot.x) < 2:
+            return None
+        return self.model.fit(snapshot)
+    
+    def draw_fit(self, fit):
+        # 数据不足两点时（如删除数据后）不显示拟合线
+        self.fit = fit
+        if fit is not None:
+            x_min, x_max = float(np.min(self.concentrations)), float(np.max(self.concentrations))
+            x_fit = np.linspace(x_min, x_max, 100)
+            self.fit_line, = self.ax.plot(x_fit, predict(fit, x_fit), "r-", linewidth=2)
+            self.fit_text = self.ax.text(0.03, 0.95, self.fit_text_content(fit), transform=self.ax.transAxes,
+                                         va='top', fontsize=11, color='red')
+        self.canvas.draw_idle()
+    
+    def clear_fit(self):
+        for artist in (self.fit_line, self.fit_text):
+            if artist is not None and artist.axes is not None:
+                artist.remove()
+        self.fit_line = self.fit_text = self.fit = None
+        self.canvas.draw_idle()
+    
+    def on_job_error(self, error):
+        messagebox.showerror("错误", f"计算出错: {error}")
+    
+    def import_data(self):
+        # 选择数据文件导入，替换当前数据
+        path = filedialog.askopenfilename(title="导入数据", filetypes=DATA_FILETYPES + [("存储文件", "*.abs")])
+        if not path:
+            return
+        self.load(path)
+    
+    def load(self, path):
+        # 在后台读入数据文件，读完后替换当前数据
+        self.executor.cancel_all('import')
+        self.executor.submit(open_store, path, 'c', on_done=self.set_store, on_error=self.on_job_error, group='import')
+    
+    def set_store(self, store):
+        # 先清屏再换数据，已显示的图层不必按新数据重算
+        self.view.goto(BLANK)
+        self.model.set_store(store)
+        messagebox.showinfo("提示", f"已导入 {store.n_standards} 个标准溶液")
+    
+    def export_data(self):
+        # 导出当前（含编辑）的数据
+        path = filedialog.asksaveasfilename(title="导出数据", defaultextension='.csv', filetypes=DATA_FILETYPES)
+        if not path:
+            return
+        columns = {'concentration': self.concentrations, 'absorbance': self.absorbances,
+                   'wavelength': np.full(len(self.concentrations), self.store.wavelengths[self.model.wavelength_index])}
+        self.executor.submit(dataio.write, path, columns,
+                             on_done=lambda path: messagebox.showinfo("提示", f"数据已导出到 {path}"),
+                             on_error=self.on_job_error)
+    
+    def export_results(self):
+        # 按当前拟合方法拟合，导出每个标准溶液反算的含量与拟合参数
+        if self.model.n < 2:
+            messagebox.showwarning("警告", "数据不足，无法进行拟合")
+            return
+        path = filedialog.asksaveasfilename(title="导出结果", defaultextension='.csv', filetypes=DATA_FILETYPES)
+        if not path:
+            return
+        self.executor.submit(self.write_results, path, self.model.snapshot(),
+                             on_done=lambda path: messagebox.showinfo("提示", f"结果已导出到 {path}"),
+                             on_error=self.on_job_error)
+    
+    def write_results(self, path, snapshot):
+        # 后台任务：拟合（已显示过的结果直接复用）并写出结果表
+        fit = self.model.fit(snapshot)
+        wavelength = float(self.store.wavelengths[self.model.wavelength_index])
+        results = dataio.fit_results(fit, snapshot.y, wavelength=wavelength)
+        return dataio.write(path, results, dataio.RESULT_SCHEMA)
     
     def reset_screen(self):
-        # 复位清屏
-        self.ax.clear()
-        self.init_plot()
-        
-        # 重置数据
-        self.data = [
-            (50, 0.120),
-            (55, 0.206),
-            (60, 0.338),
-            (65, 0.460),
-            (70, 0.547),
-            (75, 0.641),
-            (80, 0.725)
-        ]
-        
-        # 清空表格
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # 重新添加初始数据
-        for item in self.data:
-            self.tree.insert('', 'end', values=item)
+        # 复位清屏，图层的后台计算随之取消
+        self.view.goto(BLANK)
+        
+        # 重置数据（重新映射存储文件，丢弃内存中的编辑），表格随模型变化只更新可见行
+        self.model.reload('c')
         
         messagebox.showinfo("提示", "已复位清屏")
 
 def main():
     root = tk.Tk()
+    data_path = sys.argv[1] if len(sys.argv) > 1 else None
     app = SpectrophotometerApp(root)
+    if data_path:
+        app.load(data_path)  # 窗口先显示内置数据，文件在后台读入
     root.mainloop()
+    app.executor.shutdown()
 
 if __name__ == "__main__":
     main()
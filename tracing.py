@@ -0,0 +1,170 @@
+"""运行耗时追踪（--trace）：记录各操作步骤、绘制和后台任务的耗时
+
+默认关闭，关闭时 span() 只返回一个空的上下文管理器，几乎没有开销。
+开启后事件保存在定长队列中（长时间运行内存也不会增长），可导出为
+Chrome trace-event JSON（chrome://tracing 或 https://ui.perfetto.dev 打开），
+也可在终端输出按名称汇总的统计表。只依赖标准库。
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# 保留的最近事件数
+MAX_EVENTS = 200_000
+
+_t0 = time.perf_counter()
+# (名称, 开始时间, 耗时, 线程 id, 附加参数)，时间单位为秒
+_events = deque(maxlen=MAX_EVENTS)
+_thread_names = {}
+enabled = False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, self.start, time.perf_counter() - self.start, **self.args)
+        return False
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def clear():
+    _events.clear()
+
+
+def span(name, **args):
+    """计时上下文：with tracing.span('canvas.draw'): ...，未开启时不做任何记录"""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    """计时装饰器，name 缺省为函数的限定名"""
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with _Span(label, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name, start, duration=None, **args):
+    """直接记录一个事件（start 为 time.perf_counter() 的值，duration 缺省为到此刻为止）
+
+    用于跨越多个回调的耗时，如从点击按钮到后台计算结果显示出来的延迟。
+    """
+    if not enabled:
+        return
+    if duration is None:
+        duration = time.perf_counter() - start
+    thread = threading.current_thread()
+    _thread_names.setdefault(thread.ident, thread.name)
+    _events.append((name, start, duration, thread.ident, args))
+
+
+def events(name=None, since=None):
+    """已记录的事件（可按名称前缀和开始时间筛选），返回 (名称, 开始, 耗时, 线程, 参数) 列表"""
+    return [e for e in list(_events)
+            if (name is None or e[0].startswith(name)) and (since is None or e[1] >= since)]
+
+
+def latest(name):
+    """名称以 name 开头的最近一个事件，没有时为 None"""
+    # 先复制再遍历，其他线程同时追加事件也不影响
+    for event in reversed(list(_events)):
+        if event[0].startswith(name):
+            return event
+    return None
+
+
+def rate(name, window=1.0):
+    """最近 window 秒内名称以 name 开头的事件每秒次数（如绘制帧率）"""
+    since = time.perf_counter() - window
+    count = 0
+    for event in reversed(list(_events)):
+        if event[1] < since:
+            break
+        if event[0].startswith(name):
+            count += 1
+    return count / window
+
+
+def summary():
+    """按名称汇总：{名称: (次数, 合计, 平均, 95%分位, 最大)}，时间单位为秒"""
+    durations = {}
+    for name, _, duration, _, _ in list(_events):
+        durations.setdefault(name, []).append(duration)
+    result = {}
+    for name, values in durations.items():
+        values.sort()
+        total = sum(values)
+        p95 = values[min(int(0.95 * len(values)), len(values) - 1)]
+        result[name] = (len(values), total, total / len(values), p95, values[-1])
+    return result
+
+
+def report(file=None):
+    """按合计耗时从高到低输出统计表"""
+    file = file or sys.stderr
+    if file is None:
+        return
+    print("==== 耗时统计 ====", file=file)
+    print(f"  {'名称':<36s}{'次数':>8s}{'合计ms':>10s}{'平均ms':>10s}{'p95 ms':>10s}{'最大ms':>10s}", file=file)
+    for name, (count, total, mean, p95, worst) in sorted(summary().items(), key=lambda item: item[1][1],
+                                                         reverse=True):
+        print(f"  {name:<36s}{count:>8d}{total * 1000:>10.1f}{mean * 1000:>10.2f}{p95 * 1000:>10.2f}"
+              f"{worst * 1000:>10.2f}", file=file)
+
+
+def export_chrome_trace(path):
+    """导出 Chrome trace-event JSON（完整事件 ph='X'，时间单位微秒）"""
+    pid = os.getpid()
+    trace = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+             for tid, name in _thread_names.items()]
+    for name, start, duration, tid, args in list(_events):
+        event = {'name': name, 'cat': name.split('.', 1)[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+                 'ts': round((start - _t0) * 1e6, 3), 'dur': round(duration * 1e6, 3)}
+        if args:
+            event['args'] = {key: str(value) for key, value in args.items()}
+        trace.append(event)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    return path
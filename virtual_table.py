@@ -0,0 +1,148 @@
+"""虚拟化表格：数据保存在 NumPy 数组中，只为可见行创建 Treeview 条目并在滚动时复用"""
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+
+class VirtualTable(ttk.Frame):
+    """大数据量表格
+
+    columns 为列标识，formatters 为对应列的格式化函数（值 → 显示文本）。
+    无论数据多少行，Treeview 中始终只有可见的若干条目，插入开销与数据量无关。
+    行按数据下标交替打上 'even'/'odd' 标签。
+    """
+
+    def __init__(self, master, columns, formatters, height=15, selectmode='extended', **tree_kwargs):
+        super().__init__(master)
+        self.formatters = formatters
+        self.visible_rows = height
+        self.first = 0  # 第一条可见行对应的数据下标
+        self.columns_data = ()
+        self.items = []  # 复用的 Treeview 条目
+        self.selected = set()  # 选中行的数据下标（与条目无关，滚动后保持）
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=height,
+                                 selectmode=selectmode, **tree_kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<Configure>', self._on_configure)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.tree.bind('<Button-5>', lambda e: self._scroll_by(3))
+        self.tree.bind('<Up>', lambda e: self._move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self._move_selection(1))
+        self.tree.bind('<Prior>', lambda e: self._scroll_by(-self.visible_rows))
+        self.tree.bind('<Next>', lambda e: self._scroll_by(self.visible_rows))
+
+    # 与 Treeview 相同的常用接口
+    def heading(self, column, **kwargs):
+        return self.tree.heading(column, **kwargs)
+
+    def column(self, column, **kwargs):
+        return self.tree.column(column, **kwargs)
+
+    def tag_configure(self, tag, **kwargs):
+        return self.tree.tag_configure(tag, **kwargs)
+
+    def __len__(self):
+        return len(self.columns_data[0]) if self.columns_data else 0
+
+    def set_data(self, *columns, keep_position=False):
+        """替换表格数据（各列为等长数组），只重绘可见行；keep_position=True 时保持滚动位置"""
+        self.columns_data = columns
+        self.selected = set()
+        if not keep_position:
+            self.first = 0
+        self.refresh()
+
+    def refresh(self):
+        """数据原地修改后调用，重新填充可见行"""
+        n = len(self)
+        self.first = max(0, min(self.first, n - self.visible_rows))
+        count = min(self.visible_rows, n - self.first)
+        while len(self.items) < count:
+            self.items.append(self.tree.insert('', 'end'))
+        if len(self.items) > count:
+            self.tree.delete(*self.items[count:])
+            del self.items[count:]
+
+        selection = []
+        for k, item in enumerate(self.items):
+            i = self.first + k
+            values = [fmt(col[i]) for fmt, col in zip(self.formatters, self.columns_data)]
+            self.tree.item(item, values=values, tags=('even' if i % 2 == 0 else 'odd',))
+            if i in self.selected:
+                selection.append(item)
+        self.tree.selection_set(selection)
+
+        if n:
+            self.scrollbar.set(self.first / n, (self.first + count) / n)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def index_of(self, item):
+        """Treeview 条目对应的数据下标"""
+        return self.first + self.items.index(item)
+
+    def selection_indices(self):
+        """选中行的数据下标（升序）"""
+        return sorted(self.selected)
+
+    def scroll_to(self, index):
+        """滚动使第 index 行可见"""
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible_rows:
+            self.first = index - self.visible_rows + 1
+        self.refresh()
+
+    def _scroll_by(self, rows):
+        self.first += rows
+        self.refresh()
+        return 'break'
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self.first = int(float(value) * len(self))
+        elif unit == 'pages':
+            self.first += int(value) * self.visible_rows
+        else:
+            self.first += int(value)
+        self.refresh()
+
+    def _on_mousewheel(self, event):
+        # Windows 下每格 delta 为 120
+        return self._scroll_by(-3 * int(np.sign(event.delta)))
+
+    def _on_select(self, event):
+        visible = range(self.first, self.first + len(self.items))
+        self.selected.difference_update(visible)
+        self.selected.update(self.index_of(item) for item in self.tree.selection())
+
+    def _move_selection(self, step):
+        if not len(self):
+            return 'break'
+        current = max(self.selected) if step > 0 and self.selected else min(self.selected, default=self.first)
+        index = int(np.clip(current + step, 0, len(self) - 1))
+        self.selected = {index}
+        self.scroll_to(index)
+        return 'break'
+
+    def _on_configure(self, event):
+        # 控件被拉高时按实际可容纳的行数调整可见行
+        if not self.items:
+            return
+        bbox = self.tree.bbox(self.items[0])
+        if not bbox:
+            return
+        top, row_height = bbox[1], bbox[3]
+        rows = max(1, (event.height - top) // max(row_height, 1))
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh()
@@ -0,0 +1,143 @@
+"""后台任务执行器：计算放在线程池中，结果通过 root.after 回到 Tk 主线程"""
+import queue
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+_local = threading.local()
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+def report_progress(fraction, message=None):
+    """在任务函数内部调用，报告进度（0~1）；不在任务中调用时忽略"""
+    job = getattr(_local, 'job', None)
+    if job is not None:
+        job.executor._events.put(('progress', job, (fraction, message)))
+
+
+def check_cancelled():
+    """在任务函数内部调用，任务已取消时抛出 JobCancelled 以尽早退出"""
+    job = getattr(_local, 'job', None)
+    if job is not None and job.cancelled:
+        raise JobCancelled()
+
+
+class Job:
+    """一次后台计算，回调都在 Tk 主线程中执行"""
+
+    def __init__(self, executor, on_done, on_error, on_progress, group=None):
+        self.executor = executor
+        self.group = group
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.future = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """取消任务：未开始的直接撤销，已在运行的结果会被丢弃"""
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class JobExecutor:
+    """线程池 + 事件队列，主线程定时轮询队列并分发回调
+
+    NumPy 的大部分运算会释放 GIL，放在线程中即可与界面并行。
+    """
+
+    def __init__(self, root, max_workers=None, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._events = queue.Queue()
+        self._jobs = set()
+        self._after_id = None
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None, group=None, **kwargs):
+        """提交任务 fn(*args, **kwargs)，返回 Job
+
+        on_done(result)、on_error(exc)、on_progress(fraction, message) 均在主线程调用，
+        任务被取消后不再触发任何回调。group 用于按类别取消任务。
+        """
+        job = Job(self, on_done, on_error, on_progress, group)
+        job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+        self._jobs.add(job)
+        self._schedule()
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        # 工作线程中执行，结果放入队列交给主线程
+        if job.cancelled:
+            return
+        _local.job = job
+        try:
+            with tracing.span(f"job.{getattr(fn, '__name__', 'job')}"):
+                result = fn(*args, **kwargs)
+        except JobCancelled:
+            return
+        except Exception as e:
+            self._events.put(('error', job, e))
+        else:
+            self._events.put(('done', job, result))
+        finally:
+            _local.job = None
+
+    def _schedule(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._after_id = None
+        while True:
+            try:
+                kind, job, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if job.cancelled:
+                continue
+            if kind == 'progress':
+                if job.on_progress is not None:
+                    job.on_progress(*payload)
+            elif kind == 'done':
+                if job.on_done is not None:
+                    job.on_done(payload)
+            elif job.on_error is not None:
+                job.on_error(payload)
+            else:
+                # 没有错误回调时把完整的调用栈输出到标准错误，不吞掉出错位置
+                print("后台任务出错：", file=sys.stderr)
+                traceback.print_exception(type(payload), payload, payload.__traceback__, file=sys.stderr)
+        # 已结束且事件已分发完的任务不再跟踪
+        self._jobs = {job for job in self._jobs if not (job.done() or job.cancelled)}
+        if self._jobs or not self._events.empty():
+            self._schedule()
+
+    def cancel_all(self, group=None):
+        """取消未完成的任务（如复位清屏时）；指定 group 时只取消该类任务"""
+        for job in self._jobs:
+            if group is None or job.group == group:
+                job.cancel()
+        self._jobs = {job for job in self._jobs if not job.cancelled}
+
+    def shutdown(self):
+        """关闭窗口时调用：取消任务并停止轮询"""
+        self.cancel_all()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,11 +1,8 @@
 # -*- mode: python ; coding: utf-8 -*-
-from PyInstaller.utils.hooks import collect_all
 
 datas = []
 binaries = []
-hiddenimports = ['scipy._lib.messagestream', 'scipy.sparse.csgraph._validation', 'scipy.sparse._matrix', 'scipy.special._ufuncs_cxx']
-tmp_ret = collect_all('scipy')
-datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
+hiddenimports = []
 
 
 a = Analysis(
@@ -17,7 +14,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['scipy'],
     noarchive=False,
     optimize=0,
 )